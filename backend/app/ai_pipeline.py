@@ -1,181 +1,342 @@
-import datetime
+import asyncio
 import os
 import json
-import re
-from sqlalchemy.orm import Session
-import time
-import pytesseract
-from pdf2image import convert_from_path
-import google.generativeai as genai
+import queue
+import threading
+from sqlalchemy.orm import Session, joinedload
 from app.models import models
-import platform
+from app.gemini_scheduler import get_scheduler
+from app.table_parser import parse_pdf_tables
+from app.page_batcher import PageBatch, PagePacker, pack_pages, STRUCTURING_TOKEN_BUDGET
+from app.ocr_engine import configure_tesseract, extract_page_texts, get_page_count, iter_page_texts
+from app.pipeline_cache import get_cache, hash_texts
+from app.progress import ReportProgress
+from app.dashboard_cache import invalidate_constituency
+from app.reports import collect_garbage_in_background, create_report, in_current_report, mark_report_failed, publish_report
+from app.vagueness import classify_descriptions, normalize_description
+from app.contractors import ContractorResolver, assign_contractor_ids
+from app.duplicates import duplicate_findings, index_report
+from app.concentration import MIN_TOTAL_EXPENDITURE, ProjectColumns, analyze
+from app.insight_briefs import generate_briefs_in_background
+from app.bulk_writer import insert_insights_with_evidence, insert_projects, prepare_project_rows
 
 # This is handled globally by main.py's lifespan event.
 
-def extract_text_from_pdf(pdf_path: str) -> str:
+STRUCTURING_MODEL = "gemini-2.0-flash"
+# Bump whenever the structuring prompt changes so cached page results are not reused.
+STRUCTURING_PROMPT_VERSION = "2"
+_OCR_DONE = object()
+
+# Whole-batch retries for failures the scheduler does not retry itself (e.g. malformed JSON).
+STRUCTURING_BATCH_RETRIES = int(os.getenv("STRUCTURING_BATCH_RETRIES", "2"))
+
+def extract_text_from_pdf(pdf_path: str, page_numbers: list = None) -> list:
     print(f"  [AI Stage 1] Starting LOCAL OCR for: {pdf_path}")
     if not os.path.exists(pdf_path):
         raise FileNotFoundError(f"The specified PDF file was not found: {pdf_path}")
-    if platform.system() == "Windows":
-        tesseract_path = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
-        if os.path.exists(tesseract_path):
-            pytesseract.pytesseract.tesseract_cmd = tesseract_path
-        else:
-            raise FileNotFoundError(f"Tesseract executable not found at {tesseract_path}.")
-    try:
-        images = convert_from_path(pdf_path)
-        full_text = "".join([pytesseract.image_to_string(image) + "\n\n--- End of Page ---\n\n" for image in images])
-        print(f"  [AI Stage 1] OCR Complete. Processed {len(images)} pages.")
-        return full_text
-    except Exception as e:
-        raise e
+    configure_tesseract()
+    pages = extract_page_texts(pdf_path, page_numbers=page_numbers)
+    print(f"  [AI Stage 1] OCR Complete. Processed {len(pages)} pages.")
+    return pages
 
-def structure_data_with_gemini(pages: list) -> list:
-    print(f"  [AI Stage 2] Structuring data with Gemini using BATCH PROCESSING...")
-    model = genai.GenerativeModel("gemini-2.0-flash")
-    all_extracted_projects = []
-    batch_size = 4
-    for i in range(0, len(pages), batch_size):
-        batch_pages = pages[i:i + batch_size]
-        batch_number = (i // batch_size) + 1
-        print(f"\n    --- Analyzing Batch {batch_number} (Pages {i+1}-{min(i+batch_size, len(pages))}) ---")
-        combined_text = "".join(batch_pages)
-        if len(combined_text.strip()) < 100: continue
-        prompt = f"""
+def _build_structuring_prompt(batch: PageBatch) -> str:
+    combined_text = "".join(f"\n=== PAGE {page_number} ===\n{page}" for page_number, page in zip(batch.page_numbers, batch.pages))
+    return f"""
         Analyze the provided text from MULTIPLE PAGES of an MPLADS report and extract all project details.
         For each project, extract: "project_description", "allocated_amount", "location", "contractor_ngo_name", and a "category" from ["Road Construction", "Education", "Health & Sanitation", "Community Infrastructure", "Drinking Water", "Other"].
+        Also give each project a "page": the number of the "=== PAGE n ===" marker it appears under.
         The final output for this batch MUST be a single JSON object with one key, "projects", containing a list of ALL project objects found.
         ---
         {combined_text}
         ---
         """
+
+def _page_cache_key(page: str) -> str:
+    return hash_texts(STRUCTURING_MODEL, STRUCTURING_PROMPT_VERSION, page)
+
+def _projects_by_page(batch: PageBatch, batch_projects: list):
+    """Returns {page text: its projects}, or None if a project is not attributed to a page of the batch."""
+    page_of = [project.pop("page", None) for project in batch_projects]
+    by_number = {page_number: [] for page_number in batch.page_numbers}
+    for project, page_number in zip(batch_projects, page_of):
+        try:
+            by_number[int(page_number)].append(project)
+        except (TypeError, ValueError, KeyError):
+            return None
+    return {page: by_number[page_number] for page_number, page in zip(batch.page_numbers, batch.pages)}
+
+async def _structure_batch(scheduler, cache, batch: PageBatch) -> list:
+    """
+    Structures a batch, reusing the cached projects of every page seen before.
+    Results are cached per page rather than per batch: editing one page shifts
+    the boundaries of every later batch, but only the edited page is sent again.
+    """
+    label = f"Batch (Pages {batch.first_page}-{batch.last_page}, ~{batch.tokens} tokens)"
+    if len("".join(batch.pages).strip()) < 100: return []
+    if not cache:
+        return await _structure_pages(scheduler, cache, batch)
+    keys = [_page_cache_key(page) for page in batch.pages]
+    cached = await cache.aget_many("structure", keys)
+    reused = [project for key in keys if key in cached for project in json.loads(cached[key])]
+    missing = [index for index, key in enumerate(keys) if key not in cached]
+    if cached:
+        print(f"        - {label} CACHE HIT: Reusing {len(reused)} previously structured projects from {len(keys) - len(missing)} pages.")
+    if not missing:
+        return reused
+    missing_pages = PageBatch([batch.page_numbers[index] for index in missing], [batch.pages[index] for index in missing])
+    return reused + await _structure_pages(scheduler, cache, missing_pages)
+
+async def _structure_pages(scheduler, cache, batch: PageBatch) -> list:
+    label = f"Batch (Pages {batch.first_page}-{batch.last_page}, ~{batch.tokens} tokens)"
+    prompt = _build_structuring_prompt(batch)
+    for attempt in range(STRUCTURING_BATCH_RETRIES + 1):
         try:
-            response = model.generate_content(prompt)
+            response = await scheduler.agenerate(prompt, STRUCTURING_MODEL)
             if not response.parts:
-                print(f"        - WARNING: Gemini returned an empty response for this batch. Feedback: {response.prompt_feedback}")
-                continue
+                print(f"        - {label} WARNING: Gemini returned an empty response for this batch. Feedback: {response.prompt_feedback}")
+                return []
             cleaned_response = response.text.strip().replace("```json", "").replace("```", "")
             result = json.loads(cleaned_response)
             batch_projects = result.get("projects", [])
+            by_page = _projects_by_page(batch, batch_projects)
+            if cache and by_page is not None:
+                await cache.aset_many("structure", {_page_cache_key(page): json.dumps(projects) for page, projects in by_page.items()})
+            elif cache:
+                print(f"        - {label} WARNING: Projects not attributed to their pages; not caching this batch.")
             if batch_projects:
-                print(f"        - SUCCESS: Found {len(batch_projects)} projects in this batch.")
-                all_extracted_projects.extend(batch_projects)
+                print(f"        - {label} SUCCESS: Found {len(batch_projects)} projects in this batch.")
+            return batch_projects
+        except json.JSONDecodeError as e:
+            if len(batch.pages) > 1:
+                # Usually a response truncated at the output limit: halve the batch
+                # so each half produces a smaller response.
+                print(f"        - {label} WARNING: Unparseable response ({e}). Splitting batch and retrying halves.")
+                halves = await asyncio.gather(*[_structure_pages(scheduler, cache, half) for half in batch.split()])
+                return [project for half_projects in halves for project in half_projects]
+            print(f"        - {label} ERROR: Unparseable response (attempt {attempt + 1}/{STRUCTURING_BATCH_RETRIES + 1}). REASON: {e}")
         except Exception as e:
-            print(f"        - ERROR: Batch AI call failed. REASON: {e}")
-        if (i + batch_size) < len(pages):
-            print("        - Waiting 10 seconds before next batch...")
-            time.sleep(10)
+            print(f"        - {label} ERROR: Batch AI call failed (attempt {attempt + 1}/{STRUCTURING_BATCH_RETRIES + 1}). REASON: {e}")
+    print(f"        - {label} FAILED: Giving up after {STRUCTURING_BATCH_RETRIES + 1} attempts.")
+    return []
+
+def structure_data_with_gemini(pages: list, page_numbers: list = None) -> list:
+    print(f"  [AI Stage 2] Structuring data with Gemini using TOKEN-BUDGETED CONCURRENT BATCHES...")
+    scheduler = get_scheduler()
+    cache = get_cache()
+    batches = pack_pages(pages, page_numbers=page_numbers)
+    print(f"    -> Packed {len(pages)} pages into {len(batches)} batches of up to ~{STRUCTURING_TOKEN_BUDGET} tokens.")
+
+    async def _structure_all():
+        return await asyncio.gather(*[_structure_batch(scheduler, cache, batch) for batch in batches])
+
+    batch_results = scheduler.run_coroutine(_structure_all())
+    all_extracted_projects = [project for batch_projects in batch_results for project in batch_projects]
     print(f"\n  [AI Stage 2] Gemini structuring complete. Found a total of {len(all_extracted_projects)} projects.")
     return all_extracted_projects
 
-def run_high_accuracy_audit_pipeline(db: Session, constituency_id: int):
+def stream_structured_batches(pdf_path: str, page_numbers: list = None, require_text: bool = True, progress: ReportProgress = None):
+    """
+    Overlaps the OCR and structuring stages: pages are packed into batches as
+    soon as they are OCR'd, each batch is sent to Gemini immediately, and the
+    projects of every finished batch are yielded while later pages are still
+    being OCR'd.
+    """
+    print(f"  [AI Stage 1+2] Streaming OCR into Gemini structuring for: {pdf_path}")
+    progress = progress or ReportProgress()
+    configure_tesseract()
+    scheduler = get_scheduler()
+    cache = get_cache()
+    results = queue.Queue()
+    ocr_summary = {}
+    stop = threading.Event()
+
+    def _submit(batch: PageBatch):
+        future = asyncio.run_coroutine_threadsafe(_structure_batch(scheduler, cache, batch), scheduler.loop)
+        future.add_done_callback(results.put)
+        progress.advance("structuring", "batches_submitted")
+
+    def _ocr_stage():
+        submitted, pages_done, text_found = 0, 0, False
+        progress.start("ocr")
+        try:
+            packer = PagePacker()
+            numbers = page_numbers or range(1, get_page_count(pdf_path) + 1)
+            for page_number, page in zip(numbers, iter_page_texts(pdf_path, page_numbers=numbers)):
+                if stop.is_set():
+                    return
+                pages_done += 1
+                progress.advance("ocr", "pages")
+                text_found = text_found or bool(page.strip())
+                batch = packer.add(page, page_number)
+                if batch:
+                    _submit(batch)
+                    submitted += 1
+            batch = packer.flush()
+            if batch:
+                _submit(batch)
+                submitted += 1
+            progress.finish("ocr")
+            print(f"  [AI Stage 1] OCR Complete. Processed {pages_done} pages into {submitted} batches.")
+        except Exception as e:
+            ocr_summary["error"] = e
+        finally:
+            ocr_summary.update(submitted=submitted, text_found=text_found)
+            results.put(_OCR_DONE)
+
+    ocr_thread = threading.Thread(target=_ocr_stage, name="ocr-stage", daemon=True)
+    ocr_thread.start()
+    received, ocr_done = 0, False
+    try:
+        while not ocr_done or received < ocr_summary["submitted"]:
+            item = results.get()
+            if item is _OCR_DONE:
+                ocr_done = True
+                if "error" in ocr_summary:
+                    raise ocr_summary["error"]
+                if require_text and not ocr_summary["text_found"]:
+                    raise Exception("OCR failed: No text extracted.")
+                continue
+            received += 1
+            batch_projects = item.result()
+            progress.advance("structuring", "batches_structured")
+            progress.advance("structuring", "projects", len(batch_projects))
+            yield batch_projects
+        progress.finish("structuring")
+    finally:
+        # Stops OCR early if the consumer bailed out (e.g. a DB error).
+        stop.set()
+
+def _resolve_report_id(db: Session, constituency_id: int, report_id: int = None):
+    if report_id is not None:
+        return report_id
+    return db.query(models.Constituency.current_report_id).filter(models.Constituency.id == constituency_id).scalar()
+
+def run_high_accuracy_audit_pipeline(db: Session, constituency_id: int, report_id: int = None):
+    """
+    Audits the projects of `report_id` (the published report when None). The
+    agents only collect findings; the report's old insights are replaced with
+    them in a single transaction.
+    """
     print("\n--- Starting High-Accuracy Audit Pipeline ---")
-    projects = db.query(models.Project).filter(models.Project.constituency_id == constituency_id).all()
+    report_id = _resolve_report_id(db, constituency_id, report_id)
+    projects = db.query(models.Project).options(joinedload(models.Project.contractor)).filter(models.Project.constituency_id == constituency_id, in_current_report(models.Project.report_id, report_id)).all()
     if not projects:
         print("  -> No projects found for this constituency. Audit cannot run.")
         return
-    print("  -> Clearing old insights and evidence...")
-    db.query(models.AIInsight).filter(models.AIInsight.constituency_id == constituency_id).delete()
+    findings = (
+        _run_concentration_agent(projects)
+        + _run_vagueness_agent(constituency_id, projects)
+        + _run_duplicate_agent(db, constituency_id, report_id)
+    )
+    for insight, _ in findings:
+        insight["report_id"] = report_id
+    print("  -> Replacing old insights and evidence...")
+    old_insight_ids = db.query(models.AIInsight.id).filter(models.AIInsight.constituency_id == constituency_id, in_current_report(models.AIInsight.report_id, report_id))
+    db.query(models.Evidence).filter(models.Evidence.insight_id.in_(old_insight_ids)).delete(synchronize_session=False)
+    db.query(models.AIInsight).filter(models.AIInsight.constituency_id == constituency_id, in_current_report(models.AIInsight.report_id, report_id)).delete(synchronize_session=False)
+    insight_ids = insert_insights_with_evidence(db, findings)
     db.commit()
-    _run_concentration_agent(db, constituency_id, projects)
-    _run_vagueness_agent(db, constituency_id, projects)
+    invalidate_constituency(constituency_id)
+    generate_briefs_in_background(insight_ids)
     print("--- High-Accuracy Audit Pipeline Complete ---\n")
 
-def _run_concentration_agent(db: Session, constituency_id: int, projects: list):
-    print("  [AUDIT AGENT 1/2] Running 'Concentration Risk Analyst'...")
+def _run_concentration_agent(projects: list) -> list:
+    print("  [AUDIT AGENT 1/3] Running 'Concentration Risk Analyst'...")
     total_expenditure = sum(p.allocated_amount for p in projects if p.allocated_amount)
-    if total_expenditure < 1000: 
+    if total_expenditure < MIN_TOTAL_EXPENDITURE:
         print("  -> Total expenditure too low to analyze concentration. Skipping.")
-        return
-    contractor_spending = {}
-    for p in projects:
-        if p.contractor_ngo_name and p.allocated_amount:
-            contractor = p.contractor_ngo_name.strip()
-            if contractor:
-                contractor_spending[contractor] = contractor_spending.get(contractor, 0) + p.allocated_amount
-    for contractor, amount in contractor_spending.items():
-        percentage = (amount / total_expenditure) * 100
-        if percentage > 40:
-            print(f"  -> FOUND: High concentration for '{contractor}' ({percentage:.1f}%)")
-            finding_text = f"A single contractor, '{contractor}', received {amount:,.0f} INR, which constitutes {percentage:.1f}% of the total reported expenditure. This can be a red flag for a lack of competitive bidding."
-            insight = models.AIInsight(constituency_id=constituency_id, title="High Fund Concentration", finding=finding_text, severity="High")
-            db.add(insight)
-            db.flush()
-            for proj in [p for p in projects if p.contractor_ngo_name and p.contractor_ngo_name.strip() == contractor]:
-                db.add(models.Evidence(insight_id=insight.id, project_id=proj.id, reasoning=f"This project contributed {proj.allocated_amount:,.0f} INR to the total."))
-    db.commit()
+        return []
+    return analyze(ProjectColumns.from_projects(projects))
 
-def _run_vagueness_agent(db: Session, constituency_id: int, projects: list):
-    print("  [AUDIT AGENT 2/2] Running 'Vague Description' Agent...")
-    project_context = "\n".join([f"ID {p.id}: {p.project_description}" for p in projects if p.project_description])
-    if not project_context:
+def _run_vagueness_agent(constituency_id: int, projects: list) -> list:
+    print("  [AUDIT AGENT 2/3] Running 'Vague Description' Agent...")
+    described = [p for p in projects if p.project_description]
+    if not described:
         print("  -> No project descriptions found to analyze. Skipping.")
-        return
-    model = genai.GenerativeModel("gemini-2.0-flash")
-    prompt = f"""
-    Act as a forensic auditor. Your task is to identify projects with vague, non-specific, or suspicious descriptions from the following list.
-    A vague description lacks specific details about the work, location, or purpose. Examples: "General works", "Constituency development", "Miscellaneous repairs".
-    **List of Projects:**
-    ---
-    {project_context}
-    ---
-    Return a JSON object with a single key "vague_projects", containing a list of objects. Each object must have an "id" (the integer project ID) and a "reason" (a short explanation of why it's vague).
-    Example: {{"vague_projects": [{{"id": 123, "reason": "Description 'Constituency development' lacks specific deliverables."}}]}}
-    If no vague projects are found, return an empty list.
+        return []
+    vague_reasons = classify_descriptions([p.project_description for p in described])
+    evidence = [
+        {"project_id": p.id, "reasoning": vague_reasons[normalized]}
+        for p in described
+        for normalized in [normalize_description(p.project_description)]
+        if normalized in vague_reasons
+    ]
+    if not evidence:
+        print("  -> No vague projects found.")
+        return []
+    print(f"  -> FOUND: {len(evidence)} projects with vague descriptions.")
+    insight = {"constituency_id": constituency_id, "title": "Vague or Non-Specific Projects", "finding": f"Found {len(evidence)} projects with descriptions that lack specific details, which can make auditing their actual impact difficult.", "severity": "Medium"}
+    return [(insight, evidence)]
+
+def _run_duplicate_agent(db: Session, constituency_id: int, report_id: int) -> list:
+    print("  [AUDIT AGENT 3/3] Running 'Duplicate Billing' Agent...")
+    if report_id is None:
+        print("  -> Report is not versioned, so it is not in the duplicate index. Skipping.")
+        return []
+    findings = duplicate_findings(db, constituency_id, report_id)
+    if not findings:
+        print("  -> No duplicate projects found.")
+    return findings
+
+def _iter_project_batches(pdf_path: str, progress: ReportProgress):
+    progress.start("text_layer")
+    structured_projects_data, fallback_pages = parse_pdf_tables(pdf_path)
+    progress.advance("text_layer", "projects", len(structured_projects_data))
+    progress.finish("text_layer")
+    if structured_projects_data:
+        yield structured_projects_data
+    if fallback_pages is None or fallback_pages:
+        yield from stream_structured_batches(pdf_path, fallback_pages, require_text=not structured_projects_data, progress=progress)
+
+def ingest_report(db: Session, constituency_id: int, pdf_path: str, progress: ReportProgress = None, report_id: int = None) -> int:
     """
-    try:
-        response = model.generate_content(prompt)
-        results = json.loads(response.text.strip().replace("```json", "").replace("```", ""))
-        vague_project_info = results.get("vague_projects", [])
-        if vague_project_info:
-            print(f"  -> FOUND: {len(vague_project_info)} projects with vague descriptions.")
-            insight = models.AIInsight(constituency_id=constituency_id, title="Vague or Non-Specific Projects", finding=f"Found {len(vague_project_info)} projects with descriptions that lack specific details, which can make auditing their actual impact difficult.", severity="Medium")
-            db.add(insight)
-            db.flush()
-            for item in vague_project_info:
-                if 'id' in item and 'reason' in item:
-                    db.add(models.Evidence(insight_id=insight.id, project_id=item['id'], reasoning=item['reason']))
-        else:
-            print("  -> No vague projects found by the AI.")
+    Streams structured projects into a Building report version as batches
+    finish. Each batch is committed on its own; readers keep seeing the
+    published version until publish_report flips the pointer.
+    """
+    if not os.path.exists(pdf_path):
+        raise FileNotFoundError(f"The specified PDF file was not found: {pdf_path}")
+    progress = progress or ReportProgress()
+    if report_id is None:
+        report_id = create_report(db, constituency_id, os.path.basename(pdf_path)).id
+    staged = 0
+    contractors = ContractorResolver(db)
+    for batch_projects in _iter_project_batches(pdf_path, progress):
+        rows = prepare_project_rows(constituency_id, batch_projects, report_id)
+        if not rows: continue
+        assign_contractor_ids(contractors, rows)
+        insert_projects(db, rows)
         db.commit()
-    except Exception as e:
-        print(f"  -> Vagueness Agent CRASHED. Could not parse AI response: {e}")
-        db.rollback()
+        staged += len(rows)
+        progress.advance("insert", "projects", len(rows))
+        print(f"  [AI Stage 3] Staged {len(rows)} projects ({staged} so far) into report {report_id}.")
+    if not staged: raise Exception("Gemini Structuring failed: No projects extracted.")
+    index_report(db, report_id)
+    progress.finish("insert")
+    return staged
 
-def run_full_ai_pipeline(db: Session, constituency_id: int, pdf_path: str):
+def run_full_ai_pipeline(db: Session, constituency_id: int, pdf_path: str, progress: ReportProgress = None):
     print(f"\n--- AI ENGINE: Starting full pipeline for Constituency ID: {constituency_id} ---")
+    progress = progress or ReportProgress()
+    report = create_report(db, constituency_id, os.path.basename(pdf_path))
+    report_id = report.id
     try:
-        full_text = extract_text_from_pdf(pdf_path)
-        if not full_text: raise Exception("OCR failed: No text extracted.")
-        
-        pages = full_text.split("--- End of Page ---\n\n")
-        structured_projects_data = structure_data_with_gemini(pages)
-        if not structured_projects_data: raise Exception("Gemini Structuring failed: No projects extracted.")
-        
-        db.query(models.Project).filter(models.Project.constituency_id == constituency_id).delete()
-        db.commit()
+        ingest_report(db, constituency_id, pdf_path, progress, report_id)
 
-        for proj_data in structured_projects_data:
-            amount = 0.0
-            try: amount = float(str(proj_data.get('allocated_amount', '0')).replace(',', ''))
-            except (ValueError, TypeError): pass
-            db.add(models.Project(constituency_id=constituency_id, project_description=proj_data.get('project_description'), allocated_amount=amount, location=proj_data.get('location'), contractor_ngo_name=proj_data.get('contractor_ngo_name'), category=proj_data.get('category', 'Other')))
-        
-        constituency = db.query(models.Constituency).filter(models.Constituency.id == constituency_id).first()
-        if constituency:
-            constituency.transparency_status = "Current"
-            constituency.last_report_date = datetime.date.today()
-        db.commit()
-
-        run_high_accuracy_audit_pipeline(db, constituency_id)
+        progress.start("audit")
+        run_high_accuracy_audit_pipeline(db, constituency_id, report_id)
+        progress.finish("audit")
 
+        publish_report(db, report_id)
+        collect_garbage_in_background()
         print("--- AI ENGINE: Pipeline successful ---\n")
         return {"message": "Processing successful"}
     except Exception as e:
         db.rollback()
         print(f"--- AI ENGINE: CRITICAL FAILURE in pipeline: {e} ---")
+        mark_report_failed(db, report_id)
         constituency = db.query(models.Constituency).filter(models.Constituency.id == constituency_id).first()
-        if constituency:
+        if constituency and constituency.current_report_id is None:
             constituency.transparency_status = "Missing"
             db.commit()
-        raise e
\ No newline at end of file
+        raise e
@@ -0,0 +1,222 @@
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.models import models
+from app.constituency_resolver import AmbiguousConstituencyName, constituency_resolver
+
+# Local budget allocator for /api/v1/budget/generate-optimal. The amounts are
+# computed here, deterministically: each category starts from its historical
+# share of spending (the constituency's own rollup blended with the national
+# one), is scaled by how strongly the profile text points to that need, and is
+# then fitted into per-category bounds so the amounts always sum to the budget.
+# Gemini is only used, optionally, to word the justifications.
+
+CATEGORIES = ["Road Construction", "Education", "Health & Sanitation", "Community Infrastructure", "Drinking Water", "Other"]
+
+# Weight of the constituency's own spending pattern against the national one.
+BUDGET_OWN_HISTORY_WEIGHT = float(os.getenv("BUDGET_OWN_HISTORY_WEIGHT", "0.5"))
+# How far profile indicators move a category away from its historical share.
+BUDGET_NEED_SENSITIVITY = float(os.getenv("BUDGET_NEED_SENSITIVITY", "0.5"))
+BUDGET_MIN_SHARE = float(os.getenv("BUDGET_MIN_SHARE", "0.05"))
+BUDGET_MAX_SHARE = float(os.getenv("BUDGET_MAX_SHARE", "0.40"))
+BUDGET_MAX_OTHER_SHARE = float(os.getenv("BUDGET_MAX_OTHER_SHARE", "0.10"))
+# Amounts are rounded to this many INR; the rounding remainder goes to the largest category.
+BUDGET_ROUNDING_INR = float(os.getenv("BUDGET_ROUNDING_INR", "10000"))
+BUDGET_CACHE_SIZE = int(os.getenv("BUDGET_CACHE_SIZE", "512"))
+
+# Profile words that indicate a need, with their weight per category.
+NEED_KEYWORDS = {
+    "Road Construction": {"road": 1.0, "roads": 1.0, "connectivity": 1.0, "remote": 0.8, "hilly": 0.6, "rural": 0.5, "tribal": 0.5, "village": 0.3, "villages": 0.3, "farming": 0.3},
+    "Education": {"literacy": 1.0, "school": 1.0, "schools": 1.0, "education": 1.0, "dropout": 1.0, "students": 0.6, "youth": 0.4, "tribal": 0.3},
+    "Health & Sanitation": {"health": 1.0, "hospital": 1.0, "sanitation": 1.0, "malnutrition": 1.0, "toilet": 0.8, "toilets": 0.8, "disease": 0.8, "maternal": 0.8, "slum": 0.6, "slums": 0.6, "elderly": 0.5},
+    "Community Infrastructure": {"community": 0.8, "urban": 0.6, "streetlights": 0.6, "sports": 0.6, "market": 0.5, "hall": 0.5, "youth": 0.3},
+    "Drinking Water": {"drought": 1.2, "water": 1.0, "arid": 1.0, "fluoride": 1.0, "scarcity": 1.0, "drinking": 0.8, "borewell": 0.8, "farming": 0.3},
+    "Other": {},
+}
+# A need word preceded (within three words) by one of these counts for more: "below-average literacy".
+DEFICIENCY_WORDS = {"below", "low", "poor", "lack", "lacks", "lacking", "shortage", "scarce", "inadequate", "limited", "no", "high"}
+DEFICIENCY_BOOST = 1.5
+
+EXAMPLE_PROJECTS = {
+    "Road Construction": "All-weather road connecting outlying villages to the nearest market town.",
+    "Education": "Additional classrooms and a library for a government primary school.",
+    "Health & Sanitation": "Equipment upgrade for a primary health centre.",
+    "Community Infrastructure": "Multi-purpose community hall with solar street lighting.",
+    "Drinking Water": "Borewell with an overhead tank and piped supply for a village.",
+    "Other": "Assistive devices for persons with disabilities.",
+}
+
+class InfeasibleBudgetBounds(ValueError):
+    """The configured per-category share bounds cannot sum to the whole budget."""
+
+def profile_key(profile: str) -> str:
+    return hashlib.sha256(" ".join(profile.lower().split()).encode("utf-8")).hexdigest()
+
+def profile_needs(profile: str) -> dict:
+    """Returns {category: (score, [matched words])} for the indicators found in the profile text."""
+    words = re.findall(r"[a-z]+", profile.lower())
+    needs = {category: (0.0, []) for category in CATEGORIES}
+    for position, word in enumerate(words):
+        boost = DEFICIENCY_BOOST if DEFICIENCY_WORDS.intersection(words[max(position - 3, 0):position]) else 1.0
+        for category, keywords in NEED_KEYWORDS.items():
+            if word in keywords:
+                score, matched = needs[category]
+                needs[category] = (score + keywords[word] * boost, matched if word in matched else matched + [word])
+    return needs
+
+def _shares(rows) -> dict:
+    totals = {category: 0.0 for category in CATEGORIES}
+    for category, amount in rows:
+        totals[category if category in totals else "Other"] += amount or 0.0
+    grand_total = sum(totals.values())
+    return {category: amount / grand_total for category, amount in totals.items()} if grand_total > 0 else {}
+
+def historical_shares(db: Session, constituency_id: int = None) -> tuple:
+    """Returns ({category: share} of the constituency, {category: share} nationally), from the spending rollups."""
+    spending = models.ConstituencyCategorySpending
+    national = _shares(db.query(spending.category, func.sum(spending.total_amount)).group_by(spending.category).all())
+    own = {}
+    if constituency_id is not None:
+        own = _shares(db.query(spending.category, spending.total_amount).filter(spending.constituency_id == constituency_id).all())
+    return own, national
+
+def share_bounds() -> dict:
+    return {category: (BUDGET_MIN_SHARE, BUDGET_MAX_OTHER_SHARE if category == "Other" else BUDGET_MAX_SHARE) for category in CATEGORIES}
+
+def _bounded_shares(weights: dict) -> dict:
+    """
+    Shares summing to 1 and within the per-category bounds: each category gets
+    scale * weight clipped to its bounds, with the one scale that makes the
+    clipped shares sum to 1. Categories inside their bounds stay proportional
+    to their weights.
+    """
+    bounds = share_bounds()
+    if sum(low for low, _ in bounds.values()) > 1.0 + 1e-9 or sum(high for _, high in bounds.values()) < 1.0 - 1e-9:
+        raise InfeasibleBudgetBounds(
+            f"Per-category shares between {BUDGET_MIN_SHARE:.0%} and {BUDGET_MAX_SHARE:.0%} (Other at most {BUDGET_MAX_OTHER_SHARE:.0%}) cannot add up to the whole budget."
+        )
+
+    # A zero weight could never be scaled up to fill a budget the others cannot.
+    weights = {category: max(weights.get(category, 0.0), 1e-9) for category in CATEGORIES}
+
+    def clipped(scale: float) -> dict:
+        return {category: min(max(scale * weights[category], bounds[category][0]), bounds[category][1]) for category in CATEGORIES}
+
+    # The sum of the clipped shares grows with the scale; bisect for the scale where it reaches 1.
+    low, high = 0.0, 1.0
+    while sum(clipped(high).values()) < 1.0 and high < 1e12:
+        high *= 2
+    for _ in range(100):
+        middle = (low + high) / 2
+        if sum(clipped(middle).values()) < 1.0:
+            low = middle
+        else:
+            high = middle
+    shares = clipped(high)
+    # Absorb the bisection's last rounding error in the categories not at a bound.
+    free = [category for category in CATEGORIES if bounds[category][0] < shares[category] < bounds[category][1]]
+    if free:
+        free_total = sum(shares[category] for category in free)
+        remaining = 1.0 - sum(share for category, share in shares.items() if category not in free)
+        for category in free:
+            shares[category] = remaining * shares[category] / free_total
+    return shares
+
+def _round_amounts(shares: dict, total_budget: float) -> dict:
+    """Amounts in rounding units that sum exactly to `total_budget`; each is within one unit of its exact share."""
+    unit = BUDGET_ROUNDING_INR if total_budget >= BUDGET_ROUNDING_INR * len(CATEGORIES) else 1.0
+    exact = {category: total_budget * share / unit for category, share in shares.items()}
+    units = {category: int(value) for category, value in exact.items()}
+    # Largest remainder, so rounding never drifts from the budget by more than one unit.
+    for category in sorted(exact, key=lambda category: exact[category] - units[category], reverse=True)[:int(total_budget // unit) - sum(units.values())]:
+        units[category] += 1
+    amounts = {category: count * unit for category, count in units.items()}
+    # The part of the budget below one unit goes to the category furthest below its cap.
+    caps = {category: high * total_budget for category, (_, high) in share_bounds().items()}
+    roomiest = max(amounts, key=lambda category: caps[category] - amounts[category])
+    amounts[roomiest] += total_budget - sum(amounts.values())
+    return amounts
+
+def allocate(profile: str, total_budget: float, own_shares: dict, national_shares: dict) -> list:
+    """
+    Returns [{"category", "amount", "justification", "example_project"}]
+    with amounts summing exactly to `total_budget`.
+    """
+    needs = profile_needs(profile)
+    equal_share = 1.0 / len(CATEGORIES)
+    weights, priors = {}, {}
+    for category in CATEGORIES:
+        national = national_shares.get(category, equal_share)
+        own = own_shares.get(category, national) if own_shares else national
+        priors[category] = BUDGET_OWN_HISTORY_WEIGHT * own + (1 - BUDGET_OWN_HISTORY_WEIGHT) * national
+        # Floor so a category nobody has spent on can still be funded when the profile needs it.
+        weights[category] = max(priors[category], BUDGET_MIN_SHARE) * (1 + BUDGET_NEED_SENSITIVITY * needs[category][0])
+    shares = _bounded_shares(weights)
+    amounts = _round_amounts(shares, total_budget)
+
+    allocation = []
+    for category in CATEGORIES:
+        reasons = []
+        if needs[category][1]:
+            matched = needs[category][1]
+            reasons.append(f"the profile mentions {' and '.join([', '.join(matched[:-1]), matched[-1]] if len(matched) > 1 else matched)}")
+        if own_shares:
+            reasons.append(f"it has taken {own_shares.get(category, 0.0):.0%} of this constituency's past spending")
+        else:
+            reasons.append(f"it takes {national_shares.get(category, equal_share):.0%} of MPLADS spending nationally")
+        allocation.append({
+            "category": category,
+            "amount": round(amounts[category], 2),
+            "justification": f"{amounts[category] / total_budget:.0%} of the budget: {'; '.join(reasons)}." if total_budget else "No budget to allocate.",
+            "example_project": EXAMPLE_PROJECTS[category],
+        })
+    return allocation
+
+class BudgetCache:
+    """Small LRU of allocations keyed by (profile hash, budget, constituency, published report)."""
+
+    def __init__(self, size: int = BUDGET_CACHE_SIZE):
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+budget_cache = BudgetCache()
+
+def optimal_allocation(db: Session, constituency_name: str, profile: str, total_budget: float) -> tuple:
+    """
+    Returns (cache key, allocation). The key changes when the constituency
+    publishes a new report, so memoised allocations never outlive the
+    spending history they were computed from.
+    """
+    constituency_id = current_report_id = None
+    try:
+        constituency_id = constituency_resolver.lookup(db, constituency_name)
+    except AmbiguousConstituencyName:
+        pass
+    if constituency_id is not None:
+        current_report_id = db.query(models.Constituency.current_report_id).filter(models.Constituency.id == constituency_id).scalar()
+    key = (profile_key(profile), round(total_budget, 2), constituency_id, current_report_id)
+    allocation = budget_cache.get(key)
+    if allocation is None:
+        own_shares, national_shares = historical_shares(db, constituency_id)
+        allocation = allocate(profile, total_budget, own_shares, national_shares)
+        budget_cache.set(key, allocation)
+    return key, allocation
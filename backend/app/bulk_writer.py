@@ -0,0 +1,171 @@
+import argparse
+import csv
+import io
+import os
+import re
+import time
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from app.models import models
+
+# Set-based writes for the ingest and audit pipelines. Rows are plain dicts, not
+# ORM objects: SQLAlchemy batches them into multi-row INSERT ... VALUES
+# (with RETURNING when ids are needed), and large project loads on PostgreSQL
+# go through COPY.
+# Measure insert cost per row on the configured database (rolled back):
+#   python -m app.bulk_writer bench --rows 1000 10000 50000
+
+BULK_COPY_MIN_ROWS = int(os.getenv("BULK_COPY_MIN_ROWS", "500"))
+
+VALID_CATEGORIES = {"Road Construction", "Education", "Health & Sanitation", "Community Infrastructure", "Drinking Water", "Other"}
+# A number with the currency marker before it and the unit after it, when present.
+AMOUNT_TOKEN_PATTERN = re.compile(r"(?:(rs\.?|inr|₹)\s*)?(\d[\d,]*(?:\.\d+)?)(?:\s*(crores?|cr|lakhs?|lacs?)\b)?", re.IGNORECASE)
+UNIT_MULTIPLIERS = {"cr": 10000000.0, "crore": 10000000.0, "crores": 10000000.0, "lakh": 100000.0, "lakhs": 100000.0, "lac": 100000.0, "lacs": 100000.0}
+PROJECT_COLUMNS = ["constituency_id", "report_id", "project_description", "allocated_amount", "location", "contractor_ngo_name", "contractor_id", "category"]
+
+def _amount_token_rank(match) -> tuple:
+    currency, number, unit = match.groups()
+    return (currency is not None, unit is not None, "," in number)
+
+def parse_amount(value) -> float:
+    """
+    Parses amounts such as 500000, "5,00,000", "Rs. 5,00,000/-" or "5.5 lakh".
+    Other numbers in the text ("Phase 2 work, Rs. 5,00,000/-") are skipped: the
+    amount is the number after a currency marker, else the one with a
+    lakh/crore unit, else one with digit grouping, else the last number.
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not value:
+        return 0.0
+    matches = list(AMOUNT_TOKEN_PATTERN.finditer(str(value)))
+    if not matches:
+        return 0.0
+    # max() keeps the first of equal ranks, so scan from the end for "last number wins".
+    _, number, unit = max(reversed(matches), key=_amount_token_rank).groups()
+    try:
+        amount = float(number.replace(",", ""))
+    except ValueError:
+        return 0.0
+    return amount * UNIT_MULTIPLIERS.get(unit.lower(), 1.0) if unit else amount
+
+def _clean_text(value):
+    if value is None:
+        return None
+    text = " ".join(str(value).split())
+    return text or None
+
+def prepare_project_rows(constituency_id: int, projects_data: list, report_id: int = None) -> list:
+    """
+    Validates and normalises a batch of structured projects in one pass.
+    Rows with neither a description nor an amount are dropped.
+    """
+    rows = []
+    for proj_data in projects_data:
+        description = _clean_text(proj_data.get('project_description'))
+        amount = parse_amount(proj_data.get('allocated_amount'))
+        if not description and not amount:
+            continue
+        category = _clean_text(proj_data.get('category'))
+        rows.append({
+            "constituency_id": constituency_id,
+            "report_id": report_id,
+            "project_description": description,
+            "allocated_amount": amount,
+            "location": _clean_text(proj_data.get('location')),
+            "contractor_ngo_name": _clean_text(proj_data.get('contractor_ngo_name')),
+            "contractor_id": None,
+            "category": category if category in VALID_CATEGORIES else "Other",
+        })
+    return rows
+
+def _log_timing(label: str, count: int, started_at: float):
+    elapsed = time.perf_counter() - started_at
+    per_row = (elapsed / count * 1e6) if count else 0
+    print(f"  [DB] {label}: {count} rows in {elapsed * 1000:.1f} ms ({per_row:.0f} us/row).")
+
+def _copy_projects(db: Session, rows: list):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(["" if row[column] is None else row[column] for column in PROJECT_COLUMNS])
+    buffer.seek(0)
+    # Runs on the session's own connection, so COPY is part of its transaction.
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY projects ({', '.join(PROJECT_COLUMNS)}) FROM STDIN WITH (FORMAT csv, NULL '')", buffer)
+    finally:
+        cursor.close()
+
+def insert_projects(db: Session, rows: list, return_ids: bool = False):
+    """Inserts prepared project rows; returns their ids (in row order) if asked."""
+    if not rows:
+        return [] if return_ids else None
+    started_at = time.perf_counter()
+    if not return_ids and len(rows) >= BULK_COPY_MIN_ROWS and db.get_bind().dialect.name == "postgresql":
+        _copy_projects(db, rows)
+        _log_timing("COPY projects", len(rows), started_at)
+        return None
+    if return_ids:
+        ids = list(db.scalars(insert(models.Project).returning(models.Project.id, sort_by_parameter_order=True), rows))
+        _log_timing("Inserted projects", len(rows), started_at)
+        return ids
+    db.execute(insert(models.Project), rows)
+    _log_timing("Inserted projects", len(rows), started_at)
+    return None
+
+def insert_insights_with_evidence(db: Session, findings: list):
+    """
+    `findings` is a list of (insight_row, evidence_rows) pairs. Inserts all
+    insights in one statement, then links and inserts all evidence in another.
+    """
+    if not findings:
+        return []
+    started_at = time.perf_counter()
+    insight_ids = list(db.scalars(insert(models.AIInsight).returning(models.AIInsight.id, sort_by_parameter_order=True), [insight for insight, _ in findings]))
+    evidence_rows = [
+        {**evidence, "insight_id": insight_id}
+        for insight_id, (_, evidence_list) in zip(insight_ids, findings)
+        for evidence in evidence_list
+    ]
+    if evidence_rows:
+        db.execute(insert(models.Evidence), evidence_rows)
+    _log_timing(f"Inserted {len(insight_ids)} insights with evidence", len(evidence_rows), started_at)
+    return insight_ids
+
+def benchmark(db: Session, sizes: list) -> list:
+    """Times insert_projects for each batch size inside a transaction that is rolled back. Returns (rows, us/row)."""
+    results = []
+    try:
+        constituency = models.Constituency(constituency_name=f"Bulk writer benchmark {time.time_ns()}", state="Benchmark")
+        db.add(constituency)
+        db.flush()
+        for size in sizes:
+            rows = prepare_project_rows(constituency.id, [
+                {"project_description": f"Construction of CC road, ward {index}", "allocated_amount": f"Rs. {index % 90 + 10},00,000/-", "location": f"Ward {index % 50}", "contractor_ngo_name": f"Contractor {index % 200}", "category": "Road Construction"}
+                for index in range(size)
+            ])
+            started_at = time.perf_counter()
+            insert_projects(db, rows)
+            results.append((size, (time.perf_counter() - started_at) / size * 1e6))
+    finally:
+        db.rollback()
+    return results
+
+def main():
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Bulk writer utilities.")
+    parser.add_argument("command", choices=["bench"], help="Time project inserts at several batch sizes; nothing is kept.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 50000], help="Batch sizes to time.")
+    args = parser.parse_args()
+    db = SessionLocal()
+    try:
+        dialect = db.get_bind().dialect.name
+        for size, per_row in benchmark(db, args.rows):
+            print(f"{dialect}: {size} rows at {per_row:.1f} us/row")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+import argparse
+import os
+import time
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.models import models
+from app.reports import in_current_report
+from app.bulk_writer import insert_insights_with_evidence
+from app.dashboard_cache import invalidate_constituencies
+
+# Columnar concentration-risk analytics. Projects are loaded once into NumPy
+# arrays and every metric is computed with grouped array operations
+# (bincount / lexsort) over (constituency, contractor, ...) codes, so one
+# constituency and the whole country cost the same code path.
+# Batch run over every constituency:  python -m app.concentration audit
+
+# A single contractor above this share of a constituency's spending is flagged.
+CONCENTRATION_SHARE_THRESHOLD = float(os.getenv("CONCENTRATION_SHARE_THRESHOLD", "0.40"))
+# Herfindahl-Hirschman index (0-10000) above which the contractor market is "highly concentrated".
+CONCENTRATION_HHI_THRESHOLD = float(os.getenv("CONCENTRATION_HHI_THRESHOLD", "2500"))
+CONCENTRATION_TOP_K = int(os.getenv("CONCENTRATION_TOP_K", "3"))
+# Two projects of the same contractor at the same location whose amounts differ
+# by at most this fraction are treated as a possible split invoice.
+SPLIT_INVOICE_TOLERANCE = float(os.getenv("SPLIT_INVOICE_TOLERANCE", "0.01"))
+# Robust z-score (on log amounts, per constituency and category) above which a project is an outlier.
+OUTLIER_Z_THRESHOLD = float(os.getenv("OUTLIER_Z_THRESHOLD", "3.5"))
+OUTLIER_MIN_GROUP_SIZE = int(os.getenv("OUTLIER_MIN_GROUP_SIZE", "8"))
+MIN_TOTAL_EXPENDITURE = 1000
+
+# Insight titles owned by this engine; the batch job replaces exactly these.
+CONCENTRATION_TITLE = "High Fund Concentration"
+MARKET_TITLE = "Concentrated Contractor Market"
+SPLIT_INVOICE_TITLE = "Possible Split Invoices"
+OUTLIER_TITLE = "Unusually Large Projects"
+ENGINE_TITLES = (CONCENTRATION_TITLE, MARKET_TITLE, SPLIT_INVOICE_TITLE, OUTLIER_TITLE)
+
+def _encode(values: list):
+    """Maps values to dense integer codes; None and blank strings get -1."""
+    cleaned = [value.strip() if isinstance(value, str) and value.strip() else None for value in values]
+    labels = sorted({value for value in cleaned if value is not None})
+    index = {label: code for code, label in enumerate(labels)}
+    return np.array([index[value] if value is not None else -1 for value in cleaned], dtype=np.int64), labels
+
+def _encode_contractors(contractor_ids: list, names: list):
+    """
+    Codes contractors by entity id. Projects not linked to a contractor entity
+    yet fall back to their extracted name. Returns (codes, display labels).
+    """
+    index, labels, codes = {}, [], []
+    for contractor_id, name in zip(contractor_ids, names):
+        name = name.strip() if isinstance(name, str) else None
+        key = contractor_id if contractor_id is not None else name
+        if key is None or (contractor_id is None and not name):
+            codes.append(-1)
+            continue
+        if key not in index:
+            index[key] = len(labels)
+            labels.append(name or f"Contractor #{contractor_id}")
+        codes.append(index[key])
+    return np.array(codes, dtype=np.int64), labels
+
+def _group_codes(*codes):
+    """Combines several code arrays into one dense group code per row."""
+    stacked = np.stack(codes, axis=1)
+    unique, inverse = np.unique(stacked, axis=0, return_inverse=True)
+    return inverse.reshape(-1), unique
+
+class ProjectColumns:
+    """Column arrays for a set of projects (one row per project)."""
+
+    def __init__(self, rows: list):
+        # rows: (project_id, constituency_id, allocated_amount, contractor_id, contractor name, location, category)
+        self.size = len(rows)
+        self.project_ids = np.array([row[0] for row in rows], dtype=np.int64)
+        self.constituency_ids = np.array([row[1] for row in rows], dtype=np.int64)
+        self.amounts = np.array([row[2] or 0.0 for row in rows], dtype=np.float64)
+        self.contractors, self.contractor_labels = _encode_contractors([row[3] for row in rows], [row[4] for row in rows])
+        self.locations, self.location_labels = _encode([row[5] for row in rows])
+        self.categories, self.category_labels = _encode([row[6] or "Other" for row in rows])
+
+    @classmethod
+    def from_projects(cls, projects: list):
+        return cls([
+            (p.id, p.constituency_id, p.allocated_amount, p.contractor_id, p.contractor.canonical_name if p.contractor else p.contractor_ngo_name, p.location, p.category)
+            for p in projects
+        ])
+
+    @classmethod
+    def from_db(cls, db: Session, constituency_ids: list = None):
+        """Loads the projects of each constituency's published report in one query."""
+        query = db.query(
+            models.Project.id, models.Project.constituency_id, models.Project.allocated_amount, models.Project.contractor_id,
+            func.coalesce(models.Contractor.canonical_name, models.Project.contractor_ngo_name), models.Project.location, models.Project.category,
+        ).join(models.Constituency, models.Constituency.id == models.Project.constituency_id).outerjoin(
+            models.Contractor, models.Contractor.id == models.Project.contractor_id,
+        ).filter(
+            in_current_report(models.Project.report_id, models.Constituency.current_report_id)
+        )
+        if constituency_ids is not None:
+            query = query.filter(models.Project.constituency_id.in_(constituency_ids))
+        return cls(query.all())
+
+def _insight(constituency_id: int, title: str, finding: str, severity: str) -> dict:
+    return {"constituency_id": constituency_id, "title": title, "finding": finding, "severity": severity}
+
+def _rows_by_group(group_of_row: np.ndarray, selected_groups: np.ndarray) -> dict:
+    """Returns {group: row indices} for the selected groups in a single sort."""
+    rows = np.nonzero(np.isin(group_of_row, selected_groups))[0]
+    rows = rows[np.argsort(group_of_row[rows], kind="stable")]
+    groups, starts = np.unique(group_of_row[rows], return_index=True)
+    return {int(group): chunk for group, chunk in zip(groups, np.split(rows, starts[1:]))}
+
+def _concentration_findings(columns: ProjectColumns, constituency_totals: np.ndarray) -> list:
+    findings = []
+    has_contractor = (columns.contractors >= 0) & (columns.amounts > 0)
+    if not has_contractor.any():
+        return findings
+    rows = np.nonzero(has_contractor)[0]
+    pair_of_row, pairs = _group_codes(columns.constituency_ids[rows], columns.contractors[rows])
+    pair_totals = np.bincount(pair_of_row, weights=columns.amounts[rows])
+    pair_constituencies, pair_contractors = pairs[:, 0], pairs[:, 1]
+    shares = pair_totals / constituency_totals[pair_constituencies]
+    valid = constituency_totals[pair_constituencies] >= MIN_TOTAL_EXPENDITURE
+
+    # Per-contractor share above the threshold.
+    flagged = np.nonzero(valid & (shares > CONCENTRATION_SHARE_THRESHOLD))[0]
+    row_groups = np.full(columns.size, -1, dtype=np.int64)
+    row_groups[rows] = pair_of_row
+    evidence_rows = _rows_by_group(row_groups, flagged)
+    for pair in flagged:
+        contractor = columns.contractor_labels[pair_contractors[pair]]
+        amount, percentage = pair_totals[pair], shares[pair] * 100
+        print(f"  -> FOUND: High concentration for '{contractor}' ({percentage:.1f}%)")
+        finding_text = f"A single contractor, '{contractor}', received {amount:,.0f} INR, which constitutes {percentage:.1f}% of the total reported expenditure. This can be a red flag for a lack of competitive bidding."
+        evidence = [{"project_id": int(columns.project_ids[row]), "reasoning": f"This project contributed {columns.amounts[row]:,.0f} INR to the total."} for row in evidence_rows[int(pair)]]
+        findings.append((_insight(int(pair_constituencies[pair]), CONCENTRATION_TITLE, finding_text, "High"), evidence))
+
+    # HHI and top-k share per constituency: rank contractors by share within each constituency.
+    hhi = np.bincount(pair_constituencies, weights=(shares * 100) ** 2, minlength=len(constituency_totals))
+    order = np.lexsort((-shares, pair_constituencies))
+    sorted_constituencies = pair_constituencies[order]
+    first_of_group = np.r_[True, sorted_constituencies[1:] != sorted_constituencies[:-1]]
+    group_starts = np.maximum.accumulate(np.where(first_of_group, np.arange(len(order)), 0))
+    ranks = np.arange(len(order)) - group_starts
+    top = order[ranks < CONCENTRATION_TOP_K]
+    top_k_share = np.bincount(pair_constituencies[top], weights=shares[top], minlength=len(constituency_totals))
+    contractor_counts = np.bincount(pair_constituencies, minlength=len(constituency_totals))
+    # Constituencies with a single dominant contractor already have a finding for it.
+    dominated = np.zeros(len(constituency_totals), dtype=bool)
+    dominated[pair_constituencies[flagged]] = True
+    market_flagged = np.nonzero((hhi > CONCENTRATION_HHI_THRESHOLD) & (constituency_totals >= MIN_TOTAL_EXPENDITURE) & (contractor_counts > 1) & ~dominated)[0]
+    # Largest project of every contractor, for the market finding's evidence.
+    by_pair = np.lexsort((-columns.amounts[rows], pair_of_row))
+    pair_starts = np.r_[True, pair_of_row[by_pair][1:] != pair_of_row[by_pair][:-1]]
+    largest_row = rows[by_pair[pair_starts]]
+    top_by_constituency = {}
+    for pair in top:
+        top_by_constituency.setdefault(int(pair_constituencies[pair]), []).append(pair)
+    for constituency in market_flagged:
+        top_pairs = top_by_constituency[int(constituency)]
+        names = ", ".join(f"'{columns.contractor_labels[pair_contractors[pair]]}' ({shares[pair] * 100:.1f}%)" for pair in top_pairs)
+        print(f"  -> FOUND: Concentrated contractor market (HHI {hhi[constituency]:,.0f})")
+        finding_text = f"Spending is spread across only a few contractors: the Herfindahl-Hirschman index is {hhi[constituency]:,.0f} (above {CONCENTRATION_HHI_THRESHOLD:,.0f} is highly concentrated) and the top {len(top_pairs)} contractors, {names}, received {top_k_share[constituency] * 100:.1f}% of the funds."
+        evidence = [{"project_id": int(columns.project_ids[largest_row[pair]]), "reasoning": f"Largest project of '{columns.contractor_labels[pair_contractors[pair]]}', which holds {shares[pair] * 100:.1f}% of the spending."} for pair in top_pairs]
+        findings.append((_insight(int(constituency), MARKET_TITLE, finding_text, "Medium"), evidence))
+    return findings
+
+def _split_invoice_findings(columns: ProjectColumns) -> list:
+    rows = np.nonzero((columns.contractors >= 0) & (columns.locations >= 0) & (columns.amounts > 0))[0]
+    if len(rows) < 2:
+        return []
+    group_of_row, groups = _group_codes(columns.constituency_ids[rows], columns.contractors[rows], columns.locations[rows])
+    order = np.lexsort((columns.amounts[rows], group_of_row))
+    sorted_rows, sorted_groups = rows[order], group_of_row[order]
+    amounts = columns.amounts[sorted_rows]
+    # Neighbours after sorting by (group, amount) are the closest amounts within a group.
+    close = (sorted_groups[1:] == sorted_groups[:-1]) & ((amounts[1:] - amounts[:-1]) <= SPLIT_INVOICE_TOLERANCE * amounts[1:])
+    if not close.any():
+        return []
+    in_cluster = np.zeros(len(sorted_rows), dtype=bool)
+    in_cluster[:-1] |= close
+    in_cluster[1:] |= close
+    findings = []
+    flagged_groups = np.unique(sorted_groups[in_cluster])
+    for group in flagged_groups:
+        cluster = sorted_rows[in_cluster & (sorted_groups == group)]
+        constituency, contractor, location = groups[group]
+        contractor_name, location_name = columns.contractor_labels[contractor], columns.location_labels[location]
+        total = columns.amounts[cluster].sum()
+        print(f"  -> FOUND: {len(cluster)} near-identical payments to '{contractor_name}' at '{location_name}'")
+        finding_text = f"'{contractor_name}' has {len(cluster)} projects at '{location_name}' with near-identical amounts totalling {total:,.0f} INR. Splitting one work into several smaller bills can be used to stay under approval or tendering limits."
+        evidence = [{"project_id": int(columns.project_ids[row]), "reasoning": f"{columns.amounts[row]:,.0f} INR to the same contractor at the same location."} for row in cluster]
+        findings.append((_insight(int(constituency), SPLIT_INVOICE_TITLE, finding_text, "High"), evidence))
+    return findings
+
+def _outlier_findings(columns: ProjectColumns) -> list:
+    rows = np.nonzero(columns.amounts > 0)[0]
+    if not len(rows):
+        return []
+    group_of_row, groups = _group_codes(columns.constituency_ids[rows], columns.categories[rows])
+    log_amounts = np.log10(columns.amounts[rows])
+    # Per-group median and median absolute deviation via a (group, value) sort.
+    order = np.lexsort((log_amounts, group_of_row))
+    counts = np.bincount(group_of_row)
+    starts = np.r_[0, np.cumsum(counts)[:-1]]
+    sorted_values = log_amounts[order]
+    medians = (sorted_values[starts + (counts - 1) // 2] + sorted_values[starts + counts // 2]) / 2
+    deviations = np.abs(log_amounts - medians[group_of_row])
+    order = np.lexsort((deviations, group_of_row))
+    sorted_deviations = deviations[order]
+    mads = (sorted_deviations[starts + (counts - 1) // 2] + sorted_deviations[starts + counts // 2]) / 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z_scores = 0.6745 * (log_amounts - medians[group_of_row]) / mads[group_of_row]
+    flagged = (counts[group_of_row] >= OUTLIER_MIN_GROUP_SIZE) & (mads[group_of_row] > 0) & (z_scores > OUTLIER_Z_THRESHOLD)
+    if not flagged.any():
+        return []
+    findings = []
+    outliers_by_constituency = {}
+    for index in np.nonzero(flagged)[0]:
+        outliers_by_constituency.setdefault(int(groups[group_of_row[index]][0]), []).append(index)
+    for constituency, indices in outliers_by_constituency.items():
+        print(f"  -> FOUND: {len(indices)} projects with unusually large amounts for their category")
+        finding_text = f"Found {len(indices)} projects whose amounts are far above what this constituency typically spends on the same category. They may be data-entry errors or deserve a closer look at their cost estimates."
+        evidence = []
+        for index in indices:
+            row = rows[index]
+            category = columns.category_labels[columns.categories[row]]
+            typical = 10 ** medians[group_of_row[index]]
+            evidence.append({"project_id": int(columns.project_ids[row]), "reasoning": f"{columns.amounts[row]:,.0f} INR against a typical {typical:,.0f} INR for '{category}' projects."})
+        findings.append((_insight(constituency, OUTLIER_TITLE, finding_text, "Medium"), evidence))
+    return findings
+
+def analyze(columns: ProjectColumns) -> list:
+    """Computes every concentration metric and returns (insight_row, evidence_rows) findings."""
+    if not columns.size:
+        return []
+    constituency_totals = np.bincount(columns.constituency_ids, weights=columns.amounts)
+    return (
+        _concentration_findings(columns, constituency_totals)
+        + _split_invoice_findings(columns)
+        + _outlier_findings(columns)
+    )
+
+def run_concentration_audit(db: Session, constituency_ids: list = None) -> int:
+    """
+    Batch job: recomputes the engine's insights for the published report of
+    every constituency (or of `constituency_ids`) and replaces them in one
+    transaction. Returns the number of insights written.
+    """
+    started_at = time.perf_counter()
+    columns = ProjectColumns.from_db(db, constituency_ids)
+    findings = analyze(columns)
+    query = db.query(models.Constituency.id, models.Constituency.current_report_id)
+    if constituency_ids is not None:
+        query = query.filter(models.Constituency.id.in_(constituency_ids))
+    current_reports = dict(query.all())
+    for insight, _ in findings:
+        insight["report_id"] = current_reports.get(insight["constituency_id"])
+
+    stale_insights = db.query(models.AIInsight.id).join(models.Constituency, models.Constituency.id == models.AIInsight.constituency_id).filter(
+        models.AIInsight.title.in_(ENGINE_TITLES),
+        in_current_report(models.AIInsight.report_id, models.Constituency.current_report_id),
+    )
+    if constituency_ids is not None:
+        stale_insights = stale_insights.filter(models.AIInsight.constituency_id.in_(constituency_ids))
+    stale_ids = [row.id for row in stale_insights]
+    if stale_ids:
+        db.query(models.Evidence).filter(models.Evidence.insight_id.in_(stale_ids)).delete(synchronize_session=False)
+        db.query(models.AIInsight).filter(models.AIInsight.id.in_(stale_ids)).delete(synchronize_session=False)
+    insert_insights_with_evidence(db, findings)
+    db.commit()
+    invalidate_constituencies(list(current_reports))
+    elapsed = time.perf_counter() - started_at
+    print(f"  [Concentration] Audited {columns.size} projects across {len(current_reports)} constituencies: {len(findings)} findings in {elapsed:.2f}s.")
+    return len(findings)
+
+def main():
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Run the concentration-risk audit over published reports.")
+    parser.add_argument("command", choices=["audit"], help="Recompute concentration insights.")
+    parser.add_argument("--constituency-id", type=int, action="append", help="Limit the run to these constituencies (repeatable).")
+    args = parser.parse_args()
+    db = SessionLocal()
+    try:
+        run_concentration_audit(db, args.constituency_id)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
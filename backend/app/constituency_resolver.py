@@ -0,0 +1,170 @@
+import os
+import re
+import threading
+import time
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.models import models
+
+# Resolves free-form constituency names (report filenames, dashboard URLs) to
+# constituency ids. Names are reduced to compact keys, with and without the
+# reservation suffix, and stored in a character trie, so a lookup walks the
+# input once instead of normalising and comparing every constituency. The trie
+# is built once per process and rebuilt when the constituencies table changes.
+
+# How often (at most) the resolver checks whether constituencies changed.
+CONSTITUENCY_RESOLVER_REFRESH_SECONDS = float(os.getenv("CONSTITUENCY_RESOLVER_REFRESH_SECONDS", "60"))
+
+def base_name(name: str) -> str:
+    """Drops the reservation suffix: "Bellary (ST)" -> "Bellary"."""
+    return name.split("(")[0].strip()
+
+def slugify(name: str) -> str:
+    # The suffix is kept: "Bellary" and "Bellary (ST)" must not share a slug.
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+def lookup_key(text: str) -> str:
+    """Compact form of a name or slug: "Bellary (ST)", "bellary-st" -> "bellaryst"."""
+    return re.sub(r"[^a-z0-9]+", "", text.lower())
+
+def name_key(name: str) -> str:
+    return lookup_key(base_name(name))
+
+class AmbiguousConstituencyName(ValueError):
+    def __init__(self, text: str, candidates: list):
+        super().__init__(f"'{text}' matches several constituencies: {', '.join(candidates)}")
+        self.candidates = candidates
+
+class _Node:
+    __slots__ = ("children", "entries")
+
+    def __init__(self):
+        self.children = {}
+        # (name, constituency id, whether the key is the full name rather than the name without its suffix)
+        self.entries = []
+
+class ConstituencyTrie:
+    def __init__(self, constituencies: list):
+        # constituencies: (id, constituency_name)
+        self.root = _Node()
+        for constituency_id, name in constituencies:
+            full_key = lookup_key(name)
+            for key in {name_key(name), full_key}:
+                if not key:
+                    continue
+                node = self.root
+                for char in key:
+                    node = node.children.setdefault(char, _Node())
+                node.entries.append((name, constituency_id, key == full_key))
+
+    def _pick(self, node: _Node, text: str):
+        """The constituency of a node's key. "Bellary" prefers the constituency named exactly that over "Bellary (ST)"."""
+        exact = [entry for entry in node.entries if entry[2]]
+        entries = exact if len(exact) == 1 else node.entries
+        ids = {constituency_id for _, constituency_id, _ in entries}
+        if len(ids) > 1:
+            raise AmbiguousConstituencyName(text, sorted({name for name, _, _ in entries}))
+        return ids.pop()
+
+    def _matches_below(self, node: _Node) -> list:
+        matches, stack = {}, [node]
+        while stack:
+            current = stack.pop()
+            for name, constituency_id, _ in current.entries:
+                matches[constituency_id] = name
+            stack.extend(current.children.values())
+        return sorted((name, constituency_id) for constituency_id, name in matches.items())
+
+    def lookup(self, text: str):
+        """
+        Returns the id of the constituency whose name, with or without its
+        reservation suffix, or slug is exactly `text`, or None.
+        Raises AmbiguousConstituencyName when several names share that key.
+        """
+        node = self.root
+        for char in lookup_key(text):
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return self._pick(node, text) if node.entries else None
+
+    def resolve(self, text: str, allow_partial: bool = True):
+        """
+        Returns the constituency id `text` refers to, or None. Meant for
+        filenames; use lookup() for names typed or linked by users.
+        - Names that are prefixes of `text` (e.g. a filename "Bagalkot_2018.pdf")
+          match; the longest such name wins ("Bangalore Central" over "Bangalore").
+        - Otherwise, if `allow_partial`, `text` may be the start of a single name.
+        Raises AmbiguousConstituencyName when `text` is the start of several
+        names, or names several constituencies that differ only by suffix.
+        """
+        node, longest = self.root, None
+        for char in lookup_key(text):
+            node = node.children.get(char)
+            if node is None:
+                break
+            if node.entries:
+                longest = node
+        if longest is not None:
+            return self._pick(longest, text)
+        if node is None or node is self.root or not allow_partial:
+            return None
+        matches = self._matches_below(node)
+        if len(matches) > 1:
+            raise AmbiguousConstituencyName(text, [name for name, _ in matches])
+        return matches[0][1] if matches else None
+
+class ConstituencyResolver:
+    """Process-wide trie over the constituencies table, rebuilt when constituencies are added, removed or renamed."""
+
+    def __init__(self):
+        self.trie = None
+        self.signature = None
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+
+    def _signature(self, db: Session):
+        # data_version is bumped on rename, which changes neither the count nor the max id.
+        return tuple(db.query(func.count(models.Constituency.id), func.max(models.Constituency.id), func.coalesce(func.sum(models.Constituency.data_version), 0)).one())
+
+    def _ensure_slugs(self, db: Session):
+        # Read sessions may be on a replica; the next write session fills the slugs in.
+        if db.info.get("read_only"):
+            return
+        # Also rewrites slugs from before they kept the reservation suffix.
+        stale = [constituency for constituency in db.query(models.Constituency) if constituency.slug != slugify(constituency.constituency_name)]
+        for constituency in stale:
+            constituency.slug = slugify(constituency.constituency_name)
+        if stale:
+            db.commit()
+
+    def get_trie(self, db: Session) -> ConstituencyTrie:
+        now = time.monotonic()
+        # The lock is never held across a query: async handlers call this through
+        # AsyncSession.run_sync, where a query lets other requests run on the same
+        # thread. Two concurrent refreshes just build the same trie twice.
+        with self.lock:
+            if self.trie is not None and now - self.checked_at < CONSTITUENCY_RESOLVER_REFRESH_SECONDS:
+                return self.trie
+            trie, signature = self.trie, self.signature
+        current = self._signature(db)
+        if trie is None or current != signature:
+            self._ensure_slugs(db)
+            rows = db.query(models.Constituency.id, models.Constituency.constituency_name).all()
+            trie = ConstituencyTrie(rows)
+            print(f"  [Resolver] Indexed {len(rows)} constituency names.")
+        with self.lock:
+            self.trie, self.signature, self.checked_at = trie, current, now
+        return trie
+
+    def invalidate(self):
+        with self.lock:
+            self.trie = None
+
+    def resolve(self, db: Session, text: str, allow_partial: bool = True):
+        return self.get_trie(db).resolve(text, allow_partial)
+
+    def lookup(self, db: Session, text: str):
+        return self.get_trie(db).lookup(text)
+
+constituency_resolver = ConstituencyResolver()
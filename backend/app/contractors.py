@@ -0,0 +1,260 @@
+import argparse
+import os
+import re
+from collections import Counter
+from functools import lru_cache
+from sqlalchemy import bindparam, insert, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.models import models
+
+# Contractor entity resolution. Extracted names are normalised (case,
+# punctuation, "M/s", legal suffixes, plurals) and matched against existing
+# contractors: exact normalised name first, then a fuzzy match restricted to
+# contractors sharing enough character trigrams of the distinctive name tokens
+# (contractor_block_keys), so each lookup compares against a handful of names
+# rather than the whole table, and OCR errors in the first letters still find
+# their candidates. Two names match only token by token, each token within a
+# number of edits that grows with its length: "Sai" and "Sri" never merge.
+# Backfill projects ingested before contractor ids existed:  python -m app.contractors backfill
+
+# Each token may differ by one edit (insert, delete, substitute) per this many characters.
+CONTRACTOR_CHARS_PER_EDIT = int(os.getenv("CONTRACTOR_CHARS_PER_EDIT", "5"))
+BLOCK_KEY_SIZE = 3
+
+HONORIFIC_PREFIXES = ("m s ", "messrs ", "shri ", "sri ", "smt ")
+LEGAL_SUFFIXES = {"pvt", "private", "ltd", "limited", "llp", "inc", "co", "company", "corp", "corporation", "the", "firm"}
+# Words shared by many unrelated firms (in normalised, singular form). They are
+# still compared, but do not make two names candidates for each other.
+BUSINESS_WORDS = {
+    "and", "son", "sons", "brother", "associate", "agency", "builder", "construction", "contractor", "developer", "engineer",
+    "engineering", "enterprise", "group", "industrie", "infra", "infrastructure", "service", "society", "trader", "trading", "work",
+}
+
+def normalize_contractor_name(name: str) -> str:
+    text = (name or "").lower().replace("&", " and ")
+    text = re.sub(r"[^a-z0-9]+", " ", text).strip()
+    for prefix in HONORIFIC_PREFIXES:
+        if text.startswith(prefix):
+            text = text[len(prefix):]
+    tokens = []
+    letters = ""
+    for token in text.split():
+        # "A.B.C." and "ABC" are the same name.
+        if len(token) == 1 and token.isalpha():
+            letters += token
+            continue
+        if letters:
+            tokens.append(letters)
+            letters = ""
+        if token in LEGAL_SUFFIXES:
+            continue
+        if len(token) > 4 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    if letters:
+        tokens.append(letters)
+    return " ".join(tokens)
+
+def _allowed_edits(token: str) -> int:
+    return len(token) // CONTRACTOR_CHARS_PER_EDIT
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance of `a` and `b`, or limit + 1 as soon as it exceeds `limit`."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i]
+        for j, char_b in enumerate(b, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return min(previous[-1], limit + 1)
+
+@lru_cache(maxsize=65536)
+def _is_business_word(token: str) -> bool:
+    # Misread business words ("bulder") must not count as distinctive either.
+    return token in BUSINESS_WORDS or any(_edit_distance(token, word, _allowed_edits(token)) <= _allowed_edits(token) for word in BUSINESS_WORDS)
+
+def _distinctive_tokens(normalized: str) -> list:
+    tokens = normalized.split()
+    return [token for token in tokens if not _is_business_word(token)] or tokens
+
+def block_keys(normalized: str) -> set:
+    """Padded character trigrams of the distinctive tokens: "#sa", "sai", "ai#"."""
+    keys = set()
+    for token in _distinctive_tokens(normalized):
+        padded = f"#{token}#"
+        keys.update(padded[i:i + BLOCK_KEY_SIZE] for i in range(len(padded) - BLOCK_KEY_SIZE + 1))
+    return keys
+
+def _min_shared_keys(normalized: str) -> int:
+    # One edit changes at most BLOCK_KEY_SIZE trigrams of its token.
+    budget = sum(_allowed_edits(token) for token in _distinctive_tokens(normalized))
+    return max(len(block_keys(normalized)) - BLOCK_KEY_SIZE * budget, 1)
+
+def name_distance(a: str, b: str):
+    """Total edits between two normalised names if every token is within its allowance, else None."""
+    tokens_a, tokens_b = a.split(), b.split()
+    if len(tokens_a) != len(tokens_b):
+        return None
+    total = 0
+    for token_a, token_b in zip(tokens_a, tokens_b):
+        limit = _allowed_edits(min(token_a, token_b, key=len))
+        distance = _edit_distance(token_a, token_b, limit)
+        if distance > limit:
+            return None
+        total += distance
+    return total
+
+def _best_match(normalized: str, candidates: dict):
+    """Returns the value of the closest matching candidate {normalized_name: value}, or None."""
+    best_value, best_distance = None, None
+    for candidate, value in candidates.items():
+        distance = name_distance(normalized, candidate)
+        if distance is not None and (best_distance is None or distance < best_distance):
+            best_value, best_distance = value, distance
+    return best_value
+
+def _insert_ignoring_conflicts(db: Session, model, rows: list, index_elements: list):
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        # Another worker may create the same rows concurrently.
+        insert_fn = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        db.execute(insert_fn(model).on_conflict_do_nothing(index_elements=index_elements), rows)
+    else:
+        db.execute(insert(model), rows)
+
+def index_contractors(db: Session, contractors: dict):
+    """Adds the block keys of {contractor_id: normalized_name}. Does not commit."""
+    rows = [{"key": key, "contractor_id": contractor_id} for contractor_id, normalized in contractors.items() for key in block_keys(normalized)]
+    if rows:
+        _insert_ignoring_conflicts(db, models.ContractorBlockKey, rows, [models.ContractorBlockKey.key, models.ContractorBlockKey.contractor_id])
+
+class ContractorResolver:
+    """Resolves raw contractor names to contractor ids, creating entities as needed. Does not commit."""
+
+    def __init__(self, db: Session):
+        self.db = db
+        # normalized name -> contractor id, for everything resolved so far
+        self.ids = {}
+
+    def _create(self, names: dict):
+        """`names` maps normalized name -> display name."""
+        rows = [{"canonical_name": display, "normalized_name": normalized} for normalized, display in names.items()]
+        _insert_ignoring_conflicts(self.db, models.Contractor, rows, [models.Contractor.normalized_name])
+        created = dict(self.db.query(models.Contractor.normalized_name, models.Contractor.id).filter(models.Contractor.normalized_name.in_(list(names))).all())
+        self.ids.update(created)
+        index_contractors(self.db, {contractor_id: normalized for normalized, contractor_id in created.items()})
+
+    def _candidates(self, unknown: set) -> dict:
+        """Returns {normalized name: {candidate normalized name: contractor id}} from the block keys."""
+        keys = {normalized: block_keys(normalized) for normalized in unknown}
+        postings = {}
+        all_keys = list(set().union(*keys.values()))
+        for start in range(0, len(all_keys), 1000):
+            rows = self.db.query(models.ContractorBlockKey.key, models.ContractorBlockKey.contractor_id).filter(models.ContractorBlockKey.key.in_(all_keys[start:start + 1000]))
+            for key, contractor_id in rows:
+                postings.setdefault(key, []).append(contractor_id)
+        candidate_ids = {}
+        for normalized in unknown:
+            shared = Counter(contractor_id for key in keys[normalized] for contractor_id in postings.get(key, ()))
+            needed = _min_shared_keys(normalized)
+            candidate_ids[normalized] = {contractor_id for contractor_id, count in shared.items() if count >= needed}
+        wanted = list(set().union(*candidate_ids.values()))
+        names = {}
+        for start in range(0, len(wanted), 1000):
+            names.update(self.db.query(models.Contractor.id, models.Contractor.normalized_name).filter(models.Contractor.id.in_(wanted[start:start + 1000])).all())
+        return {normalized: {names[contractor_id]: contractor_id for contractor_id in ids if contractor_id in names} for normalized, ids in candidate_ids.items()}
+
+    def resolve(self, raw_names) -> dict:
+        """Returns {raw name: contractor id} for every non-blank name."""
+        normalized_by_raw = {}
+        display = {}
+        for raw in raw_names:
+            normalized = normalize_contractor_name(raw)
+            if normalized:
+                normalized_by_raw[raw] = normalized
+                display.setdefault(normalized, " ".join(raw.split()))
+        unknown = {normalized for normalized in normalized_by_raw.values() if normalized not in self.ids}
+        if unknown:
+            exact = self.db.query(models.Contractor.normalized_name, models.Contractor.id).filter(models.Contractor.normalized_name.in_(list(unknown)))
+            self.ids.update(dict(exact.all()))
+            unknown -= self.ids.keys()
+        if unknown:
+            candidates = self._candidates(unknown)
+            to_create, same_as_new = {}, {}
+            for normalized in sorted(unknown):
+                # Names created earlier in this batch are candidates too; their
+                # value is the normalized name rather than an id.
+                in_batch = {created: created for created in to_create if len(block_keys(normalized) & block_keys(created)) >= _min_shared_keys(normalized)}
+                match = _best_match(normalized, {**candidates[normalized], **in_batch})
+                if match is None:
+                    to_create[normalized] = display[normalized]
+                elif isinstance(match, str):
+                    same_as_new[normalized] = match
+                else:
+                    self.ids[normalized] = match
+            if to_create:
+                self._create(to_create)
+            for normalized, created in same_as_new.items():
+                self.ids[normalized] = self.ids[created]
+        return {raw: self.ids[normalized] for raw, normalized in normalized_by_raw.items()}
+
+def assign_contractor_ids(resolver: ContractorResolver, rows: list):
+    """Sets "contractor_id" on prepared project rows in place."""
+    contractor_ids = resolver.resolve({row["contractor_ngo_name"] for row in rows if row.get("contractor_ngo_name")})
+    for row in rows:
+        row["contractor_id"] = contractor_ids.get(row.get("contractor_ngo_name"))
+    return rows
+
+def backfill_block_keys(db: Session) -> int:
+    """Indexes contractors created before block keys existed."""
+    indexed = db.query(models.ContractorBlockKey.contractor_id)
+    missing = dict(db.query(models.Contractor.id, models.Contractor.normalized_name).filter(models.Contractor.id.notin_(indexed)).all())
+    if missing:
+        index_contractors(db, missing)
+        db.commit()
+        print(f"  [Contractors] Indexed {len(missing)} contractors for fuzzy matching.")
+    return len(missing)
+
+def backfill_contractors(db: Session, chunk_size: int = 1000) -> int:
+    """Links every project that has a contractor name but no contractor id."""
+    backfill_block_keys(db)
+    names = [row[0] for row in db.query(models.Project.contractor_ngo_name).filter(models.Project.contractor_id.is_(None), models.Project.contractor_ngo_name.isnot(None)).distinct()]
+    resolver = ContractorResolver(db)
+    linked = 0
+    for start in range(0, len(names), chunk_size):
+        contractor_ids = resolver.resolve(names[start:start + chunk_size])
+        if not contractor_ids:
+            continue
+        statement = (
+            update(models.Project.__table__)
+            .where(models.Project.__table__.c.contractor_ngo_name == bindparam("raw_name"), models.Project.__table__.c.contractor_id.is_(None))
+            .values(contractor_id=bindparam("entity_id"))
+        )
+        db.connection().execute(statement, [{"raw_name": name, "entity_id": contractor_id} for name, contractor_id in contractor_ids.items()])
+        db.commit()
+        linked += len(contractor_ids)
+        print(f"  [Contractors] Linked {linked}/{len(names)} contractor names.")
+    return linked
+
+def main():
+    from app.database import SessionLocal
+    from app.rollups import rebuild_all_rollups
+
+    parser = argparse.ArgumentParser(description="Maintain contractor entities.")
+    parser.add_argument("command", choices=["backfill"], help="Link unlinked projects to contractors, then rebuild the spending rollups.")
+    parser.parse_args()
+    db = SessionLocal()
+    try:
+        linked = backfill_contractors(db)
+        rebuild_all_rollups(db)
+        print(f"Linked {linked} contractor names and rebuilt the spending rollups.")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
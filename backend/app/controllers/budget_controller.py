@@ -1,13 +1,17 @@
-import google.generativeai as genai
+import asyncio
 import os
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
-from typing import List, Dict
-from app.database import get_db
-from app.models import models
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+from app.database import get_async_db
+from app.gemini_scheduler import get_scheduler
+from app.budget_optimizer import InfeasibleBudgetBounds, budget_cache, optimal_allocation
 import json
 
+# The narrative is a nicety; past this the locally worded justifications are returned.
+BUDGET_NARRATIVE_TIMEOUT_SECONDS = float(os.getenv("BUDGET_NARRATIVE_TIMEOUT_SECONDS", "20"))
+
 router = APIRouter(
     prefix="/api/v1/budget",
     tags=["AI Budgeting"]
@@ -17,6 +21,8 @@ class BudgetRequest(BaseModel):
     constituency_name: str
     constituency_profile: str 
     total_budget: float = 50000000 
+    # Ask Gemini to word the justifications and example projects. The amounts never come from the LLM.
+    narrative: bool = False
 
 class BudgetItem(BaseModel):
     category: str
@@ -27,41 +33,61 @@ class BudgetItem(BaseModel):
 class BudgetResponse(BaseModel):
     optimal_allocation: List[BudgetItem]
 
-@router.post("/generate-optimal", response_model=BudgetResponse)
-def generate_optimal_budget(request: BudgetRequest):
-    """
-    Uses an AI agent acting as a District Commissioner to generate an optimal
-    budget allocation for a constituency based on its profile.
-    """
-    try:
-        model = genai.GenerativeModel("gemini-2.0-flash")
-
-        prompt = f"""
-        Act as an expert, ethical, and data-driven District Commissioner in India, specializing in the MPLADS program.
+async def _narrate(request: BudgetRequest, allocation: list) -> list:
+    """Returns `allocation` with Gemini-written justification and example_project text; amounts are kept."""
+    lines = "\n".join(f'- {item["category"]}: {item["amount"]:,.0f} INR ({item["justification"]})' for item in allocation)
+    prompt = f"""
+    Act as an expert, ethical, and data-driven District Commissioner in India, specializing in the MPLADS program.
 
-        Your task is to create an optimal budget allocation for a constituency with the following profile:
-        **Constituency Profile:** {request.constituency_profile}
-        **Total Budget:** {request.total_budget:,.0f} INR
+    The following MPLADS budget allocation has already been decided for the {request.constituency_name} constituency:
+    **Constituency Profile:** {request.constituency_profile}
+    **Total Budget:** {request.total_budget:,.0f} INR
+    {lines}
 
-        Based on this profile, allocate the entire budget across the following categories: "Road Construction", "Education", "Health & Sanitation", "Community Infrastructure", "Drinking Water", "Other".
+    Do not change the amounts. For each category write:
+    1. "justification" (string): A brief, one-sentence explanation of why this allocation is important for this specific constituency profile.
+    2. "example_project" (string): A single, concrete example of a project that could be funded under this category.
 
-        Your response MUST be a single, valid JSON object with one key "optimal_allocation".
-        The value should be a list of objects. Each object MUST have:
-        1. "category" (string): The category name.
-        2. "amount" (float): The amount allocated in INR.
-        3. "justification" (string): A brief, one-sentence explanation of why this allocation is important for this specific constituency profile.
-        4. "example_project" (string): A single, concrete example of a project that could be funded under this category.
-
-        Ensure the sum of all "amount" fields equals the total budget.
-        """
-        
-        response = model.generate_content(prompt)
-        print("---------- GEMINI RESPONSE FOR BUDGET ----------")
-        print(response.text)
-        print("----------------------------------------------")
-        
-        parsed_response = json.loads(response.text.strip().replace("```json", "").replace("```", ""))
-        return BudgetResponse(optimal_allocation=parsed_response.get("optimal_allocation", []))
+    Your response MUST be a single, valid JSON object with one key "items": a list of objects with "category", "justification" and "example_project".
+    """
+    response = await asyncio.wait_for(get_scheduler().agenerate(prompt), BUDGET_NARRATIVE_TIMEOUT_SECONDS)
+    parsed_response = json.loads(response.text.strip().replace("```json", "").replace("```", ""))
+    narrated = {item.get("category"): item for item in parsed_response.get("items", [])}
+    return [
+        {
+            **item,
+            "justification": narrated.get(item["category"], {}).get("justification") or item["justification"],
+            "example_project": narrated.get(item["category"], {}).get("example_project") or item["example_project"],
+        }
+        for item in allocation
+    ]
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"AI Budget Generation Failed: {str(e)}")
\ No newline at end of file
+@router.post("/generate-optimal", response_model=BudgetResponse)
+async def generate_optimal_budget(request: BudgetRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Allocates the budget across the six MPLADS categories from the profile's
+    indicators and the constituency's spending history (see app.budget_optimizer).
+    Amounts always sum to `total_budget`. With `narrative`, Gemini rewrites the
+    justifications and example projects; if it fails or times out, the local
+    text is returned.
+    """
+    if request.total_budget < 0:
+        raise HTTPException(status_code=422, detail="total_budget must not be negative.")
+    try:
+        key, allocation = await db.run_sync(optimal_allocation, request.constituency_name, request.constituency_profile, request.total_budget)
+    except InfeasibleBudgetBounds as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if request.narrative:
+        # Hand the connection back to the pool while Gemini runs.
+        await db.close()
+        narrative_key = key + ("narrative", request.constituency_name)
+        narrated = budget_cache.get(narrative_key)
+        if narrated is None:
+            try:
+                narrated = await _narrate(request, allocation)
+                budget_cache.set(narrative_key, narrated)
+            except Exception as e:
+                print(f"AI Budget narrative failed, returning the local justifications: {e!r}")
+                narrated = allocation
+        allocation = narrated
+    return BudgetResponse(optimal_allocation=allocation)
@@ -1,73 +1,150 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
-from typing import List
+import base64
+import hashlib
+import json
+import os
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, contains_eager
+from sqlalchemy import desc, select, literal, tuple_, union_all
+from typing import List, Optional
 
 from app.schemas import schemas
 from app.models import models
-from app.database import get_db
+from app.database import get_async_read_db, get_read_db
+from app.dashboard_cache import dashboard_cache
+from app.reports import in_current_report
+from app.constituency_resolver import AmbiguousConstituencyName, constituency_resolver, lookup_key
 
 router = APIRouter(
     prefix="/api/v1",
     tags=["Constituencies"]
 )
 
+# Keyset page size for /constituencies; the whole list is never returned in one response.
+CONSTITUENCY_PAGE_SIZE = int(os.getenv("CONSTITUENCY_PAGE_SIZE", "100"))
+CONSTITUENCY_PAGE_MAX = 500
+CONSTITUENCY_LIST_MAX_AGE_SECONDS = int(os.getenv("CONSTITUENCY_LIST_MAX_AGE_SECONDS", "60"))
+SCORECARD_FIELDS = list(schemas.ConstituencyScorecard.model_fields)
+
+def _encode_cursor(state: str, constituency_name: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([state, constituency_name]).encode("utf-8")).decode("ascii").rstrip("=")
+
+def _decode_cursor(cursor: str):
+    try:
+        state, constituency_name = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return state, constituency_name
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 @router.get("/constituencies", response_model=List[schemas.ConstituencyScorecard])
-def get_all_constituencies(db: Session = Depends(get_db)):
+def get_all_constituencies(
+    request: Request,
+    state: Optional[str] = None,
+    status: Optional[models.TransparencyStatus] = None,
+    fields: Optional[str] = Query(None, description=f"Comma-separated subset of: {', '.join(SCORECARD_FIELDS)}"),
+    limit: int = Query(CONSTITUENCY_PAGE_SIZE, ge=1, le=CONSTITUENCY_PAGE_MAX),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+):
     """
-    Returns a list of all constituencies with their current transparency status.
+    Returns constituencies with their current transparency status, ordered by
+    state and name, one keyset page at a time. The next page's cursor is sent
+    in the X-Next-Cursor header (and a Link rel="next" header) and is absent
+    on the last page.
     """
-    constituencies = db.query(models.Constituency).order_by(models.Constituency.state, models.Constituency.constituency_name).all()
-    return constituencies
+    selected = SCORECARD_FIELDS
+    if fields:
+        selected = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = [field for field in selected if field not in SCORECARD_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
 
+    # Only the requested columns plus the keyset columns are read.
+    keyset = [models.Constituency.state, models.Constituency.constituency_name]
+    columns = [getattr(models.Constituency, field) for field in selected if field not in ("state", "constituency_name")]
+    query = db.query(*keyset, *columns)
+    if state:
+        query = query.filter(models.Constituency.state == state)
+    if status:
+        query = query.filter(models.Constituency.transparency_status == status)
+    if cursor:
+        query = query.filter(tuple_(*keyset) > tuple_(*_decode_cursor(cursor)))
+    rows = query.order_by(*keyset).limit(limit + 1).all()
 
-@router.get("/dashboard/{constituency_name}", response_model=schemas.DashboardResponse)
-def get_dashboard_data(constituency_name: str, db: Session = Depends(get_db)):
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    items = [{field: row._mapping[field] for field in selected} for row in rows]
+    headers = {"Cache-Control": f"public, max-age={CONSTITUENCY_LIST_MAX_AGE_SECONDS}"}
+    if has_more:
+        next_cursor = _encode_cursor(rows[-1].state, rows[-1].constituency_name)
+        headers["X-Next-Cursor"] = next_cursor
+        headers["Link"] = f'<{request.url.include_query_params(cursor=next_cursor)}>; rel="next"'
+    body = jsonable_encoder(items)
+    headers["ETag"] = f'"{hashlib.sha256(json.dumps(body, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()[:32]}"'
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(body, headers=headers)
+
+
+def _aggregate_spending_query(constituency_id: int):
     """
-    Returns all the processed and analyzed data needed to build the dashboard
-    for a single, specific constituency.
+    One statement over the spending rollups returning every dashboard aggregate
+    as (kind, key, amount, count) rows: one 'category' row per category and the
+    top 10 'contractor' rows. Totals are the sum of the category rows.
     """
-    # 1. Fetch the core constituency data
-    constituency = db.query(models.Constituency).filter(func.lower(models.Constituency.constituency_name) == constituency_name.lower()).first()
+    categories = models.ConstituencyCategorySpending
+    contractors = models.ConstituencyContractorSpending
+    by_category = select(
+        literal("category").label("kind"), categories.category.label("key"),
+        categories.total_amount.label("amount"), categories.project_count.label("count"),
+    ).where(categories.constituency_id == constituency_id)
+    top_contractors = select(
+        literal("contractor").label("kind"), models.Contractor.canonical_name.label("key"),
+        contractors.total_amount.label("amount"), contractors.project_count.label("count"),
+    ).join(models.Contractor, models.Contractor.id == contractors.contractor_id).where(contractors.constituency_id == constituency_id).order_by(desc(contractors.total_amount)).limit(10).subquery()
+
+    return union_all(by_category, select(top_contractors))
+
+def _build_dashboard(db: Session, constituency_id: int):
+    # 1. Fetch the core constituency data and the insights of its published report in one round trip
+    current_insights = models.Constituency.ai_insights.and_(in_current_report(models.AIInsight.report_id, models.Constituency.current_report_id))
+    # .all(), not .first(): a LIMIT would cut the joined insight rows short.
+    matches = (
+        db.query(models.Constituency)
+        .outerjoin(current_insights)
+        .options(contains_eager(models.Constituency.ai_insights))
+        .filter(models.Constituency.id == constituency_id)
+        .populate_existing()
+        .all()
+    )
+    constituency = matches[0] if matches else None
 
     if not constituency:
-        raise HTTPException(status_code=404, detail="Constituency data not found")
-
-    # 2. Calculate aggregate project data
-    total_expenditure = db.query(func.sum(models.Project.allocated_amount)).filter(models.Project.constituency_id == constituency.id).scalar() or 0.0
-    total_projects = db.query(func.count(models.Project.id)).filter(models.Project.constituency_id == constituency.id).scalar() or 0
-
-    # 3. Calculate spending by category
-    spending_by_category_query = db.query(
-        models.Project.category,
-        func.sum(models.Project.allocated_amount).label('amount')
-    ).filter(models.Project.constituency_id == constituency.id).group_by(models.Project.category).all()
-    
+        return None
+
+    # 2. Totals, spending by category and top 10 contractors from the rollups in a second one
+    rows = db.execute(_aggregate_spending_query(constituency.id)).all()
+    total_expenditure, total_projects = 0.0, 0
+    category_rows, top_10_contractors = [], []
+    for kind, key, amount, count in rows:
+        if kind == "category":
+            category_rows.append((key, amount or 0.0))
+            total_expenditure += amount or 0.0
+            total_projects += count or 0
+        else:
+            top_10_contractors.append({"name": key, "amount": amount or 0.0})
+    top_10_contractors.sort(key=lambda contractor: contractor["amount"], reverse=True)
+
     spending_by_category = []
-    for category, amount in spending_by_category_query:
-        amount = amount or 0.0
+    for category, amount in category_rows:
         percentage = (amount / total_expenditure * 100) if total_expenditure > 0 else 0
         spending_by_category.append(
             schemas.SpendingByCategory(category=category, amount=amount, percentage=round(percentage, 1))
         )
 
-    # 4. Calculate top 10 contractors
-    top_10_contractors_query = db.query(
-        models.Project.contractor_ngo_name.label("name"),
-        func.sum(models.Project.allocated_amount).label("amount")
-    ).filter(
-        models.Project.constituency_id == constituency.id,
-        models.Project.contractor_ngo_name.isnot(None) 
-    ).group_by("name").order_by(desc("amount")).limit(10).all()
-
-
-    top_10_contractors = [
-        {"name": row.name, "amount": row.amount or 0.0} for row in top_10_contractors_query
-    ]
- 
-    ai_insights = db.query(models.AIInsight).filter(models.AIInsight.constituency_id == constituency.id).all()
-
-    # 6. Assemble the final response
+    # 3. Assemble the final response
     dashboard_data = schemas.DashboardResponse(
         mp_name=constituency.mp_name,
         constituency_name=constituency.constituency_name,
@@ -78,7 +155,41 @@ def get_dashboard_data(constituency_name: str, db: Session = Depends(get_db)):
         total_projects=total_projects,
         spending_by_category=spending_by_category,
         top_10_contractors=top_10_contractors,
-        ai_insights=ai_insights
+        ai_insights=constituency.ai_insights
     )
-    
-    return dashboard_data
\ No newline at end of file
+    return constituency.id, constituency.data_version, dashboard_data.model_dump(mode="json")
+
+def _resolve_dashboard(db: Session, constituency_name: str):
+    # Exact name or slug only: prefix matching is for report filenames.
+    constituency_id = constituency_resolver.lookup(db, constituency_name)
+    return _build_dashboard(db, constituency_id) if constituency_id is not None else None
+
+@router.get("/dashboard/{constituency_name}", response_model=schemas.DashboardResponse)
+async def get_dashboard_data(constituency_name: str, request: Request, db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Returns all the processed and analyzed data needed to build the dashboard
+    for a single, specific constituency. Responses are cached until the next
+    ingest or audit of the constituency and carry an ETag for conditional requests.
+    """
+    cache_key = lookup_key(constituency_name)
+    cached = dashboard_cache.get(cache_key)
+    if cached:
+        constituency_id, data_version, payload, etag = cached
+        # Ingestion may have run in another process since the entry was built.
+        if await db.scalar(select(models.Constituency.data_version).where(models.Constituency.id == constituency_id)) != data_version:
+            dashboard_cache.invalidate(constituency_id)
+            cached = None
+    if not cached:
+        try:
+            built = await db.run_sync(_resolve_dashboard, constituency_name)
+        except AmbiguousConstituencyName as e:
+            raise HTTPException(status_code=409, detail={"message": str(e), "candidates": e.candidates})
+        if not built:
+            raise HTTPException(status_code=404, detail="Constituency data not found")
+        constituency_id, data_version, payload = built
+        etag = dashboard_cache.set(cache_key, constituency_id, data_version, payload)
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(payload, headers=headers)
@@ -0,0 +1,16 @@
+from fastapi import APIRouter
+from app.pool_metrics import pool_metrics
+
+router = APIRouter(
+    prefix="/api/v1/metrics",
+    tags=["Metrics"]
+)
+
+@router.get("/db-pools", summary="Database connection pool metrics")
+def get_db_pool_metrics():
+    """
+    Per pool (primary, read, primary_async, read_async): checkouts, timeouts,
+    checkout wait totals and histogram since startup, and the current size,
+    checked-out and overflow counts.
+    """
+    return pool_metrics()
@@ -1,20 +1,37 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.processor import process_inbox
+from app.database import get_async_db
+from app.jobs import aenqueue_inbox_job
+from app.models import models
+from app.schemas import schemas
 
 router = APIRouter(
     prefix="/api/v1/process",
     tags=["Processing"]
 )
 
-@router.post("/run", summary="Trigger the inbox processor")
-def trigger_processor():
+@router.post("/run", summary="Trigger the inbox processor", status_code=202, response_model=schemas.ProcessingJobQueued)
+async def trigger_processor(db: AsyncSession = Depends(get_async_db)):
     """
-    Triggers the system to check the 'report_inbox' directory for new PDFs
-    and runs the full AI pipeline on each one found.
+    Queues a background job that checks the 'report_inbox' directory for new
+    PDFs and runs the full AI pipeline on each one found. Poll the returned
+    status URL for progress.
     """
     try:
-        result = process_inbox()
-        return result
+        job = await aenqueue_inbox_job(db)
+        return schemas.ProcessingJobQueued(job_id=job.id, status=job.status, status_url=f"{router.prefix}/jobs/{job.id}")
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"A critical error occurred in the processor: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"A critical error occurred while queueing the processor: {e}")
+
+# Polled right after /run creates the job, so this reads from the primary: a replica may not have the row yet.
+@router.get("/jobs/{job_id}", summary="Get processing job status", response_model=schemas.ProcessingJobInfo)
+async def get_processing_job(job_id: str, db: AsyncSession = Depends(get_async_db)):
+    """
+    Returns the status of a processing job, with per-report stage progress
+    (text layer, OCR, structuring, insert, audit) and timings.
+    """
+    job = await db.get(models.ProcessingJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Processing job not found")
+    return job
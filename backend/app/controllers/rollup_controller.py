@@ -0,0 +1,52 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from sqlalchemy import func, desc
+from typing import List, Optional
+
+from app.schemas import schemas
+from app.models import models
+from app.database import get_read_db
+
+router = APIRouter(
+    prefix="/api/v1/rollups",
+    tags=["Spending Rollups"]
+)
+
+@router.get("/states", response_model=List[schemas.StateSpendingInfo])
+def get_state_spending(db: Session = Depends(get_read_db)):
+    """
+    Returns reported MPLADS spending per state, highest first.
+    """
+    return db.query(models.StateSpending).order_by(desc(models.StateSpending.total_amount)).all()
+
+@router.get("/constituencies", response_model=List[schemas.ConstituencySpendingRank])
+def get_constituency_leaderboard(state: Optional[str] = None, limit: int = Query(50, ge=1, le=600), db: Session = Depends(get_read_db)):
+    """
+    Returns constituencies ranked by reported spending, nationally or within a state.
+    """
+    rollup = models.ConstituencyCategorySpending
+    totals = db.query(
+        rollup.constituency_id.label("constituency_id"),
+        func.sum(rollup.total_amount).label("total_amount"),
+        func.sum(rollup.project_count).label("project_count"),
+    ).group_by(rollup.constituency_id).subquery()
+    query = db.query(models.Constituency, totals.c.total_amount, totals.c.project_count).join(totals, totals.c.constituency_id == models.Constituency.id)
+    if state:
+        query = query.filter(models.Constituency.state == state)
+    rows = query.order_by(desc(totals.c.total_amount)).limit(limit).all()
+    return [
+        schemas.ConstituencySpendingRank(id=c.id, constituency_name=c.constituency_name, mp_name=c.mp_name, state=c.state, total_amount=total_amount or 0.0, project_count=project_count or 0)
+        for c, total_amount, project_count in rows
+    ]
+
+@router.get("/categories", response_model=List[schemas.CategorySpendingTotal])
+def get_category_spending(state: Optional[str] = None, db: Session = Depends(get_read_db)):
+    """
+    Returns reported spending per category, nationally or within a state.
+    """
+    rollup = models.ConstituencyCategorySpending
+    query = db.query(rollup.category, func.sum(rollup.total_amount), func.sum(rollup.project_count))
+    if state:
+        query = query.join(models.Constituency, models.Constituency.id == rollup.constituency_id).filter(models.Constituency.state == state)
+    rows = query.group_by(rollup.category).order_by(desc(func.sum(rollup.total_amount))).all()
+    return [schemas.CategorySpendingTotal(category=category, total_amount=amount or 0.0, project_count=count or 0) for category, amount, count in rows]
@@ -1,7 +1,13 @@
-import google.generativeai as genai
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
+import asyncio
+import json
+import os
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from app.schemas import schemas
+from app.gemini_scheduler import get_scheduler
+
+# Each document is generated independently; one that takes longer than this is abandoned.
+LEGAL_DOC_TIMEOUT_SECONDS = float(os.getenv("LEGAL_DOC_TIMEOUT_SECONDS", "90"))
 
 router = APIRouter(
     prefix="/api/v1/legal",
@@ -13,61 +19,119 @@ def get_pio_address(constituency_name: str) -> str:
     """Returns the formatted address for the Public Information Officer."""
     return f"Public Information Officer (PIO),\nOffice of the District Magistrate,\n{constituency_name} District"
 
+def build_legal_prompts(request: schemas.LegalRequest) -> dict:
+    """Returns {document: prompt} for the RTI application, the First Appeal and the PIL brief."""
+    pio_address = get_pio_address(request.constituency_name)
+
+    # --- Prompt 1: The RTI Application ---
+    rti_prompt = f"""
+    Act as a legal expert specializing in India's Right to Information (RTI) Act, 2005.
+    Your task is to draft a formal RTI application based on the following finding.
+
+    **Finding:** The MPLADS expenditure report for the {request.constituency_name} Lok Sabha constituency (MP: {request.mp_name}) is '{request.finding}'.
+    **Target PIO Address:** {pio_address}
+
+    Draft a concise, legally sound, and ready-to-file RTI application. The request must be specific, referencing the scheme and the exact information required as per the finding.
+    The response should ONLY contain the raw text of the application, starting with "To," and ending with "Sincerely,". Do not add any conversational text, explanations, or markdown formatting.
+    """
+
+    # --- Prompt 2: The First Appeal ---
+    appeal_prompt = f"""
+    Now, act as a senior RTI activist coaching a citizen. The PIO has likely given an evasive or invalid response to the previous RTI request about '{request.finding}' for the {request.constituency_name} constituency.
+
+    Draft the 'First Appeal' under Section 19(1) of the RTI Act to the First Appellate Authority at the same office. The appeal must:
+    1. Reference the original (but unsent) RTI request.
+    2. State that no satisfactory information was provided within the 30-day limit.
+    3. Briefly argue why common evasions like "information is being compiled" are invalid under the RTI Act.
+
+    The response must ONLY contain the raw text of the appeal. Do not add any conversational text.
+    """
+
+    # --- Prompt 3: The Public Interest Litigation (PIL) Brief ---
+    pil_prompt = f"""
+    Act as a paralegal for a public interest litigation lawyer. The finding is: '{request.finding}' for MP {request.mp_name} in {request.constituency_name}.
+
+    Write a "Preliminary Note for Counsel" summarizing this issue in under 150 words. Explain in 2-3 sentences why a systemic failure in transparency for MPLADS funds could be a matter of public interest, potentially affecting the rights of the citizenry under Article 21 of the Constitution (Right to Life, which includes the right to live with dignity, contingent on proper governance). This is not the PIL itself, but a summary brief for a lawyer to evaluate the case.
+
+    ONLY return the raw text of the brief.
+    """
+
+    return {"rti_application": rti_prompt, "first_appeal": appeal_prompt, "pil_brief": pil_prompt}
+
 @router.post("/generate-docs", response_model=schemas.LegalDocsResponse)
-def generate_all_legal_documents(request: schemas.LegalRequest):
+async def generate_all_legal_documents(request: schemas.LegalRequest):
     """
     Generates a full suite of legal documents: an RTI application,
     a First Appeal, and a preliminary PIL brief for a lawyer.
+    The three documents are generated concurrently.
     """
-    pio_address = get_pio_address(request.constituency_name)
+    prompts = build_legal_prompts(request)
+    scheduler = get_scheduler()
+    results = await asyncio.gather(
+        *[asyncio.wait_for(scheduler.agenerate(prompt), LEGAL_DOC_TIMEOUT_SECONDS) for prompt in prompts.values()],
+        return_exceptions=True,
+    )
+    documents = {}
+    for document, result in zip(prompts, results):
+        if isinstance(result, asyncio.TimeoutError):
+            print(f"AI Model or Generation Error: {document} timed out after {LEGAL_DOC_TIMEOUT_SECONDS:g}s.")
+            raise HTTPException(status_code=504, detail=f"Generating the {document.replace('_', ' ')} timed out.")
+        if isinstance(result, Exception):
+            print(f"AI Model or Generation Error: {result}")
+            raise HTTPException(status_code=500, detail=f"An error occurred while generating documents: {result}")
+        documents[document] = result.text.strip()
+    return schemas.LegalDocsResponse(**documents)
 
-    try:
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
-        model = genai.GenerativeModel("gemini-2.0-flash")
-
-        # --- Prompt 1: The RTI Application ---
-        rti_prompt = f"""
-        Act as a legal expert specializing in India's Right to Information (RTI) Act, 2005.
-        Your task is to draft a formal RTI application based on the following finding.
-
-        **Finding:** The MPLADS expenditure report for the {request.constituency_name} Lok Sabha constituency (MP: {request.mp_name}) is '{request.finding}'.
-        **Target PIO Address:** {pio_address}
-
-        Draft a concise, legally sound, and ready-to-file RTI application. The request must be specific, referencing the scheme and the exact information required as per the finding.
-        The response should ONLY contain the raw text of the application, starting with "To," and ending with "Sincerely,". Do not add any conversational text, explanations, or markdown formatting.
-        """
-        
-        # --- Prompt 2: The First Appeal ---
-        appeal_prompt = f"""
-        Now, act as a senior RTI activist coaching a citizen. The PIO has likely given an evasive or invalid response to the previous RTI request about '{request.finding}' for the {request.constituency_name} constituency.
-
-        Draft the 'First Appeal' under Section 19(1) of the RTI Act to the First Appellate Authority at the same office. The appeal must:
-        1. Reference the original (but unsent) RTI request.
-        2. State that no satisfactory information was provided within the 30-day limit.
-        3. Briefly argue why common evasions like "information is being compiled" are invalid under the RTI Act.
-        
-        The response must ONLY contain the raw text of the appeal. Do not add any conversational text.
-        """
-
-        # --- Prompt 3: The Public Interest Litigation (PIL) Brief ---
-        pil_prompt = f"""
-        Act as a paralegal for a public interest litigation lawyer. The finding is: '{request.finding}' for MP {request.mp_name} in {request.constituency_name}.
-        
-        Write a "Preliminary Note for Counsel" summarizing this issue in under 150 words. Explain in 2-3 sentences why a systemic failure in transparency for MPLADS funds could be a matter of public interest, potentially affecting the rights of the citizenry under Article 21 of the Constitution (Right to Life, which includes the right to live with dignity, contingent on proper governance). This is not the PIL itself, but a summary brief for a lawyer to evaluate the case.
-        
-        ONLY return the raw text of the brief.
-        """
-
-        rti_response = model.generate_content(rti_prompt)
-        appeal_response = model.generate_content(appeal_prompt)
-        pil_response = model.generate_content(pil_prompt)
-
-        return schemas.LegalDocsResponse(
-            rti_application=rti_response.text.strip(),
-            first_appeal=appeal_response.text.strip(),
-            pil_brief=pil_response.text.strip()
-        )
-    except Exception as e:
+async def _stream_document(scheduler, document: str, prompt: str, events: asyncio.Queue):
+    """Puts start, delta and done (or error) events for one document on `events`."""
+    parts = []
+
+    async def _produce():
+        async for text in scheduler.astream(prompt):
+            parts.append(text)
+            await events.put(_sse("delta", {"document": document, "text": text}))
 
+    await events.put(_sse("start", {"document": document}))
+    try:
+        await asyncio.wait_for(_produce(), LEGAL_DOC_TIMEOUT_SECONDS)
+        await events.put(_sse("done", {"document": document, "text": "".join(parts).strip()}))
+    except asyncio.TimeoutError:
+        print(f"AI Model or Generation Error: {document} timed out after {LEGAL_DOC_TIMEOUT_SECONDS:g}s.")
+        await events.put(_sse("error", {"document": document, "detail": f"Timed out after {LEGAL_DOC_TIMEOUT_SECONDS:g}s."}))
+    except Exception as e:
         print(f"AI Model or Generation Error: {e}")
-        raise HTTPException(status_code=500, detail=f"An error occurred while generating documents: {e}")
\ No newline at end of file
+        await events.put(_sse("error", {"document": document, "detail": str(e)}))
+
+async def _legal_document_events(prompts: dict):
+    scheduler = get_scheduler()
+    events = asyncio.Queue()
+    tasks = [asyncio.create_task(_stream_document(scheduler, document, prompt, events)) for document, prompt in prompts.items()]
+    try:
+        pending = len(tasks)
+        while pending:
+            event = await events.get()
+            if event.startswith(("event: done", "event: error")):
+                pending -= 1
+            yield event
+        yield _sse("end", {})
+    finally:
+        # The client went away: stop generating.
+        for task in tasks:
+            task.cancel()
+
+@router.post("/generate-docs/stream")
+async def stream_all_legal_documents(request: schemas.LegalRequest):
+    """
+    Server-sent events variant of /generate-docs. The three documents are
+    generated concurrently and their text is streamed as it is produced:
+    `start`, then `delta` events ({"document", "text"}), then `done` with the
+    full text or `error`, per document, interleaved; `end` closes the stream.
+    """
+    return StreamingResponse(
+        _legal_document_events(build_legal_prompts(request)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
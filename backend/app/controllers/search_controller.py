@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from app.schemas import schemas
+from app.database import get_read_db
+from app.search import search_projects
+
+router = APIRouter(
+    prefix="/api/v1",
+    tags=["Search"]
+)
+
+@router.get("/search", response_model=schemas.SearchResponse)
+def search(
+    q: str = Query(..., min_length=1, description="Words to find in project descriptions, locations and contractors. The last word matches as a prefix."),
+    category: Optional[str] = None,
+    state: Optional[str] = None,
+    constituency_id: Optional[int] = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=10000),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Ranked full-text search over the projects of every published report, with
+    facet counts by category, state and constituency.
+    """
+    try:
+        found = search_projects(db, q, category=category, state=state, constituency_id=constituency_id, limit=limit, offset=offset)
+    except NotImplementedError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    return schemas.SearchResponse(query=q, limit=limit, offset=offset, **found)
@@ -0,0 +1,80 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from sqlalchemy import func
+from app.database import SessionLocal
+from app.models import models
+
+# In-process cache of rendered dashboard payloads. Dashboard data only changes
+# when a report is ingested or re-audited, so the pipeline invalidates entries
+# per constituency. Ingestion may run in another process (e.g.
+# `python -m app.watcher`), so invalidating also bumps the constituency's
+# `data_version` in the database; the API compares it with the version an
+# entry was built from on every hit. The TTL only bounds memory use.
+
+DASHBOARD_CACHE_TTL_SECONDS = float(os.getenv("DASHBOARD_CACHE_TTL_SECONDS", "300"))
+
+class DashboardCache:
+    def __init__(self, ttl_seconds: float = DASHBOARD_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        # name key -> (constituency_id, data_version, payload, etag, stored_at)
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def get(self, key: str):
+        """Returns (constituency_id, data_version, payload, etag) or None."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[4] > self.ttl_seconds:
+                del self.entries[key]
+                return None
+            return entry[:4]
+
+    def set(self, key: str, constituency_id: int, data_version: int, payload: dict) -> str:
+        body = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+        etag = f'"{hashlib.sha256(body.encode("utf-8")).hexdigest()[:32]}"'
+        with self.lock:
+            self.entries[key] = (constituency_id, data_version, payload, etag, time.monotonic())
+        return etag
+
+    def invalidate(self, constituency_id: int = None):
+        """Drops every cached entry for `constituency_id`, or everything if None."""
+        with self.lock:
+            if constituency_id is None:
+                self.entries.clear()
+                return
+            for key in [key for key, entry in self.entries.items() if entry[0] == constituency_id]:
+                del self.entries[key]
+
+dashboard_cache = DashboardCache()
+
+def invalidate_constituencies(constituency_ids: list = None):
+    """
+    Called after committing new data for `constituency_ids` (every
+    constituency when None): drops this process's entries and bumps the
+    shared data_version so other processes drop theirs on the next hit.
+    """
+    if constituency_ids is None:
+        dashboard_cache.invalidate()
+    else:
+        for constituency_id in constituency_ids:
+            dashboard_cache.invalidate(constituency_id)
+    db = SessionLocal()
+    try:
+        query = db.query(models.Constituency)
+        if constituency_ids is not None:
+            query = query.filter(models.Constituency.id.in_(list(constituency_ids)))
+        query.update({models.Constituency.data_version: func.coalesce(models.Constituency.data_version, 0) + 1}, synchronize_session=False)
+        db.commit()
+    except Exception as e:
+        print(f"  [Dashboard Cache] Could not bump data versions ({e}); other processes refresh within {DASHBOARD_CACHE_TTL_SECONDS:.0f}s.")
+        db.rollback()
+    finally:
+        db.close()
+
+def invalidate_constituency(constituency_id: int):
+    invalidate_constituencies([constituency_id])
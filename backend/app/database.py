@@ -1,16 +1,78 @@
 import os
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
+from app.pool_metrics import register_engine, timed_pool_class
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Read-only traffic (GET handlers) can be pointed at a replica. It always gets
+# its own pools, so reads never queue behind ingest transactions for a connection.
+READ_DATABASE_URL = os.getenv("READ_DATABASE_URL") or DATABASE_URL
 
-engine = create_engine(DATABASE_URL)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", str(DB_POOL_SIZE)))
+DB_READ_MAX_OVERFLOW = int(os.getenv("DB_READ_MAX_OVERFLOW", str(DB_MAX_OVERFLOW)))
+# Seconds a checkout waits for a free connection before failing.
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Connections older than this (seconds) are replaced; -1 keeps them forever.
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+def async_database_url(url: str):
+    """The same database through an asyncio driver: asyncpg for PostgreSQL, aiosqlite for SQLite."""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend == "postgresql":
+        query = dict(url.query)
+        # asyncpg spells libpq's sslmode as ssl.
+        if "sslmode" in query:
+            query["ssl"] = query.pop("sslmode")
+        return url.set(drivername="postgresql+asyncpg", query=query)
+    if backend == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+    return url
+
+# Override when the async driver needs different connection settings.
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or async_database_url(DATABASE_URL)
+ASYNC_READ_DATABASE_URL = os.getenv("ASYNC_READ_DATABASE_URL") or async_database_url(READ_DATABASE_URL)
+
+def _pool_options(url, name: str, pool_size: int, max_overflow: int, is_async: bool = False) -> dict:
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        # An in-memory database lives in its one connection; keep SQLAlchemy's default pool.
+        return {}
+    return {
+        "poolclass": timed_pool_class(name, is_async),
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+engine = create_engine(DATABASE_URL, **_pool_options(DATABASE_URL, "primary", DB_POOL_SIZE, DB_MAX_OVERFLOW))
+read_engine = create_engine(READ_DATABASE_URL, **_pool_options(READ_DATABASE_URL, "read", DB_READ_POOL_SIZE, DB_READ_MAX_OVERFLOW))
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# `read_only` tells shared code (e.g. the constituency resolver) to skip opportunistic writes.
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine, info={"read_only": True})
+
+# Async engines for request handlers, so a query never holds one of the
+# threadpool's workers. Pipelines, jobs and CLIs keep using SessionLocal.
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_pool_options(ASYNC_DATABASE_URL, "primary_async", DB_POOL_SIZE, DB_MAX_OVERFLOW, is_async=True))
+async_read_engine = create_async_engine(ASYNC_READ_DATABASE_URL, **_pool_options(ASYNC_READ_DATABASE_URL, "read_async", DB_READ_POOL_SIZE, DB_READ_MAX_OVERFLOW, is_async=True))
+
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False, info={"read_only": True})
+
+for _name, _engine in (("primary", engine), ("read", read_engine), ("primary_async", async_engine), ("read_async", async_read_engine)):
+    register_engine(_name, _engine)
 
 Base = declarative_base()
 
@@ -19,4 +81,20 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def get_read_db():
+    """Session for handlers that only read; may be served by a replica, so it can lag behind writes."""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_read_db():
+    async with AsyncReadSessionLocal() as db:
+        yield db
@@ -0,0 +1,232 @@
+import argparse
+import hashlib
+import os
+import re
+import zlib
+import numpy as np
+from sqlalchemy import and_, func, insert, or_, select
+from sqlalchemy.orm import Session, aliased
+from app.models import models
+
+# Near-duplicate project detection across every constituency and report.
+# Each project gets a MinHash signature over character shingles of its
+# normalised description, location and contractor. The signature is split into
+# LSH bands; projects sharing any band bucket are candidates, found through the
+# (band, bucket) primary key instead of pairwise comparison, and confirmed by
+# the estimated Jaccard similarity of their signatures.
+# Backfill projects ingested before the index existed:  python -m app.duplicates index
+
+DUPLICATE_NUM_PERM = 64
+DUPLICATE_BANDS = 16
+DUPLICATE_SHINGLE_SIZE = 3
+# Estimated Jaccard similarity at or above which two projects are reported as duplicates.
+DUPLICATE_SIMILARITY_THRESHOLD = float(os.getenv("DUPLICATE_SIMILARITY_THRESHOLD", "0.8"))
+# Buckets shared by more projects than this are boilerplate text, not duplicates, and are skipped.
+DUPLICATE_MAX_BUCKET_SIZE = int(os.getenv("DUPLICATE_MAX_BUCKET_SIZE", "50"))
+DUPLICATE_INDEX_CHUNK = 5000
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+# Fixed seed: signatures must stay comparable across processes and runs.
+_random = np.random.RandomState(1)
+_PERM_A = _random.randint(1, 1 << 31, size=DUPLICATE_NUM_PERM).astype(np.uint64)
+_PERM_B = _random.randint(0, 1 << 31, size=DUPLICATE_NUM_PERM).astype(np.uint64)
+_ROWS_PER_BAND = DUPLICATE_NUM_PERM // DUPLICATE_BANDS
+
+def normalize_project_text(description: str, location: str, contractor: str) -> str:
+    parts = [re.sub(r"[^a-z0-9]+", " ", (value or "").lower()).strip() for value in (description, location, contractor)]
+    return " | ".join(parts)
+
+def minhash(text: str) -> np.ndarray:
+    padded = f" {text} "
+    shingles = {padded[i:i + DUPLICATE_SHINGLE_SIZE] for i in range(max(len(padded) - DUPLICATE_SHINGLE_SIZE + 1, 1))}
+    hashes = np.fromiter((zlib.crc32(shingle.encode("utf-8")) for shingle in shingles), dtype=np.uint64, count=len(shingles))
+    permuted = ((_PERM_A[:, None] * hashes[None, :] + _PERM_B[:, None]) % _MERSENNE_PRIME) & _MAX_HASH
+    return permuted.min(axis=1).astype(np.uint32)
+
+def band_buckets(signature: np.ndarray) -> list:
+    """One signed 64-bit bucket id per band."""
+    buckets = []
+    for band in range(DUPLICATE_BANDS):
+        chunk = signature[band * _ROWS_PER_BAND:(band + 1) * _ROWS_PER_BAND].tobytes()
+        buckets.append(int.from_bytes(hashlib.blake2b(chunk, digest_size=8).digest(), "big", signed=True))
+    return buckets
+
+def similarity(signature_a: np.ndarray, signature_b: np.ndarray) -> float:
+    return float(np.mean(signature_a == signature_b))
+
+def index_projects(db: Session, projects: list):
+    """
+    Adds (project_id, description, location, contractor) rows to the index.
+    Does not commit.
+    """
+    signature_rows, bucket_rows = [], []
+    for project_id, description, location, contractor in projects:
+        text = normalize_project_text(description, location, contractor)
+        if not text.replace("|", "").strip():
+            continue
+        signature = minhash(text)
+        signature_rows.append({"project_id": project_id, "minhash": signature.tobytes()})
+        bucket_rows.extend({"band": band, "bucket": bucket, "project_id": project_id} for band, bucket in enumerate(band_buckets(signature)))
+    if signature_rows:
+        db.execute(insert(models.ProjectSignature), signature_rows)
+        db.execute(insert(models.ProjectLshBucket), bucket_rows)
+    return len(signature_rows)
+
+def index_report(db: Session, report_id: int) -> int:
+    """Indexes every project of a report (called by the ingest pipeline after its inserts)."""
+    projects = db.query(models.Project.id, models.Project.project_description, models.Project.location, models.Project.contractor_ngo_name).filter(models.Project.report_id == report_id).all()
+    indexed = 0
+    for start in range(0, len(projects), DUPLICATE_INDEX_CHUNK):
+        indexed += index_projects(db, projects[start:start + DUPLICATE_INDEX_CHUNK])
+    db.commit()
+    print(f"  [Duplicates] Indexed {indexed} projects of report {report_id}.")
+    return indexed
+
+def remove_projects(db: Session, project_ids):
+    """Drops index rows of projects about to be deleted. `project_ids` may be a subquery. Does not commit."""
+    db.query(models.ProjectLshBucket).filter(models.ProjectLshBucket.project_id.in_(project_ids)).delete(synchronize_session=False)
+    db.query(models.ProjectSignature).filter(models.ProjectSignature.project_id.in_(project_ids)).delete(synchronize_session=False)
+
+def find_duplicate_pairs(db: Session, constituency_id: int, report_id: int) -> list:
+    """
+    Returns (project_id, other_project_id, similarity) for projects of
+    `report_id` that match another project of the same report or of another
+    constituency's published report. The constituency's own previous version
+    is not compared against: re-ingesting a report is not double billing.
+    """
+    own = aliased(models.ProjectLshBucket)
+    other = aliased(models.ProjectLshBucket)
+    seed = aliased(models.ProjectLshBucket)
+    sized = aliased(models.ProjectLshBucket)
+    other_project = aliased(models.Project)
+    own_project_ids = select(models.Project.id).where(models.Project.report_id == report_id)
+    own_buckets = select(seed.band, seed.bucket).where(seed.project_id.in_(own_project_ids)).distinct().subquery()
+    usable_buckets = (
+        select(sized.band, sized.bucket)
+        .join(own_buckets, and_(own_buckets.c.band == sized.band, own_buckets.c.bucket == sized.bucket))
+        .group_by(sized.band, sized.bucket)
+        .having(func.count() <= DUPLICATE_MAX_BUCKET_SIZE)
+        .subquery()
+    )
+    candidates = (
+        db.query(own.project_id, other.project_id)
+        .join(usable_buckets, and_(usable_buckets.c.band == own.band, usable_buckets.c.bucket == own.bucket))
+        .join(other, and_(other.band == own.band, other.bucket == own.bucket, other.project_id != own.project_id))
+        .join(other_project, other_project.id == other.project_id)
+        .join(models.Constituency, models.Constituency.id == other_project.constituency_id)
+        .filter(own.project_id.in_(own_project_ids))
+        .filter(or_(
+            other_project.report_id == report_id,
+            and_(other_project.constituency_id != constituency_id, or_(
+                other_project.report_id == models.Constituency.current_report_id,
+                and_(models.Constituency.current_report_id.is_(None), other_project.report_id.is_(None)),
+            )),
+        ))
+        .distinct()
+        .all()
+    )
+    if not candidates:
+        return []
+    # Each unordered pair once.
+    pairs = {(min(a, b), max(a, b)) for a, b in candidates}
+    involved = {project_id for pair in pairs for project_id in pair}
+    signatures = {
+        row.project_id: np.frombuffer(row.minhash, dtype=np.uint32)
+        for row in db.query(models.ProjectSignature).filter(models.ProjectSignature.project_id.in_(involved))
+    }
+    results = []
+    for a, b in pairs:
+        score = similarity(signatures[a], signatures[b])
+        if score >= DUPLICATE_SIMILARITY_THRESHOLD:
+            results.append((a, b, score))
+    return results
+
+def _clusters(pairs: list) -> list:
+    parent = {}
+
+    def find(node):
+        while parent.setdefault(node, node) != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for a, b, _ in pairs:
+        parent[find(a)] = find(b)
+    groups = {}
+    for node in parent:
+        groups.setdefault(find(node), []).append(node)
+    return list(groups.values())
+
+def duplicate_findings(db: Session, constituency_id: int, report_id: int) -> list:
+    """Groups duplicate pairs into clusters and returns (insight_row, evidence_rows) findings."""
+    pairs = find_duplicate_pairs(db, constituency_id, report_id)
+    if not pairs:
+        return []
+    best_match = {}
+    for a, b, score in pairs:
+        for project_id, match_id in ((a, b), (b, a)):
+            if score > best_match.get(project_id, (None, 0.0))[1]:
+                best_match[project_id] = (match_id, score)
+    clusters = _clusters(pairs)
+    project_ids = [project_id for cluster in clusters for project_id in cluster]
+    projects = {
+        row.id: row for row in db.query(
+            models.Project.id, models.Project.report_id, models.Project.project_description, models.Project.allocated_amount, models.Constituency.constituency_name,
+        ).join(models.Constituency, models.Constituency.id == models.Project.constituency_id).filter(models.Project.id.in_(project_ids))
+    }
+    findings = []
+    for cluster in clusters:
+        cluster = sorted(cluster)
+        elsewhere = sorted({projects[project_id].constituency_name for project_id in cluster if projects[project_id].report_id != report_id})
+        scope = f"across this report and {', '.join(elsewhere)}" if elsewhere else "within this report"
+        total = sum(projects[project_id].allocated_amount or 0 for project_id in cluster)
+        description = projects[cluster[0]].project_description
+        print(f"  -> FOUND: {len(cluster)} near-identical projects {scope}.")
+        finding_text = f"{len(cluster)} projects with near-identical description, location and contractor appear {scope}, totalling {total:,.0f} INR (e.g. '{description}'). The same work may have been billed more than once."
+        evidence = []
+        for project_id in cluster:
+            match_id, score = best_match[project_id]
+            project = projects[project_id]
+            evidence.append({"project_id": project_id, "reasoning": f"{project.allocated_amount or 0:,.0f} INR in {project.constituency_name}; {score * 100:.0f}% similar to project {match_id}."})
+        findings.append(({"constituency_id": constituency_id, "title": "Possible Duplicate Billing", "finding": finding_text, "severity": "High"}, evidence))
+    return findings
+
+def backfill_index(db: Session) -> int:
+    """Indexes every project that has no signature yet."""
+    indexed = 0
+    while True:
+        missing = (
+            db.query(models.Project.id, models.Project.project_description, models.Project.location, models.Project.contractor_ngo_name)
+            .outerjoin(models.ProjectSignature, models.ProjectSignature.project_id == models.Project.id)
+            .filter(models.ProjectSignature.project_id.is_(None))
+            .order_by(models.Project.id)
+            .limit(DUPLICATE_INDEX_CHUNK)
+            .all()
+        )
+        if not missing:
+            return indexed
+        index_projects(db, missing)
+        # Projects with no text get no signature; remember them so the loop ends.
+        blank = [{"project_id": row.id, "minhash": b""} for row in missing if not normalize_project_text(row.project_description, row.location, row.contractor_ngo_name).replace("|", "").strip()]
+        if blank:
+            db.execute(insert(models.ProjectSignature), blank)
+        db.commit()
+        indexed += len(missing)
+        print(f"  [Duplicates] Indexed {indexed} projects so far.")
+
+def main():
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Maintain the near-duplicate project index.")
+    parser.add_argument("command", choices=["index"], help="Index every project that is not indexed yet.")
+    parser.parse_args()
+    db = SessionLocal()
+    try:
+        count = backfill_index(db)
+        print(f"Indexed {count} projects.")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import asyncio
+import os
+import random
+import threading
+import time
+import google.generativeai as genai
+
+# One scheduler is shared by every Gemini call site in the process so the
+# structuring pipeline, audit agents and interactive endpoints all draw on the
+# same requests-per-minute / tokens-per-minute quota.
+
+DEFAULT_MODEL = "gemini-2.0-flash"
+GEMINI_RPM = int(os.getenv("GEMINI_RPM", "15"))
+GEMINI_TPM = int(os.getenv("GEMINI_TPM", "1000000"))
+GEMINI_MAX_IN_FLIGHT = int(os.getenv("GEMINI_MAX_IN_FLIGHT", "4"))
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "5"))
+GEMINI_BACKOFF_BASE_SECONDS = float(os.getenv("GEMINI_BACKOFF_BASE_SECONDS", "2"))
+GEMINI_BACKOFF_MAX_SECONDS = float(os.getenv("GEMINI_BACKOFF_MAX_SECONDS", "60"))
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+# Marks the end of a stream handed from the scheduler loop to the caller's loop.
+_STREAM_END = object()
+
+def estimate_tokens(text: str) -> int:
+    # Gemini averages roughly four characters per token for English/Hinglish text.
+    return max(1, len(text) // 4)
+
+def is_retryable_error(error: Exception) -> bool:
+    if isinstance(error, asyncio.TimeoutError):
+        return True
+    # google.api_core exceptions carry the HTTP status as `.code`.
+    return getattr(error, "code", None) in RETRYABLE_STATUS_CODES
+
+class TokenBucket:
+    """Continuously refilling bucket holding at most `per_minute` units."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = float(per_minute)
+        self.updated_at = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self, amount: float = 1):
+        amount = min(amount, self.capacity)
+        async with self.lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+class GeminiScheduler:
+    def __init__(self, rpm: int = GEMINI_RPM, tpm: int = GEMINI_TPM, max_in_flight: int = GEMINI_MAX_IN_FLIGHT, max_retries: int = GEMINI_MAX_RETRIES):
+        self.max_retries = max_retries
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="gemini-scheduler", daemon=True)
+        self._thread.start()
+        # Loop-bound primitives must be created on the scheduler's own loop.
+        self.run_coroutine(self._init_limits(rpm, tpm, max_in_flight))
+
+    async def _init_limits(self, rpm: int, tpm: int, max_in_flight: int):
+        self.request_bucket = TokenBucket(rpm)
+        self.token_bucket = TokenBucket(tpm)
+        self.in_flight = asyncio.Semaphore(max_in_flight)
+
+    def run_coroutine(self, coro):
+        """Runs `coro` on the scheduler loop and blocks the calling thread for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    async def _on_loop(self, coro):
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is self.loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self.loop))
+
+    async def _acquire(self, prompt: str):
+        await self.request_bucket.acquire(1)
+        await self.token_bucket.acquire(estimate_tokens(prompt))
+
+    def _backoff_delay(self, attempt: int) -> float:
+        # Full jitter keeps concurrent retries from hitting the API in lockstep.
+        return random.uniform(0, min(GEMINI_BACKOFF_MAX_SECONDS, GEMINI_BACKOFF_BASE_SECONDS * (2 ** attempt)))
+
+    async def _generate(self, prompt: str, model_name: str, generation_config):
+        model = genai.GenerativeModel(model_name)
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(prompt)
+            try:
+                async with self.in_flight:
+                    return await model.generate_content_async(prompt, generation_config=generation_config)
+            except Exception as e:
+                if not is_retryable_error(e) or attempt == self.max_retries:
+                    raise
+                delay = self._backoff_delay(attempt)
+                print(f"        - Gemini call throttled or failed ({e}). Retrying in {delay:.1f}s (attempt {attempt + 1}/{self.max_retries})...")
+                await asyncio.sleep(delay)
+
+    async def agenerate(self, prompt: str, model_name: str = DEFAULT_MODEL, generation_config=None):
+        """Awaitable Gemini call, rate limited and retried on 429/5xx."""
+        return await self._on_loop(self._generate(prompt, model_name, generation_config))
+
+    async def _stream(self, prompt: str, model_name: str, generation_config, emit):
+        model = genai.GenerativeModel(model_name)
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(prompt)
+            emitted = False
+            try:
+                async with self.in_flight:
+                    response = await model.generate_content_async(prompt, generation_config=generation_config, stream=True)
+                    async for chunk in response:
+                        if chunk.text:
+                            emitted = True
+                            emit(chunk.text)
+                    return
+            except Exception as e:
+                # Once text has been delivered a retry would repeat it to the caller.
+                if emitted or not is_retryable_error(e) or attempt == self.max_retries:
+                    raise
+                delay = self._backoff_delay(attempt)
+                print(f"        - Gemini stream throttled or failed ({e}). Retrying in {delay:.1f}s (attempt {attempt + 1}/{self.max_retries})...")
+                await asyncio.sleep(delay)
+
+    async def astream(self, prompt: str, model_name: str = DEFAULT_MODEL, generation_config=None):
+        """
+        Async iterator over the text chunks of a streamed Gemini call, rate
+        limited like agenerate. Retried on 429/5xx only until the first chunk
+        arrives. Closing the iterator cancels the call.
+        """
+        caller_loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue()
+
+        def emit(item):
+            try:
+                caller_loop.call_soon_threadsafe(chunks.put_nowait, item)
+            except RuntimeError:
+                # The caller's loop has closed; nobody is listening any more.
+                pass
+
+        future = asyncio.run_coroutine_threadsafe(self._stream(prompt, model_name, generation_config, emit), self.loop)
+        future.add_done_callback(lambda _: emit(_STREAM_END))
+        try:
+            while True:
+                item = await chunks.get()
+                if item is _STREAM_END:
+                    break
+                yield item
+            # Re-raises the stream's error, if any.
+            future.result()
+        finally:
+            future.cancel()
+
+    def generate(self, prompt: str, model_name: str = DEFAULT_MODEL, generation_config=None):
+        """Blocking Gemini call for sync code paths, rate limited and retried on 429/5xx."""
+        return self.run_coroutine(self._generate(prompt, model_name, generation_config))
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_scheduler() -> GeminiScheduler:
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = GeminiScheduler()
+        return _scheduler
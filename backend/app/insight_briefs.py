@@ -0,0 +1,171 @@
+import argparse
+import asyncio
+import os
+import threading
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.models import models
+from app.gemini_scheduler import DEFAULT_MODEL, get_scheduler
+from app.pipeline_cache import get_cache, hash_texts
+
+# Evidence briefs for /api/v1/insights/detail. Insights only change when a
+# report is re-audited, so the brief and the journalist questions are
+# generated once, in background batches right after the audit, and stored on
+# the insight. Questions are memoised by brief text in the "briefs" cache
+# namespace, so re-ingesting an unchanged report makes no Gemini calls.
+# Generate briefs for insights created before they were stored:  python -m app.insight_briefs backfill
+
+# Bump whenever the questions prompt changes so cached questions are not reused.
+INSIGHT_BRIEF_PROMPT_VERSION = "1"
+# Insights generated concurrently and committed together.
+INSIGHT_BRIEF_BATCH_SIZE = int(os.getenv("INSIGHT_BRIEF_BATCH_SIZE", "10"))
+
+NO_EVIDENCE_NOTE = "*No specific projects were automatically linked as evidence for this finding by the AI auditor.*"
+
+def load_evidence(db: Session, insight_ids: list) -> dict:
+    """Returns {insight_id: [(description, amount, contractor, reasoning)]} in one joined query."""
+    rows = (
+        db.query(models.Evidence.insight_id, models.Project.project_description, models.Project.allocated_amount, models.Project.contractor_ngo_name, models.Evidence.reasoning)
+        .join(models.Project, models.Project.id == models.Evidence.project_id)
+        .filter(models.Evidence.insight_id.in_(insight_ids))
+        .order_by(models.Evidence.insight_id, models.Evidence.id)
+        .all()
+    )
+    evidence = {}
+    for insight_id, *row in rows:
+        evidence.setdefault(insight_id, []).append(tuple(row))
+    return evidence
+
+def build_evidence_brief(title: str, finding: str, evidence: list) -> str:
+    if not evidence:
+        return f"**Finding:** {finding}\n\n{NO_EVIDENCE_NOTE}"
+    brief = f"## Detailed Analysis: {title}\n\n"
+    brief += f"**Finding:** {finding}\n\n"
+    brief += "### Supporting Evidence from Report:\n"
+    for description, amount, contractor, reasoning in evidence:
+        brief += f"- **Project:** *{description or 'N/A'}*\n"
+        brief += f"  - **Amount:** {amount or 0:,.0f} INR\n"
+        brief += f"  - **Contractor:** {contractor or 'N/A'}\n"
+        brief += f"  - **Auditor's Note:** {reasoning}\n\n"
+    return brief
+
+def compose_detail(brief: str, questions: str = None) -> str:
+    if not questions:
+        return brief
+    return brief + "\n### Suggested Questions for the MP\n" + questions
+
+async def _generate_questions(scheduler, brief: str) -> str:
+    prompt = f"Based on the following evidence brief, generate 2 specific, data-driven questions a journalist could ask an MP:\n\n{brief}"
+    response = await scheduler.agenerate(prompt)
+    return response.text
+
+def _prepare_briefs(db: Session, insights: list) -> tuple:
+    """Returns ({insight_id: brief}, ids of the insights that have evidence and so need questions)."""
+    evidence = load_evidence(db, [insight.id for insight in insights])
+    briefs = {insight.id: build_evidence_brief(insight.title, insight.finding, evidence.get(insight.id)) for insight in insights}
+    return briefs, set(evidence)
+
+async def _questions_for(briefs: dict) -> dict:
+    """Returns {insight_id: questions} for `briefs`, from the cache or concurrent Gemini calls. Failed calls are left out."""
+    # The first call opens (and may create) the cache database.
+    cache = await asyncio.to_thread(get_cache)
+    keys = {insight_id: hash_texts(DEFAULT_MODEL, INSIGHT_BRIEF_PROMPT_VERSION, brief) for insight_id, brief in briefs.items()}
+    cached = await cache.aget_many("briefs", list(keys.values())) if cache else {}
+    questions = {insight_id: cached[key] for insight_id, key in keys.items() if key in cached}
+    pending = [insight_id for insight_id in briefs if insight_id not in questions]
+    if not pending:
+        return questions
+    scheduler = get_scheduler()
+    results = await asyncio.gather(*[_generate_questions(scheduler, briefs[insight_id]) for insight_id in pending], return_exceptions=True)
+    for insight_id, result in zip(pending, results):
+        if isinstance(result, Exception):
+            print(f"    - Brief for insight {insight_id} FAILED: {result}")
+            continue
+        questions[insight_id] = result
+        if cache:
+            await cache.aset("briefs", keys[insight_id], result)
+    return questions
+
+def _store_briefs(insights: list, briefs: dict, with_evidence: set, questions: dict) -> int:
+    stored = 0
+    for insight in insights:
+        if insight.id in with_evidence and insight.id not in questions:
+            continue
+        insight.detailed_brief = briefs[insight.id]
+        insight.suggested_questions = questions.get(insight.id)
+        stored += 1
+    return stored
+
+def generate_briefs(db: Session, insights: list) -> int:
+    """
+    Builds and stores the brief and questions of each insight, with the Gemini
+    calls of the batch running concurrently. Insights whose questions could not
+    be generated are left without a brief. Commits; returns the number stored.
+    """
+    if not insights:
+        return 0
+    briefs, with_evidence = _prepare_briefs(db, insights)
+    questions = get_scheduler().run_coroutine(_questions_for({insight_id: briefs[insight_id] for insight_id in with_evidence}))
+    stored = _store_briefs(insights, briefs, with_evidence, questions)
+    db.commit()
+    return stored
+
+async def agenerate_briefs(db: AsyncSession, insights: list) -> int:
+    """generate_briefs for async request handlers."""
+    if not insights:
+        return 0
+    briefs, with_evidence = await db.run_sync(_prepare_briefs, insights)
+    # Hand the connection back to the pool while Gemini runs (the session does not expire on commit).
+    await db.commit()
+    questions = await _questions_for({insight_id: briefs[insight_id] for insight_id in with_evidence})
+    stored = _store_briefs(insights, briefs, with_evidence, questions)
+    await db.commit()
+    return stored
+
+def generate_missing_briefs(db: Session, insight_ids: list = None) -> int:
+    """Generates briefs for `insight_ids` (every insight when None) that do not have one yet."""
+    query = db.query(models.AIInsight.id).filter(models.AIInsight.detailed_brief.is_(None))
+    if insight_ids is not None:
+        query = query.filter(models.AIInsight.id.in_(insight_ids))
+    missing = [row.id for row in query.order_by(models.AIInsight.id)]
+    stored = 0
+    for start in range(0, len(missing), INSIGHT_BRIEF_BATCH_SIZE):
+        batch = db.query(models.AIInsight).filter(models.AIInsight.id.in_(missing[start:start + INSIGHT_BRIEF_BATCH_SIZE])).all()
+        stored += generate_briefs(db, batch)
+        print(f"  [Briefs] Stored {stored}/{len(missing)} insight briefs.")
+    return stored
+
+def generate_briefs_in_background(insight_ids: list):
+    """Runs generate_missing_briefs on its own session without blocking the caller."""
+    from app.database import SessionLocal
+
+    if not insight_ids:
+        return
+
+    def _run():
+        db = SessionLocal()
+        try:
+            generate_missing_briefs(db, insight_ids)
+        except Exception as e:
+            print(f"  [Briefs] Brief generation failed: {e}")
+            db.rollback()
+        finally:
+            db.close()
+
+    threading.Thread(target=_run, name="insight-briefs", daemon=True).start()
+
+def main():
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Maintain precomputed insight briefs.")
+    parser.add_argument("command", choices=["backfill"], help="Generate briefs for every insight that has none.")
+    parser.parse_args()
+    db = SessionLocal()
+    try:
+        count = generate_missing_briefs(db)
+        print(f"Stored {count} insight briefs.")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
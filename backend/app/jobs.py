@@ -0,0 +1,115 @@
+import datetime
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from app.database import SessionLocal
+from app.models import models
+from app.processor import process_inbox, recover_claimed_reports
+from app.progress import ReportProgress
+
+# Inbox runs are executed off the request thread. Jobs live in the
+# `processing_jobs` table so their status survives the request and can be polled.
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "1"))
+# Minimum seconds between progress writes while a job is running.
+JOB_PROGRESS_FLUSH_SECONDS = float(os.getenv("JOB_PROGRESS_FLUSH_SECONDS", "1"))
+
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job-runner")
+
+class JobTracker:
+    """Collects ReportProgress for every report in a job and persists it, throttled."""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.reports = {}
+        self._lock = threading.Lock()
+        self._last_flush = 0.0
+
+    def report(self, filename: str) -> ReportProgress:
+        progress = ReportProgress(on_change=self._on_change)
+        with self._lock:
+            self.reports[filename] = progress
+        self._on_change()
+        return progress
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            reports = dict(self.reports)
+        return {"reports": {filename: progress.snapshot() for filename, progress in reports.items()}}
+
+    def _on_change(self):
+        now = time.time()
+        with self._lock:
+            if now - self._last_flush < JOB_PROGRESS_FLUSH_SECONDS:
+                return
+            self._last_flush = now
+        self.flush()
+
+    def flush(self, **fields):
+        db = SessionLocal()
+        try:
+            db.query(models.ProcessingJob).filter(models.ProcessingJob.id == self.job_id).update({"progress": self.snapshot(), **fields})
+            db.commit()
+        finally:
+            db.close()
+
+def _run_job(job_id: str):
+    tracker = JobTracker(job_id)
+    tracker.flush(status=models.JobStatus.RUNNING, started_at=datetime.datetime.utcnow())
+    print(f"--- JOBS: Started processing job {job_id} ---")
+    try:
+        result = process_inbox(progress_factory=tracker.report)
+        tracker.flush(status=models.JobStatus.SUCCEEDED, result=result, finished_at=datetime.datetime.utcnow())
+        print(f"--- JOBS: Job {job_id} finished ---")
+    except Exception as e:
+        print(f"--- JOBS: Job {job_id} FAILED: {e} ---")
+        tracker.flush(status=models.JobStatus.FAILED, error=str(e), finished_at=datetime.datetime.utcnow())
+
+def enqueue_inbox_job() -> models.ProcessingJob:
+    db = SessionLocal()
+    try:
+        job = models.ProcessingJob(id=uuid.uuid4().hex, status=models.JobStatus.QUEUED, progress={})
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        db.expunge(job)
+    finally:
+        db.close()
+    _executor.submit(_run_job, job.id)
+    return job
+
+async def aenqueue_inbox_job(db) -> models.ProcessingJob:
+    """enqueue_inbox_job for async request handlers, on the handler's AsyncSession."""
+    job = models.ProcessingJob(id=uuid.uuid4().hex, status=models.JobStatus.QUEUED, progress={})
+    db.add(job)
+    await db.commit()
+    _executor.submit(_run_job, job.id)
+    return job
+
+def resume_pending_jobs():
+    """
+    Called at startup: jobs left Running by a previous process are marked
+    Failed, and jobs that were still Queued are scheduled again. Reports the
+    interrupted jobs had claimed go back to the inbox and get a new job.
+    """
+    recovered = recover_claimed_reports()
+    db = SessionLocal()
+    try:
+        interrupted = db.query(models.ProcessingJob).filter(models.ProcessingJob.status == models.JobStatus.RUNNING).all()
+        for job in interrupted:
+            job.status = models.JobStatus.FAILED
+            job.error = "Interrupted by a server restart."
+            job.finished_at = datetime.datetime.utcnow()
+        queued_ids = [job.id for job in db.query(models.ProcessingJob).filter(models.ProcessingJob.status == models.JobStatus.QUEUED).order_by(models.ProcessingJob.created_at)]
+        db.commit()
+    finally:
+        db.close()
+    for job_id in queued_ids:
+        _executor.submit(_run_job, job_id)
+    # A queued job processes the whole inbox, recovered reports included.
+    if recovered and not queued_ids:
+        enqueue_inbox_job()
+    if interrupted or queued_ids:
+        print(f"-> Jobs: marked {len(interrupted)} interrupted jobs as failed, re-queued {len(queued_ids)}.")
@@ -1,9 +1,13 @@
 import enum
 import datetime
-from sqlalchemy import Column, Integer, String, Float, Date, Enum, ForeignKey, Text
+from sqlalchemy import Column, Integer, BigInteger, SmallInteger, String, Float, Date, DateTime, Enum, ForeignKey, Text, JSON, Index, LargeBinary, event, inspect
 from sqlalchemy.orm import relationship
 from app.database import Base
 
+def _slugify(name: str) -> str:
+    from app.constituency_resolver import slugify
+    return slugify(name)
+
 class TransparencyStatus(str, enum.Enum):
     CURRENT = "Current"
     OUTDATED = "Outdated"
@@ -14,6 +18,18 @@ class AISeverity(str, enum.Enum):
     MEDIUM = "Medium"
     LOW = "Low"
 
+class ReportStatus(str, enum.Enum):
+    BUILDING = "Building"
+    CURRENT = "Current"
+    SUPERSEDED = "Superseded"
+    FAILED = "Failed"
+
+class JobStatus(str, enum.Enum):
+    QUEUED = "Queued"
+    RUNNING = "Running"
+    SUCCEEDED = "Succeeded"
+    FAILED = "Failed"
+
 # New table to store the evidence for each finding
 class Evidence(Base):
     __tablename__ = "evidence"
@@ -27,33 +43,134 @@ class Constituency(Base):
     id = Column(Integer, primary_key=True, index=True)
     mp_name = Column(String, index=True)
     constituency_name = Column(String, unique=True, index=True)
+    # URL form of the name, e.g. "bangalore-central", "bellary-st"
+    slug = Column(String, unique=True, index=True, default=lambda context: _slugify(context.get_current_parameters()["constituency_name"]))
     state = Column(String, index=True)
     transparency_status = Column(Enum(TransparencyStatus), default=TransparencyStatus.MISSING)
     last_report_date = Column(Date, nullable=True)
     mp_email = Column(String, nullable=True)
     mp_image_url = Column(String, nullable=True)
+    # The published report version. Readers only see projects and insights of this report.
+    current_report_id = Column(Integer, ForeignKey("reports.id", use_alter=True, ondelete="SET NULL"), nullable=True)
+    # Bumped whenever the constituency's dashboard data changes; see app.dashboard_cache.
+    data_version = Column(Integer, default=0, nullable=False, server_default="0")
     projects = relationship("Project", back_populates="constituency", cascade="all, delete-orphan")
     ai_insights = relationship("AIInsight", back_populates="constituency", cascade="all, delete-orphan")
+    # Keyset pagination of the constituency list, unfiltered or by state, and by status.
+    __table_args__ = (
+        Index("ix_constituencies_state_name", "state", "constituency_name"),
+        Index("ix_constituencies_status_state_name", "transparency_status", "state", "constituency_name"),
+    )
+
+@event.listens_for(Constituency, "before_update")
+def _constituency_renamed(mapper, connection, target):
+    # The name resolver and the dashboard caches notice a rename through data_version.
+    if inspect(target).attrs.constituency_name.history.has_changes():
+        target.slug = _slugify(target.constituency_name)
+        target.data_version = (target.data_version or 0) + 1
 
 class Project(Base):
     __tablename__ = "projects"
     id = Column(Integer, primary_key=True, index=True)
     constituency_id = Column(Integer, ForeignKey("constituencies.id"))
+    report_id = Column(Integer, ForeignKey("reports.id", ondelete="CASCADE"), nullable=True, index=True)
     project_description = Column(Text)
     allocated_amount = Column(Float)
     expenditure_date = Column(Date, nullable=True)
     location = Column(String)
-    contractor_ngo_name = Column(String, index=True)
+    contractor_ngo_name = Column(String, index=True) # As extracted; see contractor_id for the entity
+    contractor_id = Column(Integer, ForeignKey("contractors.id"), nullable=True, index=True)
     category = Column(String, index=True)
     constituency = relationship("Constituency", back_populates="projects")
+    contractor = relationship("Contractor")
     evidence_pieces = relationship("Evidence", backref="project")
 
 class AIInsight(Base):
     __tablename__ = "ai_insights"
     id = Column(Integer, primary_key=True, index=True)
     constituency_id = Column(Integer, ForeignKey("constituencies.id"))
+    report_id = Column(Integer, ForeignKey("reports.id", ondelete="CASCADE"), nullable=True, index=True)
     title = Column(String)
     finding = Column(Text)
     severity = Column(Enum(AISeverity))
+    detailed_brief = Column(Text, nullable=True) # Evidence brief, precomputed by app.insight_briefs; NULL until generated
+    suggested_questions = Column(Text, nullable=True)
     constituency = relationship("Constituency", back_populates="ai_insights")
-    evidence_pieces = relationship("Evidence", backref="insight", cascade="all, delete-orphan")
\ No newline at end of file
+    evidence_pieces = relationship("Evidence", backref="insight", cascade="all, delete-orphan")
+
+# A contractor / implementing agency as an entity. Name variants produced by
+# OCR and the LLM ("M/s ABC Constructions", "ABC Construction Pvt Ltd") are
+# resolved to one row by app.contractors at ingest time.
+class Contractor(Base):
+    __tablename__ = "contractors"
+    id = Column(Integer, primary_key=True, index=True)
+    canonical_name = Column(String) # First spelling seen, used for display
+    normalized_name = Column(String, unique=True, index=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+# Character trigrams of each contractor's distinctive name tokens. Contractors
+# sharing enough trigrams with a new name are its fuzzy-match candidates.
+class ContractorBlockKey(Base):
+    __tablename__ = "contractor_block_keys"
+    key = Column(String, primary_key=True)
+    contractor_id = Column(Integer, ForeignKey("contractors.id", ondelete="CASCADE"), primary_key=True, index=True)
+
+# One ingested version of a constituency's report. Projects and insights are
+# written against a Building report and become visible in one step when
+# constituencies.current_report_id is pointed at it.
+class Report(Base):
+    __tablename__ = "reports"
+    id = Column(Integer, primary_key=True, index=True)
+    constituency_id = Column(Integer, ForeignKey("constituencies.id", ondelete="CASCADE"), index=True)
+    source_file = Column(String, nullable=True)
+    status = Column(Enum(ReportStatus), default=ReportStatus.BUILDING, index=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    published_at = Column(DateTime, nullable=True)
+
+class ProcessingJob(Base):
+    __tablename__ = "processing_jobs"
+    id = Column(String, primary_key=True)
+    status = Column(Enum(JobStatus), default=JobStatus.QUEUED, index=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    progress = Column(JSON, default=dict) # Per-report stage counters and timings
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+
+# --- Spending rollups, maintained at ingest time by app.rollups ---
+
+class ConstituencyCategorySpending(Base):
+    __tablename__ = "constituency_category_spending"
+    constituency_id = Column(Integer, ForeignKey("constituencies.id", ondelete="CASCADE"), primary_key=True)
+    category = Column(String, primary_key=True)
+    total_amount = Column(Float, default=0.0)
+    project_count = Column(Integer, default=0)
+
+class ConstituencyContractorSpending(Base):
+    __tablename__ = "constituency_contractor_spending"
+    constituency_id = Column(Integer, ForeignKey("constituencies.id", ondelete="CASCADE"), primary_key=True)
+    contractor_id = Column(Integer, ForeignKey("contractors.id"), primary_key=True)
+    total_amount = Column(Float, default=0.0)
+    project_count = Column(Integer, default=0)
+    __table_args__ = (Index("ix_constituency_contractor_spending_amount", "constituency_id", "total_amount"),)
+
+class StateSpending(Base):
+    __tablename__ = "state_spending"
+    state = Column(String, primary_key=True)
+    total_amount = Column(Float, default=0.0)
+    project_count = Column(Integer, default=0)
+    reporting_constituencies = Column(Integer, default=0)
+
+# --- Near-duplicate project index, maintained at ingest time by app.duplicates ---
+
+class ProjectSignature(Base):
+    __tablename__ = "project_signatures"
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True)
+    minhash = Column(LargeBinary) # MinHash signature as packed uint32 values
+
+class ProjectLshBucket(Base):
+    __tablename__ = "project_lsh_buckets"
+    band = Column(SmallInteger, primary_key=True)
+    bucket = Column(BigInteger, primary_key=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True, index=True)
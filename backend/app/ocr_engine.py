@@ -0,0 +1,90 @@
+import os
+import platform
+from concurrent.futures import ProcessPoolExecutor
+import pytesseract
+from pdf2image import convert_from_path, pdfinfo_from_path
+from app.pipeline_cache import get_cache, hash_page_image
+
+# Pages rasterised per worker task. Each task only holds this many page images
+# in memory, so peak memory is bounded by OCR_WORKERS * OCR_CHUNK_PAGES pages.
+OCR_CHUNK_PAGES = int(os.getenv("OCR_CHUNK_PAGES", "4"))
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+OCR_DPI = int(os.getenv("OCR_DPI", "200"))
+
+WINDOWS_TESSERACT_PATH = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+
+def configure_tesseract():
+    if platform.system() == "Windows":
+        if os.path.exists(WINDOWS_TESSERACT_PATH):
+            pytesseract.pytesseract.tesseract_cmd = WINDOWS_TESSERACT_PATH
+        else:
+            raise FileNotFoundError(f"Tesseract executable not found at {WINDOWS_TESSERACT_PATH}.")
+
+def get_page_count(pdf_path: str) -> int:
+    return int(pdfinfo_from_path(pdf_path)["Pages"])
+
+def _ocr_page_range(pdf_path: str, first_page: int, last_page: int, dpi: int) -> list:
+    # Runs inside a worker process: rasterise only this chunk, OCR it, and send
+    # back plain text so page images never cross the process boundary.
+    configure_tesseract()
+    cache = get_cache()
+    images = convert_from_path(pdf_path, dpi=dpi, first_page=first_page, last_page=last_page)
+    texts = []
+    for image in images:
+        # Pages are keyed by their rasterised pixels, so a re-issued report only
+        # pays OCR for the pages that actually changed.
+        key = hash_page_image(image) if cache else None
+        text = cache.get("ocr", key) if cache else None
+        if text is None:
+            text = pytesseract.image_to_string(image)
+            if cache:
+                cache.set("ocr", key, text)
+        texts.append(text)
+        image.close()
+    return texts
+
+def _chunk_ranges(page_numbers: list, chunk_size: int):
+    # Split into runs of consecutive pages, each at most `chunk_size` long, so
+    # every chunk can be rasterised with a single first_page/last_page call.
+    run = []
+    for page_number in page_numbers:
+        if run and (page_number != run[-1] + 1 or len(run) == chunk_size):
+            yield run[0], run[-1]
+            run = []
+        run.append(page_number)
+    if run:
+        yield run[0], run[-1]
+
+def iter_page_texts(pdf_path: str, workers: int = None, chunk_size: int = None, dpi: int = None, page_numbers: list = None):
+    """
+    Yields the OCR text of each page of `pdf_path` (or only of the 1-based
+    `page_numbers`), in page order, as soon as it and every page before it
+    is available.
+    """
+    workers = workers or OCR_WORKERS
+    chunk_size = chunk_size or OCR_CHUNK_PAGES
+    dpi = dpi or OCR_DPI
+    if page_numbers is None:
+        page_numbers = range(1, get_page_count(pdf_path) + 1)
+    ranges = list(_chunk_ranges(sorted(page_numbers), chunk_size))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Keep at most `workers` chunks in flight so finished-but-unconsumed
+        # results cannot pile up ahead of the caller.
+        pending = []
+        next_range = 0
+        while next_range < len(ranges) and len(pending) < workers:
+            first_page, last_page = ranges[next_range]
+            pending.append(pool.submit(_ocr_page_range, pdf_path, first_page, last_page, dpi))
+            next_range += 1
+        while pending:
+            texts = pending.pop(0).result()
+            if next_range < len(ranges):
+                first_page, last_page = ranges[next_range]
+                pending.append(pool.submit(_ocr_page_range, pdf_path, first_page, last_page, dpi))
+                next_range += 1
+            for text in texts:
+                yield text
+
+def extract_page_texts(pdf_path: str, workers: int = None, chunk_size: int = None, dpi: int = None, page_numbers: list = None) -> list:
+    return list(iter_page_texts(pdf_path, workers=workers, chunk_size=chunk_size, dpi=dpi, page_numbers=page_numbers))
@@ -0,0 +1,76 @@
+import os
+from app.gemini_scheduler import estimate_tokens
+
+# Input-token budget per structuring call. The structured JSON is usually about
+# as long as the page text it came from, so this also bounds the response size
+# well below the model's output limit.
+STRUCTURING_TOKEN_BUDGET = int(os.getenv("STRUCTURING_TOKEN_BUDGET", "3000"))
+
+class PageBatch:
+    def __init__(self, page_numbers: list, pages: list):
+        # 1-based PDF page numbers; not always consecutive when only some pages were OCR'd.
+        self.page_numbers = page_numbers
+        self.pages = pages
+
+    @property
+    def first_page(self) -> int:
+        return self.page_numbers[0]
+
+    @property
+    def last_page(self) -> int:
+        return self.page_numbers[-1]
+
+    @property
+    def tokens(self) -> int:
+        return sum(estimate_tokens(page) for page in self.pages)
+
+    def split(self):
+        middle = len(self.pages) // 2
+        return PageBatch(self.page_numbers[:middle], self.pages[:middle]), PageBatch(self.page_numbers[middle:], self.pages[middle:])
+
+class PagePacker:
+    """
+    Greedily groups consecutive pages into batches of at most `token_budget`
+    estimated tokens. A single page larger than the budget becomes its own batch.
+    Pages can be added one at a time, so batches are emitted while OCR is running.
+    """
+
+    def __init__(self, token_budget: int = STRUCTURING_TOKEN_BUDGET):
+        self.token_budget = token_budget
+        self.next_page = 1
+        self.current = []
+        self.current_numbers = []
+        self.current_tokens = 0
+
+    def add(self, page: str, page_number: int = None):
+        """Adds the next page and returns a finished PageBatch, or None."""
+        page_number = page_number or self.next_page
+        page_tokens = estimate_tokens(page)
+        finished = None
+        if self.current and self.current_tokens + page_tokens > self.token_budget:
+            finished = self._flush()
+        self.current.append(page)
+        self.current_numbers.append(page_number)
+        self.current_tokens += page_tokens
+        self.next_page = page_number + 1
+        return finished
+
+    def flush(self):
+        """Returns the final partial batch, or None if nothing is pending."""
+        return self._flush() if self.current else None
+
+    def _flush(self):
+        batch = PageBatch(self.current_numbers, self.current)
+        self.current = []
+        self.current_numbers = []
+        self.current_tokens = 0
+        return batch
+
+def pack_pages(pages: list, token_budget: int = STRUCTURING_TOKEN_BUDGET, page_numbers: list = None) -> list:
+    packer = PagePacker(token_budget)
+    page_numbers = page_numbers or range(1, len(pages) + 1)
+    batches = [batch for batch in (packer.add(page, number) for page, number in zip(pages, page_numbers)) if batch]
+    last_batch = packer.flush()
+    if last_batch:
+        batches.append(last_batch)
+    return batches
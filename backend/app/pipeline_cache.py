@@ -0,0 +1,220 @@
+import argparse
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# Persistent, content-addressed cache for the expensive pipeline stages.
+#   "ocr"       -> key: SHA-256 of a rasterised page image, value: OCR text
+#   "structure" -> key: SHA-256 of a page's text,           value: projects JSON of that page
+# Entries are evicted least-recently-used once the store exceeds CACHE_MAX_BYTES.
+# Every call is blocking sqlite3 I/O; code running on an event loop (Gemini
+# scheduler, async request handlers) uses the a*-prefixed variants, which run
+# it in a worker thread.
+
+BACKEND_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+CACHE_DIR = os.getenv("PIPELINE_CACHE_DIR", os.path.join(BACKEND_ROOT, "pipeline_cache"))
+CACHE_MAX_BYTES = int(os.getenv("PIPELINE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+CACHE_ENABLED = os.getenv("PIPELINE_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+
+def hash_page_image(image) -> str:
+    digest = hashlib.sha256()
+    digest.update(f"{image.mode}:{image.size[0]}x{image.size[1]}:".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+def hash_texts(*parts: str) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        encoded = part.encode("utf-8")
+        # Length-prefix each part so ("ab", "c") and ("a", "bc") hash differently.
+        digest.update(f"{len(encoded)}:".encode())
+        digest.update(encoded)
+    return digest.hexdigest()
+
+# An upsert rather than INSERT OR REPLACE: the replaced row's delete would not fire the size trigger.
+_UPSERT_ENTRY = (
+    "INSERT INTO entries (namespace, key, value, size, created_at, last_access, hits) VALUES (?, ?, ?, ?, ?, ?, 0)"
+    " ON CONFLICT (namespace, key) DO UPDATE SET value = excluded.value, size = excluded.size,"
+    " created_at = excluded.created_at, last_access = excluded.last_access, hits = 0"
+)
+EVICT_BATCH = 100
+
+class PipelineCache:
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.path = os.path.join(directory, "cache.sqlite3")
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " namespace TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " last_access REAL NOT NULL,"
+                " hits INTEGER NOT NULL DEFAULT 0,"
+                " PRIMARY KEY (namespace, key))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_entries_last_access ON entries (last_access)")
+            # Running total of entries.size, kept by triggers in the writing transaction,
+            # so a write does not have to scan the table to know whether to evict.
+            conn.execute("CREATE TABLE IF NOT EXISTS totals (id INTEGER PRIMARY KEY CHECK (id = 1), size INTEGER NOT NULL)")
+            if conn.execute("SELECT 1 FROM totals").fetchone() is None:
+                conn.execute("INSERT INTO totals (id, size) SELECT 1, COALESCE(SUM(size), 0) FROM entries")
+            conn.execute("CREATE TRIGGER IF NOT EXISTS entries_size_insert AFTER INSERT ON entries BEGIN UPDATE totals SET size = size + new.size; END")
+            conn.execute("CREATE TRIGGER IF NOT EXISTS entries_size_update AFTER UPDATE OF size ON entries BEGIN UPDATE totals SET size = size + new.size - old.size; END")
+            conn.execute("CREATE TRIGGER IF NOT EXISTS entries_size_delete AFTER DELETE ON entries BEGIN UPDATE totals SET size = size - old.size; END")
+
+    @contextmanager
+    def _connect(self):
+        # A fresh connection per operation keeps the cache safe to share between
+        # the OCR worker processes and the API threads.
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, namespace: str, key: str):
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM entries WHERE namespace = ? AND key = ?", (namespace, key)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE entries SET last_access = ?, hits = hits + 1 WHERE namespace = ? AND key = ?", (time.time(), namespace, key))
+            return row[0]
+
+    def get_many(self, namespace: str, keys: list) -> dict:
+        """Returns {key: value} for the keys that are cached, in one connection."""
+        found = {}
+        with self._connect() as conn:
+            for key in dict.fromkeys(keys):
+                row = conn.execute("SELECT value FROM entries WHERE namespace = ? AND key = ?", (namespace, key)).fetchone()
+                if row is not None:
+                    found[key] = row[0]
+            if found:
+                conn.executemany("UPDATE entries SET last_access = ?, hits = hits + 1 WHERE namespace = ? AND key = ?", [(time.time(), namespace, key) for key in found])
+        return found
+
+    async def aget(self, namespace: str, key: str):
+        return await asyncio.to_thread(self.get, namespace, key)
+
+    async def aget_many(self, namespace: str, keys: list) -> dict:
+        return await asyncio.to_thread(self.get_many, namespace, keys)
+
+    async def aset(self, namespace: str, key: str, value: str):
+        # Includes the eviction pass, the slowest part of a write.
+        await asyncio.to_thread(self.set, namespace, key, value)
+
+    def set(self, namespace: str, key: str, value: str):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                _UPSERT_ENTRY,
+                (namespace, key, value, len(value.encode("utf-8")), now, now),
+            )
+        self.evict()
+
+    def set_many(self, namespace: str, values: dict):
+        """Stores {key: value} in one transaction."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                _UPSERT_ENTRY,
+                [(namespace, key, value, len(value.encode("utf-8")), now, now) for key, value in values.items()],
+            )
+        self.evict()
+
+    async def aset_many(self, namespace: str, values: dict):
+        await asyncio.to_thread(self.set_many, namespace, values)
+
+    def total_bytes(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT size FROM totals").fetchone()[0]
+
+    def evict(self):
+        with self._lock, self._connect() as conn:
+            total = conn.execute("SELECT size FROM totals").fetchone()[0]
+            if total <= self.max_bytes:
+                return 0
+            removed = 0
+            # Oldest first, a few at a time through the last_access index, until the store fits.
+            while total > self.max_bytes:
+                oldest = conn.execute("SELECT namespace, key, size FROM entries ORDER BY last_access LIMIT ?", (EVICT_BATCH,)).fetchall()
+                if not oldest:
+                    break
+                for namespace, key, size in oldest:
+                    if total <= self.max_bytes:
+                        break
+                    conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+                    total -= size
+                    removed += 1
+            return removed
+
+    def stats(self) -> dict:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT namespace, COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(hits), 0) FROM entries GROUP BY namespace").fetchall()
+        namespaces = {namespace: {"entries": count, "bytes": size, "hits": hits} for namespace, count, size, hits in rows}
+        return {
+            "path": self.path,
+            "max_bytes": self.max_bytes,
+            "total_bytes": sum(n["bytes"] for n in namespaces.values()),
+            "namespaces": namespaces,
+        }
+
+    def purge(self, namespace: str = None, older_than_days: float = None) -> int:
+        clauses, params = [], []
+        if namespace:
+            clauses.append("namespace = ?")
+            params.append(namespace)
+        if older_than_days is not None:
+            clauses.append("last_access < ?")
+            params.append(time.time() - older_than_days * 86400)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._connect() as conn:
+            removed = conn.execute(f"DELETE FROM entries{where}", params).rowcount
+        with self._connect() as conn:
+            conn.execute("VACUUM")
+        return removed
+
+_cache = None
+
+def get_cache():
+    """Returns the process-wide cache, or None when caching is disabled."""
+    global _cache
+    if not CACHE_ENABLED:
+        return None
+    if _cache is None:
+        _cache = PipelineCache()
+    return _cache
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or purge the OCR/structuring pipeline cache.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("stats", help="Show entry counts and sizes per namespace.")
+    purge_parser = subparsers.add_parser("purge", help="Delete cached entries.")
+    purge_parser.add_argument("--namespace", choices=["ocr", "structure", "vagueness", "briefs"], help="Only purge this namespace.")
+    purge_parser.add_argument("--older-than-days", type=float, help="Only purge entries not used for this many days.")
+    args = parser.parse_args()
+
+    cache = PipelineCache()
+    if args.command == "stats":
+        stats = cache.stats()
+        print(f"Cache: {stats['path']}")
+        print(f"Size:  {stats['total_bytes']:,} / {stats['max_bytes']:,} bytes")
+        for namespace, info in sorted(stats["namespaces"].items()):
+            print(f"  {namespace:<10} {info['entries']:>8,} entries  {info['bytes']:>14,} bytes  {info['hits']:>8,} hits")
+    elif args.command == "purge":
+        removed = cache.purge(namespace=args.namespace, older_than_days=args.older_than_days)
+        print(f"Purged {removed} cache entries.")
+
+if __name__ == "__main__":
+    main()
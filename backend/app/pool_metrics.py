@@ -0,0 +1,88 @@
+import threading
+import time
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Connection pool checkout metrics. Every engine in app.database uses a timed
+# pool class that records how long each checkout waited for a connection; a
+# growing wait on a pool means its callers are queuing for connections, not
+# for the database. Served by GET /api/v1/metrics/db-pools.
+
+# Upper bounds (seconds) of the checkout wait histogram buckets.
+WAIT_BUCKETS = (0.001, 0.01, 0.1, 1.0, 10.0)
+
+class PoolStats:
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.buckets = [0] * (len(WAIT_BUCKETS) + 1)
+        self.lock = threading.Lock()
+
+    def record(self, waited: float, timed_out: bool = False):
+        with self.lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+            self.buckets[next((index for index, bound in enumerate(WAIT_BUCKETS) if waited <= bound), len(WAIT_BUCKETS))] += 1
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            labels = [f"le_{bound:g}s" for bound in WAIT_BUCKETS] + ["gt_{:g}s".format(WAIT_BUCKETS[-1])]
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_avg": round(self.wait_seconds_total / self.checkouts, 6) if self.checkouts else 0.0,
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+                "wait_histogram": dict(zip(labels, self.buckets)),
+            }
+
+# pool name -> (PoolStats, engine)
+_pools = {}
+_pools_lock = threading.Lock()
+
+def _stats(name: str) -> PoolStats:
+    with _pools_lock:
+        return _pools.setdefault(name, (PoolStats(), None))[0]
+
+class _TimedCheckout:
+    metrics_name = "default"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            _stats(self.metrics_name).record(time.perf_counter() - started, timed_out=True)
+            raise
+        _stats(self.metrics_name).record(time.perf_counter() - started)
+        return connection
+
+def timed_pool_class(name: str, is_async: bool = False):
+    """QueuePool (or AsyncAdaptedQueuePool) subclass recording checkout waits under `name`."""
+    base = AsyncAdaptedQueuePool if is_async else QueuePool
+    # A subclass rather than an attribute on the instance: Engine.dispose() recreates the pool from its class.
+    return type(f"Timed{base.__name__}", (_TimedCheckout, base), {"metrics_name": name})
+
+def register_engine(name: str, engine):
+    """Makes the live size/checked-out gauges of `engine`'s pool part of the metrics."""
+    with _pools_lock:
+        stats = _pools.get(name, (PoolStats(), None))[0]
+        _pools[name] = (stats, getattr(engine, "sync_engine", engine))
+
+def pool_metrics() -> dict:
+    with _pools_lock:
+        pools = dict(_pools)
+    metrics = {}
+    for name, (stats, engine) in sorted(pools.items()):
+        entry = stats.snapshot()
+        pool = engine.pool if engine is not None else None
+        if isinstance(pool, QueuePool):
+            entry.update({"size": pool.size(), "checked_out": pool.checkedout(), "checked_in": pool.checkedin(), "overflow": pool.overflow()})
+        metrics[name] = entry
+    return metrics
@@ -1,34 +1,194 @@
 import os
 import shutil
+import socket
+import threading
 import time
-import re
+from concurrent.futures import ThreadPoolExecutor
 from sqlalchemy.orm import Session
 from app.database import SessionLocal
 from app.ai_pipeline import run_full_ai_pipeline
 from app.models import models
+from app.progress import ReportProgress
+from app.constituency_resolver import AmbiguousConstituencyName, constituency_resolver
 
 DRY_RUN = False 
 
+# Reports processed at once. Each worker gets its own DB session and transaction.
+INBOX_WORKERS = int(os.getenv("INBOX_WORKERS", "2"))
 
 BACKEND_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 INBOX_DIR = os.path.join(BACKEND_ROOT, "report_inbox")
+PROCESSING_DIR = os.path.join(INBOX_DIR, "processing")
 PROCESSED_DIR = os.path.join(BACKEND_ROOT, "processed_reports")
 os.makedirs(INBOX_DIR, exist_ok=True)
+os.makedirs(PROCESSING_DIR, exist_ok=True)
 os.makedirs(PROCESSED_DIR, exist_ok=True)
 
-def normalize_name(name: str) -> str:
-    return re.sub(r'[^a-z0-9]+', '', name.lower())
+# Every process claims reports into its own PROCESSING_DIR/<owner>.<host>.<pid>
+# and touches a heartbeat file there while it runs. A claim is only recovered
+# once its process is gone: its pid no longer exists (same host), or its
+# heartbeat is older than CLAIM_STALE_SECONDS (any host, e.g. a shared volume).
+CLAIM_HEARTBEAT_SECONDS = float(os.getenv("CLAIM_HEARTBEAT_SECONDS", "30"))
+CLAIM_STALE_SECONDS = float(os.getenv("CLAIM_STALE_SECONDS", "300"))
+HEARTBEAT_FILE = ".heartbeat"
+_heartbeat_lock = threading.Lock()
+_heartbeat_dirs = set()
 
-def find_matching_constituency(filename: str, all_constituencies: list):
-    normalized_filename = normalize_name(filename.split('.')[0])
-    for const in all_constituencies:
-        base_name = const.constituency_name.split('(')[0].strip()
-        normalized_db_name = normalize_name(base_name)
-        if normalized_filename.startswith(normalized_db_name):
-            return const
-    return None
+def find_matching_constituency(db: Session, filename: str):
+    """
+    Matches a report filename such as "Bagalkot_2018.pdf" to its constituency.
+    Raises AmbiguousConstituencyName if the name fits several constituencies.
+    """
+    constituency_id = constituency_resolver.resolve(db, filename.split('.')[0])
+    return db.get(models.Constituency, constituency_id) if constituency_id is not None else None
 
-def process_inbox():
+def _claim_dir_name(owner: str) -> str:
+    return f"{owner}.{socket.gethostname()}.{os.getpid()}"
+
+def _touch_heartbeats():
+    while True:
+        with _heartbeat_lock:
+            directories = list(_heartbeat_dirs)
+        for directory in directories:
+            try:
+                os.utime(os.path.join(directory, HEARTBEAT_FILE))
+            except OSError as e:
+                print(f"--- PROCESSOR: Could not touch claim heartbeat in '{directory}': {e} ---")
+        time.sleep(CLAIM_HEARTBEAT_SECONDS)
+
+def _own_claim_dir(owner: str) -> str:
+    """Creates this process's claim directory and keeps its heartbeat fresh."""
+    owner_dir = os.path.join(PROCESSING_DIR, _claim_dir_name(owner))
+    with _heartbeat_lock:
+        if owner_dir not in _heartbeat_dirs:
+            os.makedirs(owner_dir, exist_ok=True)
+            open(os.path.join(owner_dir, HEARTBEAT_FILE), "a").close()
+            if not _heartbeat_dirs:
+                threading.Thread(target=_touch_heartbeats, name="claim-heartbeat", daemon=True).start()
+            _heartbeat_dirs.add(owner_dir)
+    return owner_dir
+
+def _pid_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def claim_is_live(directory_name: str) -> bool:
+    """Whether the process that owns PROCESSING_DIR/<directory_name> is still running."""
+    directory = os.path.join(PROCESSING_DIR, directory_name)
+    with _heartbeat_lock:
+        if directory in _heartbeat_dirs:
+            return True
+    host, _, pid = directory_name.partition(".")[2].rpartition(".")
+    if not host or not pid.isdigit():
+        # Claims from before per-process directories.
+        return False
+    same_host = host == socket.gethostname()
+    if same_host and int(pid) == os.getpid():
+        # An earlier process that had our pid.
+        return False
+    try:
+        heartbeat_age = time.time() - os.path.getmtime(os.path.join(directory, HEARTBEAT_FILE))
+    except OSError:
+        return False
+    return heartbeat_age <= CLAIM_STALE_SECONDS and (not same_host or _pid_running(int(pid)))
+
+def claim_report(filename: str, owner: str = "api"):
+    """
+    Atomically moves a report from the inbox into this process's claim
+    directory. Returns the claimed path, or None if another run claimed it
+    first. `owner` names the kind of process ("api", "watcher").
+    """
+    claimed_path = os.path.join(_own_claim_dir(owner), filename)
+    try:
+        # os.rename is atomic within a filesystem: exactly one concurrent caller wins.
+        os.rename(os.path.join(INBOX_DIR, filename), claimed_path)
+    except FileNotFoundError:
+        return None
+    return claimed_path
+
+def recover_claimed_reports() -> list:
+    """
+    Called at startup: reports claimed by processes that are no longer running
+    are moved back to the inbox (and claims from before per-process
+    directories existed). Claims of live processes are left alone. A report
+    re-uploaded to the inbox in the meantime wins; the stale copy is archived
+    as INTERRUPTED_. Returns the recovered filenames.
+    """
+    directories = [PROCESSING_DIR] + [
+        os.path.join(PROCESSING_DIR, name) for name in os.listdir(PROCESSING_DIR)
+        if os.path.isdir(os.path.join(PROCESSING_DIR, name)) and not claim_is_live(name)
+    ]
+    recovered = []
+    for directory in directories:
+        for filename in os.listdir(directory):
+            path = os.path.join(directory, filename)
+            if not os.path.isfile(path) or not filename.lower().endswith('.pdf'):
+                continue
+            inbox_path = os.path.join(INBOX_DIR, filename)
+            try:
+                if os.path.exists(inbox_path):
+                    shutil.move(path, os.path.join(PROCESSED_DIR, f"INTERRUPTED_{int(time.time())}_{filename}"))
+                    continue
+                shutil.move(path, inbox_path)
+            except FileNotFoundError:
+                # Another process starting up recovered it first.
+                continue
+            recovered.append(filename)
+        if directory != PROCESSING_DIR and set(os.listdir(directory)) <= {HEARTBEAT_FILE}:
+            shutil.rmtree(directory, ignore_errors=True)
+    if recovered:
+        print(f"--- PROCESSOR: Moved {len(recovered)} interrupted reports back to the inbox: {', '.join(recovered)} ---")
+    return recovered
+
+def process_report(filename: str, file_path: str, progress: ReportProgress = None) -> dict:
+    """Processes one claimed report in its own session and transaction."""
+    print(f"\n--- PROCESSOR: Found new report: '{filename}' ---")
+    db = SessionLocal()
+    started_at = time.time()
+    try:
+        try:
+            constituency = find_matching_constituency(db, filename)
+        except AmbiguousConstituencyName as e:
+            print(f"    - WARNING: {e}. Rename the file to the full constituency name. Moving to processed.")
+            shutil.move(file_path, os.path.join(PROCESSED_DIR, f"AMBIGUOUS_{filename}"))
+            return {"file": filename, "status": "ambiguous", "candidates": e.candidates}
+
+        if not constituency:
+            print(f"    - WARNING: No matching constituency. Moving to processed.")
+            shutil.move(file_path, os.path.join(PROCESSED_DIR, f"UNRECOGNIZED_{filename}"))
+            return {"file": filename, "status": "unrecognized"}
+
+        print(f"    - Matched to Constituency: '{constituency.constituency_name}' (ID: {constituency.id})")
+
+        if DRY_RUN:
+            print("    - [DRY RUN] Skipping AI Pipeline to save API quota.")
+            constituency.transparency_status = "Current"
+            db.commit()
+        else:
+            run_full_ai_pipeline(db, constituency.id, file_path, progress)
+
+        archive_filename = f"{filename.replace('.pdf', '')}_{int(time.time())}.pdf"
+        shutil.move(file_path, os.path.join(PROCESSED_DIR, archive_filename))
+        print(f"    - Successfully processed and archived report.")
+        return {"file": filename, "status": "processed", "constituency": constituency.constituency_name, "seconds": round(time.time() - started_at, 1)}
+    except Exception as e:
+        print(f"--- PROCESSOR: Failed to process '{filename}': {e} ---")
+        db.rollback()
+        shutil.move(file_path, os.path.join(PROCESSED_DIR, f"FAILED_{int(time.time())}_{filename}"))
+        return {"file": filename, "status": "failed", "error": str(e), "seconds": round(time.time() - started_at, 1)}
+    finally:
+        db.close()
+
+def process_inbox(workers: int = None, progress_factory=None):
+    """
+    Processes every PDF in the inbox. `progress_factory(filename)` may return a
+    ReportProgress to receive per-stage updates for that report.
+    """
     print("\n--- PROCESSOR: Checking for new reports in the inbox... ---")
     if DRY_RUN:
         print("\n!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
@@ -36,50 +196,18 @@ def process_inbox():
         print("!!! NO API CALLS WILL BE MADE.       !!!")
         print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!\n")
 
-    db = SessionLocal()
-    new_reports_processed = 0
-    
-    try:
-        all_constituencies = db.query(models.Constituency).all()
-        files_to_process = [f for f in os.listdir(INBOX_DIR) if f.lower().endswith('.pdf')]
-        
-        if not files_to_process:
-            print("--- PROCESSOR: Inbox is empty. Nothing to do. ---")
-            return {"status": "success", "message": "Inbox empty", "new_reports_processed": 0}
-
-        for filename in files_to_process:
-            file_path = os.path.join(INBOX_DIR, filename)
-            print(f"\n--- PROCESSOR: Found new report: '{filename}' ---")
-            
-            constituency = find_matching_constituency(filename, all_constituencies)
-            
-            if not constituency:
-                print(f"    - WARNING: No matching constituency. Moving to processed.")
-                shutil.move(file_path, os.path.join(PROCESSED_DIR, f"UNRECOGNIZED_{filename}"))
-                continue
+    files_to_process = [f for f in os.listdir(INBOX_DIR) if f.lower().endswith('.pdf')]
+    claimed = [(filename, path) for filename, path in ((f, claim_report(f)) for f in files_to_process) if path]
 
-            print(f"    - Matched to Constituency: '{constituency.constituency_name}' (ID: {constituency.id})")
-
-            if DRY_RUN:
-                print("    - [DRY RUN] Skipping AI Pipeline to save API quota.")
-   
-                constituency.transparency_status = "Current"
-                db.commit()
-            else:
-                run_full_ai_pipeline(db, constituency.id, file_path)
-            
-            new_reports_processed += 1
-            
-            archive_filename = f"{filename.replace('.pdf', '')}_{int(time.time())}.pdf"
-            archive_path = os.path.join(PROCESSED_DIR, archive_filename)
-            shutil.move(file_path, archive_path)
-            print(f"    - Successfully processed and archived report.")
+    if not claimed:
+        print("--- PROCESSOR: Inbox is empty. Nothing to do. ---")
+        return {"status": "success", "message": "Inbox empty", "new_reports_processed": 0, "reports": []}
 
-    except Exception as e:
-        print(f"--- PROCESSOR: A CRITICAL ERROR occurred: {e} ---")
-        raise e
-    finally:
-        db.close()
-        
+    workers = max(1, min(workers or INBOX_WORKERS, len(claimed)))
+    print(f"--- PROCESSOR: Claimed {len(claimed)} reports. Processing with {workers} workers. ---")
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="inbox-worker") as pool:
+        outcomes = list(pool.map(lambda item: process_report(*item, progress=progress_factory(item[0]) if progress_factory else None), claimed))
+
+    new_reports_processed = sum(1 for outcome in outcomes if outcome["status"] == "processed")
     print(f"\n--- PROCESSOR: Finished. Processed {new_reports_processed} new reports. ---")
-    return {"status": "success", "new_reports_processed": new_reports_processed}
\ No newline at end of file
+    return {"status": "success", "new_reports_processed": new_reports_processed, "reports": outcomes}
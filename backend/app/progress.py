@@ -0,0 +1,55 @@
+import threading
+import time
+
+# Stages reported for each ingested report, in pipeline order.
+STAGES = ("text_layer", "ocr", "structuring", "insert", "audit")
+
+class ReportProgress:
+    """
+    Thread-safe per-stage counters and timings for one report. The pipeline
+    updates it from the OCR thread, the scheduler callbacks and the DB stage;
+    `on_change` (if given) is called after every update.
+    """
+
+    def __init__(self, on_change=None):
+        self.stages = {}
+        self._lock = threading.Lock()
+        self._on_change = on_change
+
+    def _stage(self, stage: str) -> dict:
+        return self.stages.setdefault(stage, {"status": "pending"})
+
+    def _changed(self):
+        if self._on_change:
+            self._on_change()
+
+    def start(self, stage: str):
+        with self._lock:
+            info = self._stage(stage)
+            if info["status"] == "pending":
+                info["status"] = "running"
+                info["started_at"] = time.time()
+        self._changed()
+
+    def advance(self, stage: str, counter: str, amount: int = 1):
+        with self._lock:
+            info = self._stage(stage)
+            if info["status"] == "pending":
+                info["status"] = "running"
+                info["started_at"] = time.time()
+            info[counter] = info.get(counter, 0) + amount
+        self._changed()
+
+    def finish(self, stage: str):
+        with self._lock:
+            info = self._stage(stage)
+            now = time.time()
+            info.setdefault("started_at", now)
+            info["status"] = "done"
+            info["finished_at"] = now
+            info["seconds"] = round(now - info["started_at"], 2)
+        self._changed()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {stage: dict(info) for stage, info in self.stages.items()}
@@ -0,0 +1,160 @@
+import argparse
+import datetime
+import os
+import threading
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+from app.models import models
+from app.rollups import refresh_constituency_rollups
+from app.dashboard_cache import invalidate_constituency
+from app.duplicates import remove_projects
+
+# Versioned report snapshots. A new report's projects and insights are built
+# under a Building `reports` row that readers never look at; publishing flips
+# constituencies.current_report_id in a single transaction, and superseded
+# versions are garbage-collected afterwards.
+
+# Superseded versions kept per constituency in addition to the current one.
+REPORT_VERSIONS_TO_KEEP = int(os.getenv("REPORT_VERSIONS_TO_KEEP", "1"))
+# Building reports older than this are treated as abandoned by a crashed run.
+STALE_REPORT_BUILD_HOURS = float(os.getenv("STALE_REPORT_BUILD_HOURS", "24"))
+
+def in_current_report(report_column, current_report_id):
+    """
+    Filter for rows of the published version. `current_report_id` may be a
+    value or the constituencies.current_report_id column; rows ingested before
+    reports existed (report_id NULL) are current until a report is published.
+    """
+    if current_report_id is None:
+        return report_column.is_(None)
+    if isinstance(current_report_id, int):
+        return report_column == current_report_id
+    return or_(report_column == current_report_id, and_(current_report_id.is_(None), report_column.is_(None)))
+
+def create_report(db: Session, constituency_id: int, source_file: str = None) -> models.Report:
+    report = models.Report(constituency_id=constituency_id, source_file=source_file, status=models.ReportStatus.BUILDING)
+    db.add(report)
+    db.commit()
+    return report
+
+def publish_report(db: Session, report_id: int):
+    """Makes `report_id` the constituency's current version in one transaction."""
+    report = db.query(models.Report).filter(models.Report.id == report_id).one()
+    constituency = db.query(models.Constituency).filter(models.Constituency.id == report.constituency_id).with_for_update().one()
+    previous_report_id = constituency.current_report_id
+
+    refresh_constituency_rollups(db, constituency.id, report.id)
+    constituency.current_report_id = report.id
+    constituency.transparency_status = "Current"
+    constituency.last_report_date = datetime.date.today()
+    report.status = models.ReportStatus.CURRENT
+    report.published_at = datetime.datetime.utcnow()
+    if previous_report_id:
+        db.query(models.Report).filter(models.Report.id == previous_report_id).update({"status": models.ReportStatus.SUPERSEDED})
+    db.commit()
+    invalidate_constituency(constituency.id)
+    print(f"  [Reports] Published report {report.id} for constituency {constituency.id} (previous: {previous_report_id}).")
+
+def mark_report_failed(db: Session, report_id: int):
+    db.query(models.Report).filter(models.Report.id == report_id).update({"status": models.ReportStatus.FAILED})
+    db.commit()
+
+def _delete_report_rows(db: Session, report_ids: list = None, constituency_id: int = None) -> int:
+    """
+    Deletes the projects, insights and evidence of `report_ids`, or the
+    pre-versioning rows of `constituency_id`. Projects still cited as evidence
+    by another report's insight (duplicate billing links projects across
+    constituencies) are kept; returns how many were kept.
+    """
+    if report_ids is not None:
+        project_filter = models.Project.report_id.in_(report_ids)
+        insight_filter = models.AIInsight.report_id.in_(report_ids)
+    else:
+        project_filter = and_(models.Project.constituency_id == constituency_id, models.Project.report_id.is_(None))
+        insight_filter = and_(models.AIInsight.constituency_id == constituency_id, models.AIInsight.report_id.is_(None))
+    insight_ids = db.query(models.AIInsight.id).filter(insight_filter)
+    db.query(models.Evidence).filter(models.Evidence.insight_id.in_(insight_ids)).delete(synchronize_session=False)
+    cited = db.query(models.Evidence.project_id).filter(models.Evidence.project_id.isnot(None))
+    unreferenced_filter = and_(project_filter, models.Project.id.notin_(cited))
+    remove_projects(db, db.query(models.Project.id).filter(unreferenced_filter))
+    db.query(models.AIInsight).filter(insight_filter).delete(synchronize_session=False)
+    db.query(models.Project).filter(unreferenced_filter).delete(synchronize_session=False)
+    return db.query(models.Project.id).filter(project_filter).count()
+
+def collect_garbage(db: Session) -> int:
+    """
+    Removes superseded versions beyond REPORT_VERSIONS_TO_KEEP, failed and
+    abandoned builds, and pre-versioning rows of constituencies that now have a
+    published report. Returns the number of reports removed.
+    """
+    stale_before = datetime.datetime.utcnow() - datetime.timedelta(hours=STALE_REPORT_BUILD_HOURS)
+    doomed = [
+        report.id for report in db.query(models.Report).filter(or_(
+            models.Report.status == models.ReportStatus.FAILED,
+            and_(models.Report.status == models.ReportStatus.BUILDING, models.Report.created_at < stale_before),
+        ))
+    ]
+    superseded = db.query(models.Report).filter(models.Report.status == models.ReportStatus.SUPERSEDED).order_by(models.Report.constituency_id, models.Report.published_at.desc()).all()
+    kept_per_constituency = {}
+    for report in superseded:
+        kept = kept_per_constituency.get(report.constituency_id, 0)
+        if kept >= REPORT_VERSIONS_TO_KEEP:
+            doomed.append(report.id)
+        else:
+            kept_per_constituency[report.constituency_id] = kept + 1
+
+    removed = 0
+    for report_id in doomed:
+        if _delete_report_rows(db, report_ids=[report_id]):
+            # Its projects cascade with the report row, so the row stays until
+            # the insights citing them are replaced; a later run retries it.
+            db.commit()
+            continue
+        db.query(models.Report).filter(models.Report.id == report_id).delete(synchronize_session=False)
+        db.commit()
+        removed += 1
+
+    legacy_constituency_ids = [
+        row.id for row in db.query(models.Constituency.id).filter(
+            models.Constituency.current_report_id.isnot(None),
+            db.query(models.Project.id).filter(models.Project.constituency_id == models.Constituency.id, models.Project.report_id.is_(None)).exists(),
+        )
+    ]
+    for constituency_id in legacy_constituency_ids:
+        _delete_report_rows(db, constituency_id=constituency_id)
+        db.commit()
+    if doomed or legacy_constituency_ids:
+        print(f"  [Reports] Garbage-collected {removed} of {len(doomed)} old report versions and legacy rows of {len(legacy_constituency_ids)} constituencies.")
+    return removed
+
+def collect_garbage_in_background():
+    """Runs collect_garbage on its own session without blocking the caller."""
+    from app.database import SessionLocal
+
+    def _run():
+        db = SessionLocal()
+        try:
+            collect_garbage(db)
+        except Exception as e:
+            print(f"  [Reports] Garbage collection failed: {e}")
+            db.rollback()
+        finally:
+            db.close()
+
+    threading.Thread(target=_run, name="report-gc", daemon=True).start()
+
+def main():
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Maintain versioned report snapshots.")
+    parser.add_argument("command", choices=["gc"], help="Delete superseded, failed and abandoned report versions.")
+    parser.parse_args()
+    db = SessionLocal()
+    try:
+        removed = collect_garbage(db)
+        print(f"Removed {removed} report versions.")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+import argparse
+import threading
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.models import models
+from app.dashboard_cache import invalidate_constituencies
+from app.contractors import backfill_contractors
+
+# Per-constituency and per-state spending rollups. They are rewritten for one
+# constituency inside the transaction that publishes a new report version, so reads
+# (dashboard, state and national views) never aggregate the projects table and
+# cost the same regardless of how many project rows exist.
+# Databases populated before rollups (or contractor ids) existed are backfilled on startup.
+
+def _constituency_totals(db: Session, constituency_id: int):
+    amount, count = db.query(
+        func.coalesce(func.sum(models.ConstituencyCategorySpending.total_amount), 0.0),
+        func.coalesce(func.sum(models.ConstituencyCategorySpending.project_count), 0),
+    ).filter(models.ConstituencyCategorySpending.constituency_id == constituency_id).one()
+    return float(amount), int(count)
+
+def _upsert_state_delta(db: Session, state: str, amount_delta: float, count_delta: int, reporting_delta: int):
+    values = {"state": state, "total_amount": amount_delta, "project_count": count_delta, "reporting_constituencies": reporting_delta}
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert_fn = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        statement = insert_fn(models.StateSpending).values(**values)
+        statement = statement.on_conflict_do_update(
+            index_elements=[models.StateSpending.state],
+            set_={
+                "total_amount": models.StateSpending.total_amount + amount_delta,
+                "project_count": models.StateSpending.project_count + count_delta,
+                "reporting_constituencies": models.StateSpending.reporting_constituencies + reporting_delta,
+            },
+        )
+        db.execute(statement)
+        return
+    row = db.query(models.StateSpending).filter(models.StateSpending.state == state).with_for_update().first()
+    if row is None:
+        db.add(models.StateSpending(**values))
+    else:
+        row.total_amount += amount_delta
+        row.project_count += count_delta
+        row.reporting_constituencies += reporting_delta
+
+def refresh_constituency_rollups(db: Session, constituency_id: int, report_id: int = None):
+    """
+    Recomputes the category and contractor rollups of one constituency from the
+    projects of `report_id` (rows without a report when None) and applies the
+    difference to its state's row. Does not commit: callers run it inside the
+    transaction that publishes the report.
+    """
+    constituency = db.query(models.Constituency).filter(models.Constituency.id == constituency_id).first()
+    old_amount, old_count = _constituency_totals(db, constituency_id)
+
+    db.execute(delete(models.ConstituencyCategorySpending).where(models.ConstituencyCategorySpending.constituency_id == constituency_id))
+    db.execute(delete(models.ConstituencyContractorSpending).where(models.ConstituencyContractorSpending.constituency_id == constituency_id))
+
+    projects = models.Project.__table__
+    category = func.coalesce(projects.c.category, "Other")
+    in_report = projects.c.report_id == report_id if report_id is not None else projects.c.report_id.is_(None)
+    db.execute(insert(models.ConstituencyCategorySpending).from_select(
+        ["constituency_id", "category", "total_amount", "project_count"],
+        select(projects.c.constituency_id, category, func.coalesce(func.sum(projects.c.allocated_amount), 0.0), func.count())
+        .where(projects.c.constituency_id == constituency_id, in_report)
+        .group_by(projects.c.constituency_id, category),
+    ))
+    db.execute(insert(models.ConstituencyContractorSpending).from_select(
+        ["constituency_id", "contractor_id", "total_amount", "project_count"],
+        select(projects.c.constituency_id, projects.c.contractor_id, func.coalesce(func.sum(projects.c.allocated_amount), 0.0), func.count())
+        .where(projects.c.constituency_id == constituency_id, in_report, projects.c.contractor_id.isnot(None))
+        .group_by(projects.c.constituency_id, projects.c.contractor_id),
+    ))
+
+    new_amount, new_count = _constituency_totals(db, constituency_id)
+    if constituency and constituency.state:
+        reporting_delta = int(new_count > 0) - int(old_count > 0)
+        _upsert_state_delta(db, constituency.state, new_amount - old_amount, new_count - old_count, reporting_delta)
+
+def rebuild_all_rollups(db: Session):
+    """Backfills every rollup from scratch (for databases populated before rollups existed)."""
+    db.query(models.StateSpending).delete()
+    db.query(models.ConstituencyCategorySpending).delete()
+    db.query(models.ConstituencyContractorSpending).delete()
+    constituencies = db.query(models.Constituency.id, models.Constituency.current_report_id).all()
+    for constituency_id, report_id in constituencies:
+        refresh_constituency_rollups(db, constituency_id, report_id)
+    db.commit()
+    invalidate_constituencies()
+    return len(constituencies)
+
+def rollups_missing(db: Session) -> bool:
+    """True when there are projects but no rollup rows, i.e. the rollups were never built."""
+    has_projects = db.query(models.Project.id).first() is not None
+    return has_projects and db.query(models.ConstituencyCategorySpending.constituency_id).first() is None
+
+def ensure_rollups(db: Session) -> bool:
+    """
+    Links projects ingested before contractor ids existed, then rebuilds every
+    rollup if they were never built or new links change the contractor
+    rollups. Returns whether it rebuilt them.
+    """
+    linked = backfill_contractors(db)
+    if not linked and not rollups_missing(db):
+        return False
+    count = rebuild_all_rollups(db)
+    print(f"-> Rebuilt the spending rollups for {count} constituencies ({linked} contractor names newly linked).")
+    return True
+
+def ensure_rollups_in_background():
+    """Runs ensure_rollups on its own session without blocking startup."""
+    from app.database import SessionLocal
+
+    def _run():
+        db = SessionLocal()
+        try:
+            ensure_rollups(db)
+        except Exception as e:
+            print(f"  [Rollups] Building missing rollups failed: {e}")
+            db.rollback()
+        finally:
+            db.close()
+
+    threading.Thread(target=_run, name="rollup-backfill", daemon=True).start()
+
+def main():
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Maintain the spending rollup tables.")
+    parser.add_argument("command", choices=["rebuild"], help="Recompute every rollup from the projects table.")
+    parser.parse_args()
+    db = SessionLocal()
+    try:
+        count = rebuild_all_rollups(db)
+        print(f"Rebuilt spending rollups for {count} constituencies.")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+from sqlalchemy import bindparam, inspect, text
+from app.models import models
+from app.constituency_resolver import slugify
+
+# create_all only creates missing tables; it never alters existing ones. This
+# adds the columns and indexes introduced since a database was first created,
+# so deployed databases keep working after an upgrade. Every step checks the
+# live schema first, so it is safe to run on every startup, after create_all.
+
+# (table, column, DDL type). New foreign keys are nullable, which both SQLite
+# and PostgreSQL accept in ALTER TABLE ... ADD COLUMN.
+ADDED_COLUMNS = [
+    ("constituencies", "slug", "VARCHAR"),
+    ("constituencies", "current_report_id", "INTEGER REFERENCES reports (id) ON DELETE SET NULL"),
+    ("constituencies", "data_version", "INTEGER NOT NULL DEFAULT 0"),
+    ("projects", "report_id", "INTEGER REFERENCES reports (id) ON DELETE CASCADE"),
+    ("projects", "contractor_id", "INTEGER REFERENCES contractors (id)"),
+    ("ai_insights", "report_id", "INTEGER REFERENCES reports (id) ON DELETE CASCADE"),
+    ("ai_insights", "detailed_brief", "TEXT"),
+    ("ai_insights", "suggested_questions", "TEXT"),
+]
+
+def _backfill_slugs(connection) -> int:
+    # Rows inserted before the column existed never went through its default.
+    rows = connection.execute(text("SELECT id, constituency_name FROM constituencies WHERE slug IS NULL")).all()
+    if rows:
+        connection.execute(
+            text("UPDATE constituencies SET slug = :slug WHERE id = :constituency_id").bindparams(bindparam("slug"), bindparam("constituency_id")),
+            [{"slug": slugify(name or ""), "constituency_id": constituency_id} for constituency_id, name in rows],
+        )
+    return len(rows)
+
+def upgrade_schema(engine):
+    """Adds missing columns and indexes of existing tables and backfills slugs. Called once at startup."""
+    with engine.begin() as connection:
+        inspector = inspect(connection)
+        added = []
+        for table_name, column_name, ddl_type in ADDED_COLUMNS:
+            if column_name not in {column["name"] for column in inspector.get_columns(table_name)}:
+                connection.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {ddl_type}"))
+                added.append(f"{table_name}.{column_name}")
+        if added:
+            print(f"-> Added columns: {', '.join(added)}.")
+        backfilled = _backfill_slugs(connection)
+        if backfilled:
+            print(f"-> Backfilled {backfilled} constituency slugs.")
+        for table in (models.Constituency.__table__, models.Project.__table__, models.AIInsight.__table__):
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
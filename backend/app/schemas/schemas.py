@@ -1,7 +1,7 @@
 from pydantic import BaseModel
 from typing import List, Optional
-from datetime import date
-from app.models.models import TransparencyStatus, AISeverity
+from datetime import date, datetime
+from app.models.models import TransparencyStatus, AISeverity, JobStatus
 
 # --- Schemas for API Contract ---
 
@@ -10,6 +10,7 @@ class ConstituencyScorecard(BaseModel):
     id: int
     mp_name: str
     constituency_name: str
+    slug: Optional[str] = None
     state: str
     transparency_status: TransparencyStatus
     last_report_date: Optional[date]
@@ -49,6 +50,29 @@ class DashboardResponse(BaseModel):
     ai_insights: List[AIInsightInfo]
 
 
+# Endpoints: /api/v1/rollups/*
+class StateSpendingInfo(BaseModel):
+    state: str
+    total_amount: float
+    project_count: int
+    reporting_constituencies: int
+
+    class Config:
+        from_attributes = True
+
+class ConstituencySpendingRank(BaseModel):
+    id: int
+    constituency_name: str
+    mp_name: str
+    state: str
+    total_amount: float
+    project_count: int
+
+class CategorySpendingTotal(BaseModel):
+    category: str
+    total_amount: float
+    project_count: int
+
 class LegalRequest(BaseModel):
     constituency_name: str
     mp_name: str
@@ -65,4 +89,49 @@ class InsightDetailRequest(BaseModel):
     original_finding: str
 
 class InsightDetailResponse(BaseModel):
-    detailed_brief: str
\ No newline at end of file
+    detailed_brief: str
+
+# Endpoint: /api/v1/process/run and /api/v1/process/jobs/{job_id}
+class ProcessingJobQueued(BaseModel):
+    job_id: str
+    status: JobStatus
+    status_url: str
+
+class ProcessingJobInfo(BaseModel):
+    id: str
+    status: JobStatus
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+    progress: Optional[dict]
+    result: Optional[dict]
+    error: Optional[str]
+
+    class Config:
+        from_attributes = True
+
+# Endpoint: /api/v1/search
+class SearchResult(BaseModel):
+    project_id: int
+    project_description: Optional[str]
+    location: Optional[str]
+    contractor_ngo_name: Optional[str]
+    category: Optional[str]
+    allocated_amount: Optional[float]
+    constituency_id: int
+    constituency_name: str
+    state: Optional[str]
+    score: float
+
+class SearchFacet(BaseModel):
+    value: str
+    label: str
+    count: int
+
+class SearchResponse(BaseModel):
+    query: str
+    total: int
+    limit: int
+    offset: int
+    results: List[SearchResult]
+    facets: dict[str, List[SearchFacet]]
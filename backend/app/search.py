@@ -0,0 +1,153 @@
+import re
+from sqlalchemy import column, desc, func, literal_column, select, table, text
+from sqlalchemy.orm import Session
+from app.models import models
+from app.reports import in_current_report
+
+# Full-text index over project descriptions, locations and contractors.
+# PostgreSQL: a generated, weighted tsvector column with a GIN index.
+# SQLite: an external-content FTS5 table kept in sync by triggers.
+# Both are maintained by the database on every insert (including COPY), so the
+# ingest pipeline needs no extra step.
+
+TOKEN_PATTERN = re.compile(r"[^\W_]+", re.UNICODE)
+MAX_QUERY_TERMS = 8
+
+_POSTGRES_DDL = [
+    """
+    ALTER TABLE projects ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(project_description, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(location, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(contractor_ngo_name, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_projects_search_vector ON projects USING GIN (search_vector)",
+]
+
+_SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE projects_fts USING fts5(
+        project_description, location, contractor_ngo_name,
+        content='projects', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER projects_fts_insert AFTER INSERT ON projects BEGIN
+        INSERT INTO projects_fts(rowid, project_description, location, contractor_ngo_name)
+        VALUES (new.id, new.project_description, new.location, new.contractor_ngo_name);
+    END
+    """,
+    """
+    CREATE TRIGGER projects_fts_delete AFTER DELETE ON projects BEGIN
+        INSERT INTO projects_fts(projects_fts, rowid, project_description, location, contractor_ngo_name)
+        VALUES ('delete', old.id, old.project_description, old.location, old.contractor_ngo_name);
+    END
+    """,
+    """
+    CREATE TRIGGER projects_fts_update AFTER UPDATE OF project_description, location, contractor_ngo_name ON projects BEGIN
+        INSERT INTO projects_fts(projects_fts, rowid, project_description, location, contractor_ngo_name)
+        VALUES ('delete', old.id, old.project_description, old.location, old.contractor_ngo_name);
+        INSERT INTO projects_fts(rowid, project_description, location, contractor_ngo_name)
+        VALUES (new.id, new.project_description, new.location, new.contractor_ngo_name);
+    END
+    """,
+    # Index rows that existed before the FTS table did.
+    "INSERT INTO projects_fts(projects_fts) VALUES ('rebuild')",
+]
+
+def ensure_search_index(engine):
+    """Creates the full-text index if missing. Called once at startup, after create_all."""
+    dialect = engine.dialect.name
+    with engine.begin() as connection:
+        if dialect == "postgresql":
+            for statement in _POSTGRES_DDL:
+                connection.execute(text(statement))
+        elif dialect == "sqlite":
+            exists = connection.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'projects_fts'")).first()
+            if not exists:
+                for statement in _SQLITE_DDL:
+                    connection.execute(text(statement))
+                print("-> Created the SQLite FTS5 search index.")
+        else:
+            print(f"-> Full-text search is not available on '{dialect}'.")
+
+def query_terms(query: str) -> list:
+    return TOKEN_PATTERN.findall(query.lower())[:MAX_QUERY_TERMS]
+
+def _matches(db: Session, terms: list):
+    """Selectable of (id, score) for projects matching every term; the last term matches as a prefix."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        tsquery = func.to_tsquery("simple", " & ".join(terms[:-1] + [f"{terms[-1]}:*"]))
+        vector = literal_column("projects.search_vector")
+        return (
+            select(models.Project.id.label("id"), func.ts_rank_cd(vector, tsquery).label("score"))
+            .where(vector.op("@@")(tsquery))
+            .subquery()
+        )
+    if dialect == "sqlite":
+        fts = table("projects_fts", column("rowid"))
+        match = " ".join(f'"{term}"' for term in terms[:-1]) + f' "{terms[-1]}"*'
+        return (
+            # bm25 is lower-is-better; weights favour the description over location and contractor.
+            select(fts.c.rowid.label("id"), (-literal_column("bm25(projects_fts, 10.0, 5.0, 5.0)")).label("score"))
+            .where(literal_column("projects_fts").op("MATCH")(match.strip()))
+            .subquery()
+        )
+    raise NotImplementedError(f"Full-text search is not available on '{dialect}'.")
+
+def search_projects(db: Session, query: str, category: str = None, state: str = None, constituency_id: int = None, limit: int = 20, offset: int = 0) -> dict:
+    """
+    Ranked search over the projects of every constituency's published report.
+    Returns {"total", "results", "facets"}; facets count all matches (not just
+    the page) by category, state and constituency.
+    """
+    terms = query_terms(query)
+    if not terms:
+        return {"total": 0, "results": [], "facets": {"category": [], "state": [], "constituency": []}}
+    matches = _matches(db, terms)
+    base = (
+        select(models.Project.id)
+        .join(matches, matches.c.id == models.Project.id)
+        .join(models.Constituency, models.Constituency.id == models.Project.constituency_id)
+        .where(in_current_report(models.Project.report_id, models.Constituency.current_report_id))
+    )
+    if category:
+        base = base.where(models.Project.category == category)
+    if state:
+        base = base.where(models.Constituency.state == state)
+    if constituency_id:
+        base = base.where(models.Project.constituency_id == constituency_id)
+
+    results = db.execute(
+        base.with_only_columns(
+            models.Project.id, models.Project.project_description, models.Project.location, models.Project.contractor_ngo_name,
+            models.Project.category, models.Project.allocated_amount, models.Constituency.id, models.Constituency.constituency_name,
+            models.Constituency.state, matches.c.score,
+        ).order_by(desc(matches.c.score), models.Project.id).limit(limit).offset(offset)
+    ).all()
+    total = db.execute(base.with_only_columns(func.count())).scalar()
+
+    facets = {}
+    for name, facet_column, label in (
+        ("category", models.Project.category, models.Project.category),
+        ("state", models.Constituency.state, models.Constituency.state),
+        ("constituency", models.Constituency.id, models.Constituency.constituency_name),
+    ):
+        rows = db.execute(
+            base.with_only_columns(facet_column, label, func.count()).group_by(facet_column, label).order_by(desc(func.count())).limit(20)
+        ).all()
+        facets[name] = [{"value": str(value) if value is not None else "Other", "label": row_label or "Other", "count": count} for value, row_label, count in rows]
+
+    return {
+        "total": total,
+        "results": [
+            {
+                "project_id": project_id, "project_description": description, "location": location, "contractor_ngo_name": contractor,
+                "category": project_category, "allocated_amount": amount, "constituency_id": result_constituency_id,
+                "constituency_name": constituency_name, "state": result_state, "score": float(score or 0.0),
+            }
+            for project_id, description, location, contractor, project_category, amount, result_constituency_id, constituency_name, result_state, score in results
+        ],
+        "facets": facets,
+    }
@@ -0,0 +1,208 @@
+import os
+import re
+import subprocess
+
+# Fast path for digitally generated MPLADS annexures: read the PDF's own text
+# layer with poppler's `pdftotext -layout` (poppler is already required by
+# pdf2image) and turn the tables into project rows without OCR or an LLM call.
+# Pages whose parse is not confident enough are handed back to OCR + Gemini.
+
+TABLE_MIN_CONFIDENCE = float(os.getenv("TABLE_MIN_CONFIDENCE", "0.9"))
+TEXT_LAYER_MIN_CHARS = 50
+
+HEADER_KEYWORDS = {
+    "project_description": ["name of work", "description", "work", "project", "particulars", "purpose"],
+    "allocated_amount": ["amount", "cost", "sanctioned", "expenditure", "rs", "₹"],
+    "location": ["location", "village", "place", "block", "taluk", "ward", "site"],
+    "contractor_ngo_name": ["agency", "contractor", "implementing", "ngo", "executing", "vendor"],
+}
+
+CATEGORY_KEYWORDS = [
+    ("Drinking Water", ["drinking water", "water", "borewell", "bore well", "hand pump", "handpump", "ro plant", "pipeline", "overhead tank"]),
+    ("Road Construction", ["road", "bridge", "culvert", "footpath", "pathway", "street", "pavement"]),
+    ("Education", ["school", "classroom", "class room", "college", "library", "anganwadi", "education", "smart class"]),
+    ("Health & Sanitation", ["hospital", "health", "toilet", "sanitation", "drain", "ambulance", "phc", "dispensary"]),
+    ("Community Infrastructure", ["community hall", "bhavan", "bus shelter", "hall", "light", "shed", "building", "compound wall", "crematorium"]),
+]
+
+CELL_PATTERN = re.compile(r"\S+(?: \S+)*")
+AMOUNT_PATTERN = re.compile(r"^(?:rs\.?|inr|₹)?\s*(\d[\d,]*(?:\.\d+)?)\s*(?:/-)?$", re.IGNORECASE)
+TOTAL_PATTERN = re.compile(r"^(grand\s+)?(sub\s*-?\s*)?total\b", re.IGNORECASE)
+AMOUNT_LIKE_PATTERN = re.compile(r"\d{1,3}(?:,\d{2,3})+|\d{5,}")
+
+def extract_text_layer(pdf_path: str) -> list:
+    """Returns the layout-preserving text of every page, or [] if unavailable."""
+    try:
+        result = subprocess.run(["pdftotext", "-layout", "-enc", "UTF-8", pdf_path, "-"], capture_output=True, check=True, timeout=120)
+    except (OSError, subprocess.SubprocessError) as e:
+        print(f"  [Fast Path] Could not read text layer ({e}).")
+        return []
+    pages = result.stdout.decode("utf-8", errors="replace").split("\f")
+    # pdftotext terminates the last page with a form feed too.
+    if pages and not pages[-1].strip():
+        pages = pages[:-1]
+    return pages
+
+def has_text_layer(page_text: str) -> bool:
+    return sum(ch.isalnum() for ch in page_text) >= TEXT_LAYER_MIN_CHARS
+
+def parse_amount(text: str):
+    match = AMOUNT_PATTERN.match(text.strip())
+    if not match:
+        return None
+    try:
+        return float(match.group(1).replace(",", ""))
+    except ValueError:
+        return None
+
+def classify_category(description: str) -> str:
+    lowered = description.lower()
+    for category, keywords in CATEGORY_KEYWORDS:
+        if any(keyword in lowered for keyword in keywords):
+            return category
+    return "Other"
+
+def _split_cells(line: str) -> list:
+    # Columns in -layout output are separated by runs of two or more spaces.
+    return [(m.start(), m.end(), m.group()) for m in CELL_PATTERN.finditer(line)]
+
+def _classify_header_cell(text: str):
+    lowered = text.lower()
+    for field in ("contractor_ngo_name", "location", "allocated_amount", "project_description"):
+        if any(re.search(rf"(?<![a-z]){re.escape(keyword)}(?![a-z])", lowered) for keyword in HEADER_KEYWORDS[field]):
+            return field
+    return None
+
+def _header_columns(cells: list):
+    """Returns [(start, field or None)] if the cells name a description and an amount column once each, else None."""
+    if len(cells) < 2:
+        return None
+    columns = [(start, _classify_header_cell(text)) for start, _, text in cells]
+    fields = [field for _, field in columns if field]
+    if "project_description" not in fields or "allocated_amount" not in fields or len(fields) != len(set(fields)):
+        return None
+    return columns
+
+def _has_amount(line: str, cells: list) -> bool:
+    # "Repair work at school ... Rs. 1,50,000" matches the header keywords but is a data row.
+    return bool(AMOUNT_LIKE_PATTERN.search(line)) or any(parse_amount(text) is not None for _, _, text in cells)
+
+class TableLayout:
+    def __init__(self, columns: list, amount_multiplier: float):
+        # columns: list of (start, field or None), sorted by start offset.
+        self.columns = columns
+        self.amount_multiplier = amount_multiplier
+
+    @classmethod
+    def detect(cls, line: str):
+        """Returns the layout if `line` is a table header, else None."""
+        cells = _split_cells(line)
+        columns = _header_columns(cells)
+        if columns is None or _has_amount(line, cells):
+            return None
+        return cls.from_header(cells, columns)
+
+    @classmethod
+    def from_header(cls, cells: list, columns: list):
+        amount_header = next(text for (_, _, text), (_, field) in zip(cells, columns) if field == "allocated_amount").lower()
+        multiplier = 100000.0 if ("lakh" in amount_header or "lac" in amount_header) else 1.0
+        return cls(columns, multiplier)
+
+    def assign(self, line: str) -> dict:
+        """Maps each cell of `line` to the header column it overlaps most."""
+        row = {}
+        for start, end, text in _split_cells(line):
+            best_index, best_overlap = 0, float("-inf")
+            for index, (column_start, _) in enumerate(self.columns):
+                column_end = self.columns[index + 1][0] if index + 1 < len(self.columns) else float("inf")
+                overlap = min(end, column_end) - max(start, column_start)
+                if overlap < 0:
+                    overlap = -min(abs(start - column_start), abs(end - column_end))
+                if overlap > best_overlap:
+                    best_index, best_overlap = index, overlap
+            field = self.columns[best_index][1]
+            if field:
+                row[field] = f"{row[field]} {text}" if field in row else text
+        return row
+
+def parse_page(page_text: str, layout: TableLayout = None):
+    """
+    Parses one page. Returns (projects, confidence, layout); `layout` is carried
+    over to the next page because long tables rarely repeat their header.
+    """
+    projects = []
+    bad_lines = 0
+    rows_under_layout = 0
+    for line in page_text.splitlines():
+        if not line.strip():
+            continue
+        cells = _split_cells(line)
+        columns = _header_columns(cells)
+        if columns is not None and not _has_amount(line, cells):
+            if rows_under_layout:
+                # A second header mid-page: rows parsed so far may belong to a
+                # different table than the one the layout now describes.
+                bad_lines += 1
+            layout = TableLayout.from_header(cells, columns)
+            rows_under_layout = 0
+            continue
+        # A header-like line carrying an amount falls through and is parsed as a
+        # data row; it only counts against the page if it does not parse.
+        if not layout:
+            continue
+        row = layout.assign(line)
+        description = row.get("project_description", "").strip()
+        amount_text = row.get("allocated_amount")
+        if TOTAL_PATTERN.match(description):
+            continue
+        if amount_text is None:
+            # Wrapped cell text continues the previous row.
+            if projects and row:
+                for field in ("project_description", "location", "contractor_ngo_name"):
+                    if row.get(field):
+                        projects[-1][field] = f"{projects[-1][field]} {row[field]}".strip()
+            continue
+        amount = parse_amount(amount_text)
+        if amount is None or not description:
+            bad_lines += 1
+            continue
+        projects.append({
+            "project_description": description,
+            "allocated_amount": amount * layout.amount_multiplier,
+            "location": row.get("location", "").strip(),
+            "contractor_ngo_name": row.get("contractor_ngo_name", "").strip(),
+        })
+        rows_under_layout += 1
+    for project in projects:
+        project["category"] = classify_category(project["project_description"])
+    total = len(projects) + bad_lines
+    confidence = len(projects) / total if total else 0.0
+    return projects, confidence, layout
+
+def parse_pdf_tables(pdf_path: str):
+    """
+    Returns (projects, fallback_pages): rows parsed from the text layer, and the
+    1-based page numbers that still need OCR + Gemini.
+    """
+    print(f"  [Fast Path] Checking for a machine-readable text layer in: {pdf_path}")
+    pages = extract_text_layer(pdf_path)
+    if not pages:
+        return [], None
+    projects, fallback_pages = [], []
+    layout = None
+    for page_number, page_text in enumerate(pages, start=1):
+        if not has_text_layer(page_text):
+            fallback_pages.append(page_number)
+            continue
+        page_projects, confidence, layout = parse_page(page_text, layout)
+        if page_projects and confidence >= TABLE_MIN_CONFIDENCE:
+            projects.extend(page_projects)
+        elif page_projects or confidence > 0:
+            print(f"    - Page {page_number}: low table confidence ({confidence:.0%}). Falling back to OCR + Gemini.")
+            fallback_pages.append(page_number)
+        elif AMOUNT_LIKE_PATTERN.search(page_text):
+            # Amounts but no recognisable table header: let Gemini read it.
+            fallback_pages.append(page_number)
+        # Otherwise a cover page, letter or signature page with no project rows.
+    print(f"  [Fast Path] Parsed {len(projects)} projects locally from {len(pages) - len(fallback_pages)} of {len(pages)} pages.")
+    return projects, fallback_pages
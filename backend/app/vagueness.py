@@ -0,0 +1,155 @@
+import asyncio
+import json
+import os
+import re
+from app.gemini_scheduler import DEFAULT_MODEL, get_scheduler
+from app.pipeline_cache import get_cache, hash_texts
+
+# Vague-description detection. A local lexical scorer decides the clear cases;
+# only ambiguous descriptions are sent to Gemini, deduplicated and in
+# fixed-size chunks that run concurrently through the scheduler. Verdicts are
+# memoised by normalised description in the "vagueness" cache namespace, since
+# the same wording recurs across constituencies.
+
+# Bump whenever the prompt or the scorer changes so cached verdicts are not reused.
+VAGUENESS_PROMPT_VERSION = "1"
+VAGUENESS_CHUNK_SIZE = int(os.getenv("VAGUENESS_CHUNK_SIZE", "40"))
+# Lexical scores at or below this are specific, at or above VAGUE_SCORE are vague; the rest go to the LLM.
+SPECIFIC_SCORE = float(os.getenv("VAGUENESS_SPECIFIC_SCORE", "0.25"))
+VAGUE_SCORE = float(os.getenv("VAGUENESS_VAGUE_SCORE", "0.8"))
+
+GENERIC_PHRASES = (
+    "general works", "general work", "miscellaneous", "misc works", "misc repairs", "various works", "other works",
+    "constituency development", "development works", "development work", "repair works", "maintenance works",
+    "civil works", "improvement works", "sundry", "as per requirement", "as required", "etc",
+)
+# Words that name a concrete deliverable.
+DELIVERABLE_WORDS = {
+    "road", "bridge", "culvert", "drain", "school", "classroom", "toilet", "hospital", "ambulance", "borewell",
+    "handpump", "pipeline", "tank", "library", "hall", "anganwadi", "streetlight", "streetlights", "wall",
+    "shed", "well", "playground", "building", "laboratory", "computers", "solar", "footpath", "bus",
+}
+LOCATION_PATTERN = re.compile(r"\b(?:at|in|near|from|to|village|ward|gram|panchayat|taluk|block|mandal|nagar|colony|district)\b")
+QUANTITY_PATTERN = re.compile(r"\d+(?:\.\d+)?\s*(?:km|kms|m|mtr|mtrs|metres?|meters?|sq\.?\s*ft|sqft|rooms?|nos?|units?|seats?|beds?|kl|litres?)\b")
+
+def normalize_description(description: str) -> str:
+    text = re.sub(r"[^a-z0-9\s]", " ", (description or "").lower())
+    return " ".join(text.split())
+
+def score_description(normalized: str) -> tuple:
+    """
+    Returns (score, reason): 0.0 is clearly specific, 1.0 clearly vague.
+    Combines length, generic phrases, deliverable words and whether a
+    location or a quantity is mentioned.
+    """
+    if not normalized:
+        return 1.0, "The project has no description."
+    words = normalized.split()
+    generic = next((phrase for phrase in GENERIC_PHRASES if re.search(rf"\b{phrase}\b", normalized)), None)
+    has_deliverable = any(word in DELIVERABLE_WORDS for word in words)
+    has_location = bool(LOCATION_PATTERN.search(normalized))
+    has_quantity = bool(QUANTITY_PATTERN.search(normalized))
+
+    score = 0.5
+    if len(words) <= 2:
+        score += 0.2
+    elif len(words) >= 8:
+        score -= 0.1
+    if generic:
+        score += 0.4
+    if has_deliverable:
+        score -= 0.2
+    if has_location:
+        score -= 0.15
+    if has_quantity:
+        score -= 0.2
+    score = min(max(score, 0.0), 1.0)
+    if generic:
+        reason = f"Description uses the generic phrase '{generic}' without saying what was built or where."
+    else:
+        reason = "Description is too short to identify the work, its location or its scope."
+    return score, reason
+
+def _build_prompt(descriptions: list) -> str:
+    numbered = "\n".join(f"{index}: {description}" for index, description in enumerate(descriptions))
+    return f"""
+    Act as a forensic auditor. Your task is to identify projects with vague, non-specific, or suspicious descriptions from the following list.
+    A vague description lacks specific details about the work, location, or purpose. Examples: "General works", "Constituency development", "Miscellaneous repairs".
+    **List of Projects:**
+    ---
+    {numbered}
+    ---
+    Return a JSON object with a single key "vague_projects", containing a list of objects. Each object must have an "index" (the integer shown before the description) and a "reason" (a short explanation of why it's vague).
+    Example: {{"vague_projects": [{{"index": 3, "reason": "Description 'Constituency development' lacks specific deliverables."}}]}}
+    If no vague projects are found, return an empty list.
+    """
+
+async def _classify_chunk(scheduler, descriptions: list) -> dict:
+    """Returns {description: reason or None} for one chunk; halves the chunk on an unparseable response."""
+    try:
+        response = await scheduler.agenerate(_build_prompt(descriptions))
+        results = json.loads(response.text.strip().replace("```json", "").replace("```", ""))
+    except json.JSONDecodeError as e:
+        if len(descriptions) > 1:
+            print(f"    - Vagueness chunk of {len(descriptions)} unparseable ({e}). Splitting and retrying halves.")
+            middle = len(descriptions) // 2
+            halves = await asyncio.gather(_classify_chunk(scheduler, descriptions[:middle]), _classify_chunk(scheduler, descriptions[middle:]))
+            return {**halves[0], **halves[1]}
+        print(f"    - Vagueness chunk FAILED: Could not parse AI response: {e}")
+        return {}
+    except Exception as e:
+        print(f"    - Vagueness chunk FAILED: {e}")
+        return {}
+    verdicts = {description: None for description in descriptions}
+    for item in results.get("vague_projects", []):
+        index = item.get("index")
+        if isinstance(index, int) and 0 <= index < len(descriptions) and item.get("reason"):
+            verdicts[descriptions[index]] = item["reason"]
+    return verdicts
+
+def classify_descriptions(descriptions: list) -> dict:
+    """
+    Returns {normalized description: reason} for the vague ones among
+    `descriptions`. Descriptions that could not be classified (failed chunks)
+    are treated as not vague.
+    """
+    cache = get_cache()
+    vague, undecided = {}, []
+    counts = {"specific": 0, "vague": 0, "cached": 0}
+    for normalized in dict.fromkeys(normalize_description(description) for description in descriptions):
+        score, reason = score_description(normalized)
+        if score <= SPECIFIC_SCORE:
+            counts["specific"] += 1
+        elif score >= VAGUE_SCORE:
+            counts["vague"] += 1
+            vague[normalized] = reason
+        else:
+            undecided.append(normalized)
+    keys = {normalized: hash_texts(DEFAULT_MODEL, VAGUENESS_PROMPT_VERSION, normalized) for normalized in undecided}
+    cached = cache.get_many("vagueness", list(keys.values())) if cache and keys else {}
+    ambiguous = []
+    for normalized in undecided:
+        if keys[normalized] not in cached:
+            ambiguous.append(normalized)
+            continue
+        counts["cached"] += 1
+        reason = json.loads(cached[keys[normalized]])
+        if reason:
+            vague[normalized] = reason
+    print(f"    -> Lexical scorer: {counts['specific']} specific, {counts['vague']} vague, {counts['cached']} cached, {len(ambiguous)} sent to Gemini.")
+    if not ambiguous:
+        return vague
+
+    scheduler = get_scheduler()
+    chunks = [ambiguous[start:start + VAGUENESS_CHUNK_SIZE] for start in range(0, len(ambiguous), VAGUENESS_CHUNK_SIZE)]
+
+    async def _classify_all():
+        return await asyncio.gather(*[_classify_chunk(scheduler, chunk) for chunk in chunks])
+
+    classified = {}
+    for verdicts in scheduler.run_coroutine(_classify_all()):
+        classified.update(verdicts)
+    if cache and classified:
+        cache.set_many("vagueness", {keys[normalized]: json.dumps(reason) for normalized, reason in classified.items()})
+    vague.update((normalized, reason) for normalized, reason in classified.items() if reason)
+    return vague
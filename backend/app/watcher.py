@@ -0,0 +1,140 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.processor import INBOX_DIR, INBOX_WORKERS, claim_report, process_report, recover_claimed_reports
+
+# Long-running alternative to POST /api/v1/process/run: watches report_inbox
+# and processes each PDF as soon as it has finished being written.
+# Run with:  python -m app.watcher
+#
+# Uses filesystem notifications (inotify / FSEvents / ReadDirectoryChangesW via
+# `watchdog`) when available, otherwise falls back to polling the inbox.
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+
+# A file is considered complete once its size has not changed for this long.
+WATCH_SETTLE_SECONDS = float(os.getenv("WATCH_SETTLE_SECONDS", "3"))
+# How often pending files are re-checked (and the inbox polled, without watchdog).
+WATCH_INTERVAL_SECONDS = float(os.getenv("WATCH_INTERVAL_SECONDS", "1"))
+# Reports claimed but not yet finished. New files wait in the inbox beyond this.
+WATCH_MAX_IN_FLIGHT = int(os.getenv("WATCH_MAX_IN_FLIGHT", str(INBOX_WORKERS * 2)))
+
+def _is_report(path: str) -> bool:
+    return path.lower().endswith(".pdf") and os.path.dirname(os.path.abspath(path)) == os.path.abspath(INBOX_DIR)
+
+class _InboxEventHandler(FileSystemEventHandler):
+    def __init__(self, watcher):
+        self.watcher = watcher
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.watcher.touch(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.watcher.touch(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.watcher.touch(event.dest_path)
+
+class InboxWatcher:
+    def __init__(self, inbox_dir: str = INBOX_DIR, workers: int = INBOX_WORKERS, settle_seconds: float = WATCH_SETTLE_SECONDS, max_in_flight: int = WATCH_MAX_IN_FLIGHT):
+        self.inbox_dir = inbox_dir
+        self.settle_seconds = settle_seconds
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="watch-worker")
+        self.in_flight = threading.BoundedSemaphore(max_in_flight)
+        # path -> (last seen size, time the size last changed)
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+
+    def touch(self, path: str):
+        """Records activity on `path`; it becomes ready once its size settles."""
+        if not _is_report(path):
+            return
+        with self.lock:
+            size = self.pending.get(path, (None, 0))[0]
+            self.pending[path] = (size, time.monotonic())
+
+    def scan(self):
+        with os.scandir(self.inbox_dir) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.path not in self.pending:
+                    self.touch(entry.path)
+
+    def _ready_paths(self) -> list:
+        now = time.monotonic()
+        ready = []
+        with self.lock:
+            for path, (last_size, changed_at) in list(self.pending.items()):
+                try:
+                    size = os.path.getsize(path)
+                except OSError:
+                    # Deleted, renamed, or claimed by another processor.
+                    del self.pending[path]
+                    continue
+                if size != last_size:
+                    self.pending[path] = (size, now)
+                elif size > 0 and now - changed_at >= self.settle_seconds:
+                    ready.append(path)
+        return ready
+
+    def _dispatch(self, path: str):
+        # Backpressure: leave the file in the inbox until a slot frees up.
+        if not self.in_flight.acquire(blocking=False):
+            return False
+        with self.lock:
+            self.pending.pop(path, None)
+        filename = os.path.basename(path)
+        claimed_path = claim_report(filename, owner="watcher")
+        if not claimed_path:
+            self.in_flight.release()
+            return True
+        print(f"--- WATCHER: '{filename}' is complete. Queued for processing. ---")
+        future = self.executor.submit(process_report, filename, claimed_path)
+        future.add_done_callback(lambda _: self.in_flight.release())
+        return True
+
+    def run(self):
+        print(f"--- WATCHER: Watching '{self.inbox_dir}' ({'filesystem events' if Observer else 'polling'}) ---")
+        observer = None
+        if Observer:
+            observer = Observer()
+            observer.schedule(_InboxEventHandler(self), self.inbox_dir, recursive=False)
+            observer.start()
+        # Pick up anything that arrived, or was left half-processed, while the watcher was not running.
+        recover_claimed_reports()
+        self.scan()
+        try:
+            while not self.stopped.wait(WATCH_INTERVAL_SECONDS):
+                if not observer:
+                    self.scan()
+                for path in self._ready_paths():
+                    if not self._dispatch(path):
+                        break
+        finally:
+            if observer:
+                observer.stop()
+                observer.join()
+            self.executor.shutdown(wait=True)
+            print("--- WATCHER: Stopped. ---")
+
+    def stop(self):
+        self.stopped.set()
+
+def main():
+    watcher = InboxWatcher()
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        watcher.stop()
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from dotenv import load_dotenv
 from contextlib import asynccontextmanager
 import google.generativeai as genai
@@ -21,6 +22,9 @@ async def lifespan(app: FastAPI):
         print("-> GOOGLE_API_KEY found. Configuring Google Gemini AI...")
         genai.configure(api_key=api_key)
         print("-> Google Gemini AI configured successfully.")
+
+    resume_pending_jobs()
+    ensure_rollups_in_background()
     
     print("--- Startup Complete. Uvicorn is ready. ---")
     yield
@@ -29,10 +33,17 @@ async def lifespan(app: FastAPI):
 
 from app.database import engine
 from app.models import models
-from app.controllers import constituency_controller, processing_controller, rti_pil_controller, insight_controller, budget_controller
+from app.jobs import resume_pending_jobs
+from app.rollups import ensure_rollups_in_background
+from app.schema_upgrade import upgrade_schema
+from app.search import ensure_search_index
+from app.controllers import constituency_controller, processing_controller, rti_pil_controller, insight_controller, budget_controller, rollup_controller, search_controller, metrics_controller
 
 # This creates the tables if they don't exist
 models.Base.metadata.create_all(bind=engine)
+# ...and adds the columns create_all does not add to existing tables
+upgrade_schema(engine)
+ensure_search_index(engine)
 
 # Pass the lifespan manager to the FastAPI app
 app = FastAPI(
@@ -50,7 +61,9 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Link", "X-Next-Cursor"],
 )
+app.add_middleware(GZipMiddleware, minimum_size=1000)
 
 # Include all the routers
 app.include_router(constituency_controller.router)
@@ -58,6 +71,9 @@ app.include_router(processing_controller.router)
 app.include_router(rti_pil_controller.router)
 app.include_router(insight_controller.router)
 app.include_router(budget_controller.router)
+app.include_router(rollup_controller.router)
+app.include_router(search_controller.router)
+app.include_router(metrics_controller.router)
 
 @app.get("/", tags=["Root"])
 def read_root():
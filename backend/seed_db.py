@@ -4,9 +4,11 @@ import re
 from sqlalchemy.orm import Session
 from app.database import SessionLocal, engine
 from app.models import models
+from app.schema_upgrade import upgrade_schema
 
 # This command ensures all tables are created based on your models.
 models.Base.metadata.create_all(bind=engine)
+upgrade_schema(engine)
 
 # Get a new database session
 db = SessionLocal()
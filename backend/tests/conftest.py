@@ -0,0 +1,24 @@
+import os
+import tempfile
+import pytest
+
+# app.database builds its engines at import time, so point it at a scratch
+# SQLite database (and keep the pipeline cache out of the source tree) before
+# any test module imports the app.
+_scratch = tempfile.mkdtemp(prefix="mplads-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_scratch, 'test.db')}"
+os.environ.pop("READ_DATABASE_URL", None)
+os.environ["PIPELINE_CACHE_DIR"] = os.path.join(_scratch, "pipeline_cache")
+
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.models import models  # noqa: E402,F401
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
@@ -0,0 +1,54 @@
+import pytest
+from app import budget_optimizer
+from app.budget_optimizer import CATEGORIES, InfeasibleBudgetBounds, _bounded_shares, allocate, profile_needs, share_bounds
+
+def _assert_within_bounds(shares, tolerance=1e-9):
+    for category, (low, high) in share_bounds().items():
+        assert low - tolerance <= shares[category] <= high + tolerance, category
+
+@pytest.mark.parametrize("weights", [
+    {category: 1.0 for category in CATEGORIES},
+    # Two categories and Other over their caps, the rest under their floor.
+    {"Road Construction": 100.0, "Education": 100.0, "Health & Sanitation": 1.0, "Community Infrastructure": 1.0, "Drinking Water": 1.0, "Other": 50.0},
+    {"Road Construction": 1000.0, "Education": 0.0, "Health & Sanitation": 0.0, "Community Infrastructure": 0.0, "Drinking Water": 0.0, "Other": 0.0},
+    {"Road Construction": 0.01, "Education": 0.01, "Health & Sanitation": 0.01, "Community Infrastructure": 0.01, "Drinking Water": 0.01, "Other": 1000.0},
+])
+def test_bounded_shares_sum_to_one_within_bounds(weights):
+    shares = _bounded_shares(weights)
+    assert sum(shares.values()) == pytest.approx(1.0, abs=1e-12)
+    _assert_within_bounds(shares)
+
+def test_unclipped_categories_stay_proportional():
+    shares = _bounded_shares({"Road Construction": 100.0, "Education": 100.0, "Health & Sanitation": 1.0, "Community Infrastructure": 1.0, "Drinking Water": 1.0, "Other": 50.0})
+    assert shares["Road Construction"] == pytest.approx(shares["Education"])
+    assert shares["Other"] == pytest.approx(0.10)
+    assert shares["Drinking Water"] == pytest.approx(0.05)
+
+def test_infeasible_bounds_are_rejected(monkeypatch):
+    monkeypatch.setattr(budget_optimizer, "BUDGET_MIN_SHARE", 0.2)
+    with pytest.raises(InfeasibleBudgetBounds):
+        _bounded_shares({category: 1.0 for category in CATEGORIES})
+
+@pytest.mark.parametrize("total_budget", [50000000.0, 12345678.0, 59999.0, 7.0, 0.0])
+@pytest.mark.parametrize("profile", [
+    "A remote, hilly tribal constituency with poor road connectivity and below-average literacy.",
+    "Drought-prone arid district facing drinking water scarcity and high fluoride levels.",
+    "",
+])
+def test_allocation_sums_exactly_and_respects_bounds(profile, total_budget):
+    own = {"Road Construction": 0.9, "Other": 0.1}
+    national = {"Road Construction": 0.3, "Education": 0.2, "Health & Sanitation": 0.15, "Community Infrastructure": 0.2, "Drinking Water": 0.1, "Other": 0.05}
+    allocation = allocate(profile, total_budget, own, national)
+    amounts = {item["category"]: item["amount"] for item in allocation}
+    assert list(amounts) == CATEGORIES
+    assert sum(amounts.values()) == pytest.approx(total_budget, abs=1e-6)
+    if total_budget:
+        # Rounding to whole units moves each amount by less than one unit.
+        unit = budget_optimizer.BUDGET_ROUNDING_INR if total_budget >= budget_optimizer.BUDGET_ROUNDING_INR * len(CATEGORIES) else 1.0
+        _assert_within_bounds({category: amount / total_budget for category, amount in amounts.items()}, tolerance=unit / total_budget)
+
+def test_profile_needs_boost_deficiencies():
+    needs = profile_needs("Below-average literacy and poor road connectivity.")
+    assert needs["Education"] == (1.5, ["literacy"])
+    assert needs["Road Construction"][1] == ["road", "connectivity"]
+    assert needs["Other"] == (0.0, [])
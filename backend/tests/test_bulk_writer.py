@@ -0,0 +1,95 @@
+import csv
+import io
+import pytest
+from app import bulk_writer
+from app.bulk_writer import PROJECT_COLUMNS, insert_projects, parse_amount, prepare_project_rows
+from app.models import models
+
+@pytest.mark.parametrize("value, expected", [
+    (500000, 500000.0),
+    ("5,00,000", 500000.0),
+    ("Rs. 5,00,000/-", 500000.0),
+    ("5.5 lakh", 550000.0),
+    ("2 Lakhs", 200000.0),
+    ("3 lacs", 300000.0),
+    ("1.25 crore", 12500000.0),
+    ("2 Cr", 20000000.0),
+    ("", 0.0),
+    (None, 0.0),
+    ("not available", 0.0),
+    ("Phase 2 work, Rs. 5,00,000/-", 500000.0),
+    ("Ward 12: 3.5 lakh", 350000.0),
+    ("5,00,000 for 2 classrooms", 500000.0),
+    ("INR 1.2 Cr (2 buildings)", 12000000.0),
+    ("2 classrooms 80000", 80000.0),
+])
+def test_parse_amount(value, expected):
+    assert parse_amount(value) == pytest.approx(expected)
+
+def test_prepare_project_rows_normalises_and_drops_empty_rows():
+    rows = prepare_project_rows(7, [
+        {"project_description": "  CC road\\n from   market ", "allocated_amount": "2.5 lakh", "location": " Ward 4 ", "contractor_ngo_name": "ABC  Constructions", "category": "Road Construction"},
+        {"project_description": "Borewell", "allocated_amount": "80,000", "category": "Water works"},
+        {"project_description": "   ", "allocated_amount": None},
+    ], report_id=3)
+    assert rows == [
+        {"constituency_id": 7, "report_id": 3, "project_description": "CC road\\n from market", "allocated_amount": 250000.0, "location": "Ward 4", "contractor_ngo_name": "ABC Constructions", "contractor_id": None, "category": "Road Construction"},
+        {"constituency_id": 7, "report_id": 3, "project_description": "Borewell", "allocated_amount": 80000.0, "location": None, "contractor_ngo_name": None, "contractor_id": None, "category": "Other"},
+    ]
+
+def _rows(db, count):
+    constituency = models.Constituency(constituency_name="Bagalkot", state="Karnataka")
+    db.add(constituency)
+    db.flush()
+    return prepare_project_rows(constituency.id, [{"project_description": f"Work {index}", "allocated_amount": index + 1, "category": "Education"} for index in range(count)])
+
+def test_executemany_insert_on_sqlite(db):
+    rows = _rows(db, bulk_writer.BULK_COPY_MIN_ROWS + 10)
+    insert_projects(db, rows)
+    db.commit()
+    assert db.query(models.Project).count() == len(rows)
+    assert db.query(models.Project.allocated_amount).order_by(models.Project.id.desc()).first()[0] == len(rows)
+
+def test_insert_returns_ids_in_row_order(db):
+    rows = _rows(db, 5)
+    ids = insert_projects(db, rows, return_ids=True)
+    assert [db.get(models.Project, project_id).project_description for project_id in ids] == [row["project_description"] for row in rows]
+
+class _RecordingCursor:
+    def __init__(self):
+        self.statements = []
+
+    def copy_expert(self, statement, buffer):
+        self.statements.append((statement, buffer.read()))
+
+    def close(self):
+        pass
+
+class _PostgresSession:
+    """Just enough of a Session on PostgreSQL to reach the COPY path without a server."""
+
+    class dialect:
+        name = "postgresql"
+
+    def __init__(self):
+        self.recorder = _RecordingCursor()
+
+    def cursor(self):
+        return self.recorder
+
+    def get_bind(self):
+        return self
+
+    def connection(self):
+        # Session.connection().connection is the DBAPI connection.
+        return type("Connection", (), {"connection": self})()
+
+def test_large_batches_use_copy_on_postgresql():
+    session = _PostgresSession()
+    rows = prepare_project_rows(1, [{"project_description": f'Hall, "phase" {index}', "allocated_amount": 1000 + index, "location": None} for index in range(bulk_writer.BULK_COPY_MIN_ROWS)])
+    assert insert_projects(session, rows) is None
+    (statement, data), = session.recorder.statements
+    assert statement == f"COPY projects ({', '.join(PROJECT_COLUMNS)}) FROM STDIN WITH (FORMAT csv, NULL '')"
+    copied = list(csv.reader(io.StringIO(data)))
+    assert len(copied) == len(rows)
+    assert copied[0] == ["1", "", 'Hall, "phase" 0', "1000.0", "", "", "", "Other"]
@@ -0,0 +1,49 @@
+from app.concentration import CONCENTRATION_TITLE, MARKET_TITLE, OUTLIER_TITLE, SPLIT_INVOICE_TITLE, ProjectColumns, analyze
+
+def _titles(findings):
+    return sorted(insight["title"] for insight, _ in findings)
+
+def test_dominant_contractor_is_flagged_with_its_projects_as_evidence():
+    columns = ProjectColumns([
+        (1, 1, 500000.0, 10, "ABC Constructions", "Ward 1", "Road Construction"),
+        (2, 1, 300000.0, 10, "ABC Constructions", "Ward 2", "Road Construction"),
+        (3, 1, 100000.0, 11, "XYZ Builders", "Ward 3", "Education"),
+        (4, 1, 100000.0, None, "Local NGO", "Ward 4", "Education"),
+    ])
+    findings = analyze(columns)
+    assert _titles(findings) == [CONCENTRATION_TITLE]
+    insight, evidence = findings[0]
+    assert insight["constituency_id"] == 1
+    assert "80.0%" in insight["finding"]
+    assert sorted(row["project_id"] for row in evidence) == [1, 2]
+
+def test_concentrated_market_without_a_single_dominant_contractor():
+    columns = ProjectColumns([
+        (1, 1, 380000.0, 10, "A", "Ward 1", "Road Construction"),
+        (2, 1, 370000.0, 11, "B", "Ward 2", "Road Construction"),
+        (3, 1, 250000.0, 12, "C", "Ward 3", "Education"),
+    ])
+    findings = analyze(columns)
+    assert _titles(findings) == [MARKET_TITLE]
+    _, evidence = findings[0]
+    assert sorted(row["project_id"] for row in evidence) == [1, 2, 3]
+
+def test_near_identical_amounts_at_one_location_are_split_invoices():
+    columns = ProjectColumns([
+        (1, 1, 99000.0, 10, "A", "Village Hall", "Community Infrastructure"),
+        (2, 1, 99500.0, 10, "A", "Village Hall", "Community Infrastructure"),
+        (3, 1, 50000.0, 10, "A", "School", "Education"),
+    ] + [(id, 1, 100000.0, 10 + id, f"C{id}", f"Ward {id}", "Health & Sanitation") for id in range(4, 12)])
+    findings = [finding for finding in analyze(columns) if finding[0]["title"] == SPLIT_INVOICE_TITLE]
+    assert len(findings) == 1
+    assert sorted(row["project_id"] for row in findings[0][1]) == [1, 2]
+
+def test_outlier_amount_within_a_category():
+    rows = [(id, 1, 100000.0 + id * 1000, 10 + id, f"C{id}", f"Ward {id}", "Education") for id in range(1, 10)]
+    rows.append((10, 1, 10000000.0, 30, "C10", "Ward 10", "Education"))
+    findings = [finding for finding in analyze(ProjectColumns(rows)) if finding[0]["title"] == OUTLIER_TITLE]
+    assert len(findings) == 1
+    assert [row["project_id"] for row in findings[0][1]] == [10]
+
+def test_no_projects_no_findings():
+    assert analyze(ProjectColumns([])) == []
@@ -0,0 +1,81 @@
+import pytest
+from app import constituency_resolver as constituency_resolver_module
+from app.constituency_resolver import AmbiguousConstituencyName, ConstituencyTrie, constituency_resolver, slugify
+from app.models import models
+
+TRIE = ConstituencyTrie([
+    (1, "Bagalkot"),
+    (2, "Bangalore"),
+    (3, "Bangalore Central"),
+    (4, "Bangalore North"),
+    (5, "Bellary (ST)"),
+    (6, "Chikkodi"),
+    (7, "Chikkodi (SC)"),
+])
+
+def test_filenames_resolve_by_longest_prefix():
+    assert TRIE.resolve("Bagalkot_2018") == 1
+    assert TRIE.resolve("Bangalore_Central_MPLADS") == 3
+    assert TRIE.resolve("bellary-st-annexure") == 5
+
+def test_partial_names_resolve_only_when_unique():
+    assert TRIE.resolve("Bagal") == 1
+    assert TRIE.resolve("Bagal", allow_partial=False) is None
+    with pytest.raises(AmbiguousConstituencyName) as error:
+        TRIE.resolve("Bangalor")
+    assert error.value.candidates == ["Bangalore", "Bangalore Central", "Bangalore North"]
+
+def test_lookup_is_exact():
+    assert TRIE.lookup("Bagalkot") == 1
+    assert TRIE.lookup("bagalkot") == 1
+    assert TRIE.lookup("Bag") is None
+    assert TRIE.lookup("Bagalkotzzz") is None
+    assert TRIE.lookup("bangalore-central") == 3
+    assert TRIE.lookup("") is None
+
+def test_reservation_suffix_is_optional_but_disambiguates():
+    assert TRIE.lookup("Bellary") == 5
+    assert TRIE.lookup("Bellary (ST)") == 5
+    # "Chikkodi" is exactly one constituency's name; the suffix selects the other.
+    assert TRIE.lookup("Chikkodi") == 6
+    assert TRIE.lookup("Chikkodi (SC)") == 7
+    assert TRIE.lookup(slugify("Chikkodi (SC)")) == 7
+
+def test_names_differing_only_by_suffix_are_ambiguous():
+    trie = ConstituencyTrie([(1, "Mandya (SC)"), (2, "Mandya (ST)")])
+    with pytest.raises(AmbiguousConstituencyName) as error:
+        trie.lookup("Mandya")
+    assert error.value.candidates == ["Mandya (SC)", "Mandya (ST)"]
+    with pytest.raises(AmbiguousConstituencyName):
+        trie.resolve("Mandya_2019")
+    assert trie.lookup("mandya-st") == 2
+
+def test_slugs_keep_the_suffix(db):
+    db.add_all([models.Constituency(constituency_name="Chikkodi", state="Karnataka"), models.Constituency(constituency_name="Chikkodi (SC)", state="Karnataka")])
+    db.commit()
+    assert sorted(row.slug for row in db.query(models.Constituency)) == ["chikkodi", "chikkodi-sc"]
+    constituency_resolver.invalidate()
+    assert constituency_resolver.lookup(db, "chikkodi-sc") == db.query(models.Constituency.id).filter_by(slug="chikkodi-sc").scalar()
+
+def test_dashboard_only_serves_exact_names(db):
+    from app.controllers.constituency_controller import _resolve_dashboard
+
+    db.add(models.Constituency(constituency_name="Bagalkot", mp_name="P. C. Gaddigoudar", state="Karnataka"))
+    db.commit()
+    constituency_resolver.invalidate()
+    assert _resolve_dashboard(db, "Bagalkot")[2]["constituency_name"] == "Bagalkot"
+    assert _resolve_dashboard(db, "Bag") is None
+    assert _resolve_dashboard(db, "Bagalkotzzz") is None
+
+def test_renamed_constituency_is_picked_up(db, monkeypatch):
+    monkeypatch.setattr(constituency_resolver_module, "CONSTITUENCY_RESOLVER_REFRESH_SECONDS", 0)
+    constituency = models.Constituency(constituency_name="Bangalore North", state="Karnataka")
+    db.add(constituency)
+    db.commit()
+    constituency_resolver.invalidate()
+    assert constituency_resolver.lookup(db, "Bangalore North") == constituency.id
+    constituency.constituency_name = "Bengaluru North"
+    db.commit()
+    assert (constituency.slug, constituency.data_version) == ("bengaluru-north", 1)
+    assert constituency_resolver.lookup(db, "Bengaluru North") == constituency.id
+    assert constituency_resolver.lookup(db, "Bangalore North") is None
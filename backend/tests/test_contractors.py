@@ -0,0 +1,54 @@
+from app.contractors import ContractorResolver, assign_contractor_ids, backfill_block_keys, backfill_contractors, name_distance, normalize_contractor_name
+from app.models import models
+
+def test_name_variants_normalise_to_one_name():
+    variants = ["M/s ABC Constructions Pvt. Ltd.", "ABC Construction", "m/s a.b.c. constructions private limited", "A B C Construction Co."]
+    assert {normalize_contractor_name(name) for name in variants} == {"abc construction"}
+
+def test_normalisation_keeps_distinct_names_apart():
+    assert normalize_contractor_name("Shri Ram & Sons") == "ram and sons"
+    assert normalize_contractor_name("Glass Works") != normalize_contractor_name("Gas Works")
+    assert normalize_contractor_name(None) == ""
+
+def test_resolver_reuses_exact_and_fuzzy_matches(db):
+    resolver = ContractorResolver(db)
+    first = resolver.resolve(["M/s ABC Constructions Pvt Ltd", "XYZ Builders"])
+    db.commit()
+    # A fresh resolver has to find the existing entities in the database.
+    second = ContractorResolver(db).resolve(["ABC Construction", "XYZ Bulders", "  "])
+    assert second == {"ABC Construction": first["M/s ABC Constructions Pvt Ltd"], "XYZ Bulders": first["XYZ Builders"]}
+    assert db.query(models.Contractor).count() == 2
+
+def test_rows_and_legacy_projects_are_linked(db):
+    rows = assign_contractor_ids(ContractorResolver(db), [{"contractor_ngo_name": "ABC Constructions"}, {"contractor_ngo_name": None}])
+    assert rows[0]["contractor_id"] is not None and rows[1]["contractor_id"] is None
+    constituency = models.Constituency(constituency_name="Alpha", state="S")
+    db.add(constituency)
+    db.flush()
+    db.add(models.Project(constituency_id=constituency.id, contractor_ngo_name="M/s ABC Construction"))
+    db.commit()
+    assert backfill_contractors(db) == 1
+    assert db.query(models.Project.contractor_id).scalar() == rows[0]["contractor_id"]
+
+def test_distinct_short_names_stay_separate(db):
+    names = ["Sai Constructions", "Sri Sai Constructions Pvt Ltd", "Sri Constructions", "Ravi Builders", "Rani Builders", "Gupta Enterprises", "Gupta Engineers"]
+    ids = ContractorResolver(db).resolve(names)
+    db.commit()
+    assert ids["Sai Constructions"] == ids["Sri Sai Constructions Pvt Ltd"]
+    assert len({ids[name] for name in names}) == 6
+    # Also when the other spelling is already in the database.
+    assert ContractorResolver(db).resolve(["Rani Builders"])["Rani Builders"] == ids["Rani Builders"]
+    assert name_distance("sai construction", "sri construction") is None
+
+def test_misread_first_letters_still_find_the_contractor(db):
+    first = ContractorResolver(db).resolve(["Lakshmi Enterprises"])
+    db.commit()
+    second = ContractorResolver(db).resolve(["Iakshmi Enterprises", "Lakshmi Enterprses"])
+    assert set(second.values()) == set(first.values())
+    assert db.query(models.Contractor).count() == 1
+
+def test_contractors_created_before_block_keys_are_indexed(db):
+    db.add(models.Contractor(canonical_name="Lakshmi Enterprises", normalized_name="lakshmi enterprise"))
+    db.commit()
+    assert backfill_block_keys(db) == 1 and backfill_block_keys(db) == 0
+    assert ContractorResolver(db).resolve(["Iakshmi Enterprises"])["Iakshmi Enterprises"] == db.query(models.Contractor.id).scalar()
@@ -0,0 +1,41 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.constituency_resolver import constituency_resolver
+from app.controllers import constituency_controller
+from app.dashboard_cache import dashboard_cache, invalidate_constituency
+from app.models import models
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(constituency_controller.router)
+    dashboard_cache.invalidate()
+    constituency_resolver.invalidate()
+    with TestClient(app) as client:
+        yield client
+
+def test_cached_dashboard_follows_changes_made_by_other_processes(db, client):
+    constituency = models.Constituency(constituency_name="Bagalkot", mp_name="Old MP", state="Karnataka")
+    db.add(constituency)
+    db.commit()
+    first = client.get("/api/v1/dashboard/Bagalkot")
+    assert first.status_code == 200 and first.json()["mp_name"] == "Old MP"
+
+    # Another process changes the data but has no access to this process's cache...
+    db.query(models.Constituency).update({"mp_name": "New MP"})
+    db.commit()
+    assert client.get("/api/v1/dashboard/Bagalkot").json()["mp_name"] == "Old MP"
+    # ...until it bumps the shared version.
+    db.query(models.Constituency).update({"data_version": models.Constituency.data_version + 1})
+    db.commit()
+    second = client.get("/api/v1/dashboard/Bagalkot", headers={"If-None-Match": first.headers["etag"]})
+    assert second.status_code == 200 and second.json()["mp_name"] == "New MP"
+
+def test_invalidation_bumps_the_shared_version(db):
+    constituency = models.Constituency(constituency_name="Mandya", state="Karnataka")
+    db.add(constituency)
+    db.commit()
+    invalidate_constituency(constituency.id)
+    db.expire_all()
+    assert db.get(models.Constituency, constituency.id).data_version == 1
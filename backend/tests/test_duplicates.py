@@ -0,0 +1,36 @@
+from app import duplicates
+from app.duplicates import band_buckets, minhash, normalize_project_text, similarity
+from app.models import models
+
+def test_minhash_estimates_text_similarity():
+    text = normalize_project_text("Construction of CC road from main market to bus stand", "Ward 4", "ABC Constructions")
+    near = normalize_project_text("Construction of C.C. road from main market to bus-stand", "Ward 4", "ABC Constructions")
+    other = normalize_project_text("Supply of desks and benches to government school", "Ward 9", "XYZ Traders")
+    assert similarity(minhash(text), minhash(text)) == 1.0
+    assert similarity(minhash(text), minhash(near)) >= duplicates.DUPLICATE_SIMILARITY_THRESHOLD
+    assert similarity(minhash(text), minhash(other)) < 0.3
+
+def test_identical_signatures_share_every_band():
+    signature = minhash("borewell with overhead tank")
+    assert len(band_buckets(signature)) == duplicates.DUPLICATE_BANDS
+    assert band_buckets(signature) == band_buckets(minhash("borewell with overhead tank"))
+
+def test_duplicates_across_constituencies_are_found(db):
+    first = models.Constituency(constituency_name="Alpha", state="S")
+    second = models.Constituency(constituency_name="Beta", state="S")
+    db.add_all([first, second])
+    db.flush()
+    report = models.Report(constituency_id=first.id)
+    db.add(report)
+    db.flush()
+    projects = [
+        models.Project(id=1, constituency_id=first.id, report_id=report.id, project_description="Construction of CC road from main market to bus stand", location="Ward 4", contractor_ngo_name="ABC Constructions"),
+        models.Project(id=2, constituency_id=second.id, project_description="Construction of C.C. road from main market to bus-stand", location="Ward 4", contractor_ngo_name="ABC Constructions"),
+        models.Project(id=3, constituency_id=second.id, project_description="Supply of desks and benches to government school", location="Ward 9", contractor_ngo_name="XYZ Traders"),
+    ]
+    db.add_all(projects)
+    db.flush()
+    duplicates.index_projects(db, [(p.id, p.project_description, p.location, p.contractor_ngo_name) for p in projects])
+    db.commit()
+    pairs = duplicates.find_duplicate_pairs(db, first.id, report.id)
+    assert [(a, b) for a, b, _ in pairs] == [(1, 2)]
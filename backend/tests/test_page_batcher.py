@@ -0,0 +1,23 @@
+from app.page_batcher import pack_pages
+
+def test_pages_are_packed_greedily_within_the_budget():
+    # 40 characters is about 10 tokens a page.
+    pages = ["x" * 40] * 5
+    batches = pack_pages(pages, token_budget=25)
+    assert [batch.page_numbers for batch in batches] == [[1, 2], [3, 4], [5]]
+    assert all(batch.tokens <= 25 for batch in batches)
+
+def test_oversized_page_gets_its_own_batch():
+    pages = ["x" * 40, "x" * 400, "x" * 40]
+    batches = pack_pages(pages, token_budget=25)
+    assert [batch.page_numbers for batch in batches] == [[1], [2], [3]]
+
+def test_explicit_page_numbers_are_kept():
+    batches = pack_pages(["a" * 40, "b" * 40, "c" * 40], token_budget=100, page_numbers=[2, 5, 9])
+    assert len(batches) == 1
+    assert (batches[0].first_page, batches[0].last_page) == (2, 9)
+    first, second = batches[0].split()
+    assert first.page_numbers == [2] and second.page_numbers == [5, 9]
+
+def test_no_pages_no_batches():
+    assert pack_pages([]) == []
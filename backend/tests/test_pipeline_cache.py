@@ -0,0 +1,56 @@
+import asyncio
+import sqlite3
+import threading
+from app.pipeline_cache import PipelineCache, hash_texts
+
+def test_get_set_and_get_many(tmp_path):
+    cache = PipelineCache(str(tmp_path))
+    cache.set("ocr", "a", "page one")
+    cache.set("ocr", "b", "page two")
+    assert cache.get("ocr", "a") == "page one"
+    assert cache.get("structure", "a") is None
+    assert cache.get_many("ocr", ["a", "missing", "b", "a"]) == {"a": "page one", "b": "page two"}
+    assert cache.stats()["namespaces"]["ocr"] == {"entries": 2, "bytes": 16, "hits": 3}
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = PipelineCache(str(tmp_path), max_bytes=10)
+    cache.set("ocr", "old", "12345")
+    cache.set("ocr", "new", "67890")
+    cache.set("ocr", "newest", "abcde")
+    assert cache.get("ocr", "old") is None
+    assert cache.get_many("ocr", ["new", "newest"]) == {"new": "67890", "newest": "abcde"}
+
+def test_async_variants_run_off_the_event_loop(tmp_path, monkeypatch):
+    cache = PipelineCache(str(tmp_path))
+    threads = []
+    for name in ("get", "get_many", "set"):
+        method = getattr(cache, name)
+        monkeypatch.setattr(cache, name, lambda *args, method=method: threads.append(threading.get_ident()) or method(*args))
+
+    async def _run():
+        await cache.aset("briefs", "k", "questions")
+        return threading.get_ident(), await cache.aget("briefs", "k"), await cache.aget_many("briefs", ["k"])
+
+    loop_thread, value, values = asyncio.run(_run())
+    assert (value, values) == ("questions", {"k": "questions"})
+    assert len(threads) == 3 and loop_thread not in threads
+
+def test_hash_texts_separates_parts():
+    assert hash_texts("ab", "c") != hash_texts("a", "bc")
+
+def test_running_total_tracks_writes_overwrites_and_deletes(tmp_path):
+    cache = PipelineCache(str(tmp_path), max_bytes=12)
+    cache.set("ocr", "a", "12345")
+    cache.set("ocr", "a", "1234567")
+    cache.set_many("structure", {"b": "abc", "c": "de"})
+    assert cache.total_bytes() == 12 == cache.stats()["total_bytes"]
+    cache.set("ocr", "d", "xyz")
+    assert cache.get("ocr", "a") is None and cache.total_bytes() == cache.stats()["total_bytes"] == 8
+    cache.purge(namespace="structure")
+    assert cache.total_bytes() == 3
+
+def test_running_total_starts_from_existing_entries(tmp_path):
+    PipelineCache(str(tmp_path)).set("ocr", "a", "12345")
+    with sqlite3.connect(str(tmp_path / "cache.sqlite3")) as conn:
+        conn.execute("DROP TABLE totals")
+    assert PipelineCache(str(tmp_path)).total_bytes() == 5
@@ -0,0 +1,77 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+import pytest
+from app import jobs, processor
+from app.models import models
+
+@pytest.fixture
+def report_dirs(tmp_path, monkeypatch):
+    inbox, processed = tmp_path / "report_inbox", tmp_path / "processed_reports"
+    processing = inbox / "processing"
+    for directory in (inbox, processing, processed):
+        directory.mkdir(exist_ok=True)
+    monkeypatch.setattr(processor, "INBOX_DIR", str(inbox))
+    monkeypatch.setattr(processor, "PROCESSING_DIR", str(processing))
+    monkeypatch.setattr(processor, "PROCESSED_DIR", str(processed))
+    monkeypatch.setattr(processor, "_heartbeat_dirs", set())
+    return inbox, processing, processed
+
+def _other_process_claim(processing, name, host, pid, heartbeat_age=0.0):
+    directory = processing / f"api.{host}.{pid}"
+    directory.mkdir()
+    (directory / processor.HEARTBEAT_FILE).touch()
+    heartbeat = time.time() - heartbeat_age
+    os.utime(directory / processor.HEARTBEAT_FILE, (heartbeat, heartbeat))
+    (directory / name).write_bytes(b"%PDF")
+
+def test_only_claims_of_stopped_processes_are_recovered(report_dirs):
+    inbox, processing, processed = report_dirs
+    host = socket.gethostname()
+    (inbox / "Bagalkot_2018.pdf").write_bytes(b"%PDF")
+    own_claim = processor.claim_report("Bagalkot_2018.pdf", owner="watcher")
+    assert processor.claim_report("Bagalkot_2018.pdf") is None
+    finished = subprocess.Popen([sys.executable, "-c", "pass"])
+    finished.wait()
+    _other_process_claim(processing, "Mandya_2019.pdf", host, os.getppid())
+    _other_process_claim(processing, "Udupi_2020.pdf", host, finished.pid)
+    _other_process_claim(processing, "Bidar_2021.pdf", "other-host", 4242)
+    _other_process_claim(processing, "Hassan_2022.pdf", "crashed-host", 4242, heartbeat_age=processor.CLAIM_STALE_SECONDS + 60)
+    # A claim left by a version without per-process directories.
+    (processing / "Kolar_2017.pdf").write_bytes(b"%PDF")
+
+    assert sorted(processor.recover_claimed_reports()) == ["Hassan_2022.pdf", "Kolar_2017.pdf", "Udupi_2020.pdf"]
+    assert os.path.exists(own_claim)
+    assert (processing / f"api.{host}.{os.getppid()}" / "Mandya_2019.pdf").exists()
+    assert (processing / "api.other-host.4242" / "Bidar_2021.pdf").exists()
+    assert not (processing / f"api.{host}.{finished.pid}").exists()
+
+def test_reuploaded_report_wins_over_the_stale_claim(report_dirs):
+    inbox, processing, processed = report_dirs
+    (inbox / "Bagalkot_2018.pdf").write_bytes(b"old")
+    processor.claim_report("Bagalkot_2018.pdf")
+    # As if this process had crashed and restarted.
+    processor._heartbeat_dirs.clear()
+    (inbox / "Bagalkot_2018.pdf").write_bytes(b"new")
+    assert processor.recover_claimed_reports() == []
+    assert (inbox / "Bagalkot_2018.pdf").read_bytes() == b"new"
+    assert [path.name.startswith("INTERRUPTED_") for path in processed.iterdir()] == [True]
+
+def test_startup_fails_interrupted_jobs_and_requeues_their_reports(db, report_dirs, monkeypatch):
+    inbox, _, _ = report_dirs
+    (inbox / "Bagalkot_2018.pdf").write_bytes(b"%PDF")
+    processor.claim_report("Bagalkot_2018.pdf")
+    processor._heartbeat_dirs.clear()
+    db.add(models.ProcessingJob(id="interrupted", status=models.JobStatus.RUNNING, progress={}))
+    db.commit()
+    enqueued = []
+    monkeypatch.setattr(jobs, "enqueue_inbox_job", lambda: enqueued.append(True))
+
+    jobs.resume_pending_jobs()
+
+    db.expire_all()
+    assert db.get(models.ProcessingJob, "interrupted").status == models.JobStatus.FAILED
+    assert (inbox / "Bagalkot_2018.pdf").exists()
+    assert enqueued == [True]
@@ -0,0 +1,51 @@
+from app import reports
+from app.models import models
+from app.reports import collect_garbage
+
+def _constituency(db, name, *statuses):
+    constituency = models.Constituency(constituency_name=name, state="Karnataka")
+    db.add(constituency)
+    db.flush()
+    versions = [models.Report(constituency_id=constituency.id, status=status) for status in statuses]
+    db.add_all(versions)
+    db.flush()
+    return constituency, versions
+
+def _project(db, constituency, report, description):
+    project = models.Project(constituency_id=constituency.id, report_id=report.id, project_description=description, allocated_amount=100000.0)
+    db.add(project)
+    db.flush()
+    return project
+
+def _insight(db, constituency, report, *projects):
+    insight = models.AIInsight(constituency_id=constituency.id, report_id=report.id, title="Possible Duplicate Billing", finding="Billed twice.", severity="High")
+    db.add(insight)
+    db.flush()
+    db.add_all([models.Evidence(insight_id=insight.id, project_id=project.id, reasoning="Near-identical.") for project in projects])
+    db.flush()
+    return insight
+
+def test_gc_keeps_projects_cited_by_other_constituencies_insights(db, monkeypatch):
+    monkeypatch.setattr(reports, "REPORT_VERSIONS_TO_KEEP", 0)
+    bagalkot, (old, _) = _constituency(db, "Bagalkot", models.ReportStatus.SUPERSEDED, models.ReportStatus.CURRENT)
+    bidar, (bidar_report,) = _constituency(db, "Bidar", models.ReportStatus.CURRENT)
+    cited = _project(db, bagalkot, old, "CC road in ward 4")
+    uncited = _project(db, bagalkot, old, "Borewell at Rampur")
+    bidar_project = _project(db, bidar, bidar_report, "CC road in ward 4")
+    _insight(db, bagalkot, old, cited, uncited)
+    bidar_insight = _insight(db, bidar, bidar_report, bidar_project, cited)
+    db.commit()
+    cited_id, uncited_id, old_id = cited.id, uncited.id, old.id
+
+    assert collect_garbage(db) == 0
+    assert db.query(models.Evidence).filter_by(insight_id=bidar_insight.id).count() == 2
+    assert db.get(models.Project, cited_id) is not None and db.get(models.Project, uncited_id) is None
+    assert db.query(models.AIInsight).filter_by(report_id=old_id).count() == 0
+    assert db.get(models.Report, old_id) is not None
+
+    # Once Bidar's insight is replaced, nothing pins the old version.
+    db.query(models.Evidence).filter_by(insight_id=bidar_insight.id).delete()
+    db.delete(bidar_insight)
+    db.commit()
+    assert collect_garbage(db) == 1
+    assert db.get(models.Project, cited_id) is None and db.get(models.Report, old_id) is None
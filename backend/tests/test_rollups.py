@@ -0,0 +1,47 @@
+from app.models import models
+from app.rollups import ensure_rollups
+
+def _legacy_constituency(db):
+    constituency = models.Constituency(constituency_name="Bagalkot", state="Karnataka")
+    db.add(constituency)
+    db.flush()
+    db.add_all([
+        models.Project(constituency_id=constituency.id, allocated_amount=250000.0, category="Road Construction", contractor_ngo_name="ABC Constructions"),
+        models.Project(constituency_id=constituency.id, allocated_amount=150000.0, category="Education", contractor_ngo_name="XYZ Builders"),
+    ])
+    db.commit()
+    return constituency
+
+def test_rollups_are_built_for_databases_that_predate_them(db):
+    constituency = _legacy_constituency(db)
+    assert ensure_rollups(db) is True
+    categories = dict(db.query(models.ConstituencyCategorySpending.category, models.ConstituencyCategorySpending.total_amount).filter_by(constituency_id=constituency.id))
+    assert categories == {"Road Construction": 250000.0, "Education": 150000.0}
+    state = db.get(models.StateSpending, "Karnataka")
+    assert (state.total_amount, state.project_count, state.reporting_constituencies) == (400000.0, 2, 1)
+    # Already built: later startups leave them alone.
+    assert ensure_rollups(db) is False
+
+def test_legacy_projects_get_contractors_for_the_top_contractor_list(db):
+    constituency = _legacy_constituency(db)
+    assert ensure_rollups(db) is True
+    assert db.query(models.Project).filter(models.Project.contractor_id.is_(None)).count() == 0
+    top = (
+        db.query(models.Contractor.canonical_name, models.ConstituencyContractorSpending.total_amount)
+        .join(models.Contractor, models.Contractor.id == models.ConstituencyContractorSpending.contractor_id)
+        .filter(models.ConstituencyContractorSpending.constituency_id == constituency.id)
+        .order_by(models.ConstituencyContractorSpending.total_amount.desc())
+        .all()
+    )
+    assert top == [("ABC Constructions", 250000.0), ("XYZ Builders", 150000.0)]
+
+def test_rollups_are_rebuilt_when_unlinked_contractors_appear(db):
+    constituency = _legacy_constituency(db)
+    ensure_rollups(db)
+    db.add(models.Project(constituency_id=constituency.id, allocated_amount=50000.0, category="Education", contractor_ngo_name="PQR Enterprises"))
+    db.commit()
+    assert ensure_rollups(db) is True
+    assert db.query(models.ConstituencyContractorSpending).count() == 3
+
+def test_empty_database_needs_no_rollups(db):
+    assert ensure_rollups(db) is False
@@ -0,0 +1,32 @@
+from sqlalchemy import create_engine, inspect, text
+from app.models import models
+from app.schema_upgrade import upgrade_schema
+
+# The tables as created by the first release, before reports were versioned.
+LEGACY_DDL = [
+    "CREATE TABLE constituencies (id INTEGER PRIMARY KEY, mp_name VARCHAR, constituency_name VARCHAR UNIQUE, state VARCHAR, transparency_status VARCHAR(7), last_report_date DATE, mp_email VARCHAR, mp_image_url VARCHAR)",
+    "CREATE TABLE projects (id INTEGER PRIMARY KEY, constituency_id INTEGER REFERENCES constituencies (id), project_description TEXT, allocated_amount FLOAT, expenditure_date DATE, location VARCHAR, contractor_ngo_name VARCHAR, category VARCHAR)",
+    "CREATE TABLE ai_insights (id INTEGER PRIMARY KEY, constituency_id INTEGER REFERENCES constituencies (id), title VARCHAR, finding TEXT, severity VARCHAR(6))",
+    "CREATE TABLE evidence (id INTEGER PRIMARY KEY, insight_id INTEGER REFERENCES ai_insights (id) ON DELETE CASCADE, project_id INTEGER REFERENCES projects (id), reasoning TEXT)",
+    "INSERT INTO constituencies (id, constituency_name, state) VALUES (1, 'Bagalkot', 'Karnataka'), (2, 'Bellary (ST)', 'Karnataka')",
+    "INSERT INTO projects (id, constituency_id, project_description, allocated_amount) VALUES (1, 1, 'CC road', 250000)",
+]
+
+def test_legacy_database_is_upgraded_in_place(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as connection:
+        for statement in LEGACY_DDL:
+            connection.execute(text(statement))
+    models.Base.metadata.create_all(bind=engine)
+    upgrade_schema(engine)
+    # Idempotent: a second startup changes nothing.
+    upgrade_schema(engine)
+
+    inspector = inspect(engine)
+    for model in (models.Constituency, models.Project, models.AIInsight):
+        assert {column.name for column in model.__table__.columns} <= {column["name"] for column in inspector.get_columns(model.__tablename__)}
+    assert "ix_constituencies_slug" in {index["name"] for index in inspector.get_indexes("constituencies")}
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT slug, data_version FROM constituencies ORDER BY id")).all() == [("bagalkot", 0), ("bellary-st", 0)]
+        assert connection.execute(text("SELECT report_id, contractor_id FROM projects")).all() == [(None, None)]
+    engine.dispose()
@@ -0,0 +1,55 @@
+import asyncio
+import json
+import re
+from types import SimpleNamespace
+from app import ai_pipeline
+from app.page_batcher import pack_pages
+from app.pipeline_cache import PipelineCache
+
+class FakeScheduler:
+    """Answers structuring prompts with one project per page marker and records the prompts."""
+
+    def __init__(self):
+        self.prompts = []
+
+    async def agenerate(self, prompt, model=None):
+        self.prompts.append(prompt)
+        projects = [
+            {"project_description": f"Work listed on page {page_number}", "allocated_amount": 1000 * int(page_number), "page": int(page_number)}
+            for page_number in re.findall(r"=== PAGE (\d+) ===", prompt)
+        ]
+        return SimpleNamespace(parts=[True], text=json.dumps({"projects": projects}), prompt_feedback=None)
+
+    def run_coroutine(self, coroutine):
+        return asyncio.run(coroutine)
+
+def _report(pages: int) -> list:
+    return [f"Annexure page {number}: " + "road and drain works " * 150 for number in range(1, pages + 1)]
+
+def _structure(monkeypatch, cache, pages):
+    scheduler = FakeScheduler()
+    monkeypatch.setattr(ai_pipeline, "get_scheduler", lambda: scheduler)
+    monkeypatch.setattr(ai_pipeline, "get_cache", lambda: cache)
+    return scheduler, ai_pipeline.structure_data_with_gemini(pages)
+
+def test_editing_one_page_only_resends_that_page(tmp_path, monkeypatch):
+    cache = PipelineCache(str(tmp_path))
+    pages = _report(9)
+    scheduler, projects = _structure(monkeypatch, cache, pages)
+    assert len(projects) == 9 and len(scheduler.prompts) == len(pack_pages(pages))
+
+    edited = list(pages)
+    edited[3] = pages[3] + " culvert " * 300
+    # The longer page moves every later batch boundary.
+    assert [batch.page_numbers for batch in pack_pages(edited)] != [batch.page_numbers for batch in pack_pages(pages)]
+    scheduler, projects = _structure(monkeypatch, cache, edited)
+    assert len(scheduler.prompts) == 1
+    assert re.findall(r"=== PAGE (\d+) ===", scheduler.prompts[0]) == ["4"]
+    assert sorted(project["allocated_amount"] for project in projects) == [1000 * number for number in range(1, 10)]
+    assert all("page" not in project for project in projects)
+
+def test_unchanged_report_makes_no_model_calls(tmp_path, monkeypatch):
+    cache = PipelineCache(str(tmp_path))
+    _structure(monkeypatch, cache, _report(5))
+    scheduler, projects = _structure(monkeypatch, cache, _report(5))
+    assert scheduler.prompts == [] and len(projects) == 5
@@ -0,0 +1,47 @@
+from app import table_parser
+from app.table_parser import TABLE_MIN_CONFIDENCE, TableLayout, parse_amount, parse_page, parse_pdf_tables
+
+PAGE = """\
+Sl  Name of Work                     Location         Implementing Agency      Amount (Rs.)
+1   Construction of CC road          Ward 4           ABC Constructions        2,50,000
+2   Repair work at school            Rampur           XYZ Builders             Rs. 1,50,000
+3   Borewell with hand pump          Sitapur          PQR Enterprises          80,000
+"""
+
+def test_data_row_with_header_keywords_is_not_a_header():
+    assert TableLayout.detect(PAGE.splitlines()[0]) is not None
+    assert TableLayout.detect(PAGE.splitlines()[2]) is None
+
+def test_page_keeps_every_row_and_its_columns():
+    projects, confidence, layout = parse_page(PAGE)
+    assert [project["allocated_amount"] for project in projects] == [250000.0, 150000.0, 80000.0]
+    assert [project["contractor_ngo_name"] for project in projects] == ["ABC Constructions", "XYZ Builders", "PQR Enterprises"]
+    assert [project["location"] for project in projects] == ["Ward 4", "Rampur", "Sitapur"]
+    assert projects[1]["project_description"] == "Repair work at school"
+    assert confidence == 1.0
+    assert layout.columns == TableLayout.detect(PAGE.splitlines()[0]).columns
+
+def test_clean_annexure_takes_the_fast_path(monkeypatch):
+    monkeypatch.setattr(table_parser, "extract_text_layer", lambda pdf_path: [PAGE])
+    projects, fallback_pages = parse_pdf_tables("annexure.pdf")
+    assert len(projects) == 3 and fallback_pages == []
+
+def test_unparseable_rows_count_against_confidence():
+    projects, confidence, _ = parse_page(PAGE + "4   Community hall                   Ward 2           DEF Builders             pending\n")
+    assert len(projects) == 3 and confidence == 3 / 4 < TABLE_MIN_CONFIDENCE
+
+def test_mid_page_header_counts_against_confidence():
+    second_table = "\nDescription                     Cost (Rs. in lakhs)\nCommunity hall                  12.5\n"
+    projects, confidence, _ = parse_page(PAGE.replace("2   Repair work at school            Rampur           XYZ Builders             Rs. 1,50,000\n", "") + second_table)
+    assert projects[-1]["allocated_amount"] == 1250000.0
+    assert confidence == 3 / 4
+
+def test_layout_carries_over_to_the_next_page():
+    _, _, layout = parse_page(PAGE)
+    projects, confidence, _ = parse_page("4   Classroom for primary school     Ward 9           LMN Traders              3,00,000\n", layout)
+    assert projects[0]["category"] == "Education" and confidence == 1.0
+
+def test_parse_amount():
+    assert parse_amount("Rs. 1,50,000/-") == 150000.0
+    assert parse_amount("₹ 80,000") == 80000.0
+    assert parse_amount("Ward 4") is None
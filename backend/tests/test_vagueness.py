@@ -0,0 +1,32 @@
+import json
+from app import vagueness
+from app.gemini_scheduler import DEFAULT_MODEL
+from app.pipeline_cache import PipelineCache, hash_texts
+from app.vagueness import VAGUENESS_PROMPT_VERSION, classify_descriptions
+
+class RecordingCache(PipelineCache):
+    def __init__(self, directory):
+        super().__init__(directory)
+        self.calls = []
+
+    def get(self, namespace, key):
+        self.calls.append("get")
+        return super().get(namespace, key)
+
+    def get_many(self, namespace, keys):
+        self.calls.append("get_many")
+        return super().get_many(namespace, keys)
+
+def test_cached_verdicts_are_fetched_in_one_call(tmp_path, monkeypatch):
+    cache = RecordingCache(str(tmp_path))
+    verdicts = {"repair of community centre": "No location is given.", "purchase of equipment": None, "beautification of park": "No park is named."}
+    for normalized, reason in verdicts.items():
+        cache.set("vagueness", hash_texts(DEFAULT_MODEL, VAGUENESS_PROMPT_VERSION, normalized), json.dumps(reason))
+    monkeypatch.setattr(vagueness, "get_cache", lambda: cache)
+    monkeypatch.setattr(vagueness, "get_scheduler", lambda: None)
+
+    vague = classify_descriptions(["Repair of community centre", "Purchase of equipment", "Beautification of park", "Miscellaneous", "Construction of CC road from Rampur to Sitapur, 2 km"])
+    assert cache.calls == ["get_many"]
+    assert vague["repair of community centre"] == "No location is given."
+    assert vague["beautification of park"] == "No park is named."
+    assert "purchase of equipment" not in vague and "miscellaneous" in vague
@@ -8,11 +8,18 @@ const API_URL = publicRuntimeConfig.apiUrl;
 
 export const fetchConstituencies = async (): Promise<Constituency[]> => {
   try {
-    const res = await fetch(`${API_URL}/api/v1/constituencies`);
-    if (!res.ok) {
-      throw new Error(`API call failed with status: ${res.status}`);
-    }
-    const data: Constituency[] = await res.json();
+    // The list is paginated: follow X-Next-Cursor until the last page.
+    const data: Constituency[] = [];
+    let cursor: string | null = null;
+    do {
+      const query: string = cursor ? `?limit=500&cursor=${encodeURIComponent(cursor)}` : '?limit=500';
+      const res: Response = await fetch(`${API_URL}/api/v1/constituencies${query}`);
+      if (!res.ok) {
+        throw new Error(`API call failed with status: ${res.status}`);
+      }
+      data.push(...(await res.json()));
+      cursor = res.headers.get('X-Next-Cursor');
+    } while (cursor);
     return data;
   } catch (error) {
     console.error("Error fetching constituencies:", error);